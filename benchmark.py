@@ -0,0 +1,295 @@
+"""
+Build Pipeline Benchmark
+Synthesises datasets shaped like data/dataset.json (1k to 1M records), times each build
+stage in isolation and end to end, and compares the run against the previous one.
+
+Each measurement runs in its own subprocess and working directory, so the reported peak
+RSS belongs to that stage alone and the real output/ folder is never touched.
+
+    python benchmark.py                               # 1k and 10k records
+    BENCH_SIZES=1k,10k,100k,1m python benchmark.py
+    BENCH_STAGES=pages,sitemap BENCH_REPEAT=3 python benchmark.py
+    BENCH_BASELINE=bench_results/run-20260101-120000-000000.json python benchmark.py
+
+Results are saved to bench_results/run-<timestamp>.json. Stages slower (or using more
+memory) than the baseline by more than BENCH_THRESHOLD are flagged and the script exits 1.
+"""
+
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from build_profiler import peak_rss_mb
+
+# Configuration
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DATA_FILE = os.path.join(REPO_DIR, 'data', 'dataset.json')
+BENCH_DATA_DIR = os.getenv('BENCH_DATA_DIR', os.path.join(REPO_DIR, 'bench_data'))
+BENCH_RESULTS_DIR = os.getenv('BENCH_RESULTS_DIR', os.path.join(REPO_DIR, 'bench_results'))
+BENCH_SIZES = os.getenv('BENCH_SIZES', '1k,10k')
+BENCH_REPEAT = max(1, int(os.getenv('BENCH_REPEAT', '1')))
+BENCH_THRESHOLD = float(os.getenv('BENCH_THRESHOLD', '0.10'))
+BENCH_SEED = int(os.getenv('BENCH_SEED', '42'))
+BENCH_BASELINE = os.getenv('BENCH_BASELINE', '').strip()
+# Differences below this many seconds are treated as timer noise, not regressions
+BENCH_MIN_DELTA_SECONDS = float(os.getenv('BENCH_MIN_DELTA_SECONDS', '0.05'))
+
+# Stages timed in isolation (setup untimed) plus the full build.py pipeline run
+STAGES = ['load', 'related_links', 'pages', 'brand_hubs', 'sitemap', 'page_manifest', 'index', 'end_to_end']
+BENCH_STAGES = [s.strip() for s in os.getenv('BENCH_STAGES', ','.join(STAGES)).split(',') if s.strip()]
+
+
+def parse_size(value):
+    """'10k' -> 10000, '1m' -> 1000000."""
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+# ========================================
+# SYNTHETIC DATASETS
+# ========================================
+class DatasetModel:
+    """Empirical distributions of the source dataset used to sample synthetic records."""
+
+    def __init__(self, records):
+        self.pairs = Counter((r['device_brand'], r['device_type']) for r in records)
+        self.severities = Counter(r.get('severity', 'Medium') for r in records)
+        self.step_counts = Counter(len(r.get('fix_steps', [])) for r in records)
+        self.codes = [r['error_code'] for r in records]
+        self.series = defaultdict(list)
+        self.steps = defaultdict(list)
+        self.costs = defaultdict(list)
+        for r in records:
+            self.series[(r['device_brand'], r['device_type'])].append(r.get('model_series', ''))
+            self.steps[r['device_type']].extend(r.get('fix_steps', []))
+            self.costs[r.get('severity', 'Medium')].append(r.get('estimated_cost', '$0'))
+        self._pick_pair = self._weighted(self.pairs)
+        self._pick_severity = self._weighted(self.severities)
+        self._pick_step_count = self._weighted(self.step_counts)
+
+    @classmethod
+    def from_file(cls, path=SOURCE_DATA_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _weighted(counter):
+        values = list(counter)
+        weights = list(counter.values())
+        return lambda rng: rng.choices(values, weights=weights)[0]
+
+    def sample(self, rng, index):
+        brand, device = self._pick_pair(rng)
+        severity = self._pick_severity(rng)
+        step_count = self._pick_step_count(rng)
+        pool = self.steps[device]
+        code = f"{rng.choice(self.codes)}-{index:x}".upper()
+        return {
+            'slug': f"error-{code}-{brand}-{device}".lower().replace(' ', '-'),
+            'error_code': code,
+            'device_brand': brand,
+            'device_type': device,
+            'model_series': rng.choice(self.series[(brand, device)]),
+            'fix_steps': rng.sample(pool, min(step_count, len(pool))),
+            'severity': severity,
+            'estimated_cost': rng.choice(self.costs[severity]),
+            'affiliate_link': f"https://amazon.com/{brand.lower()}-{device.lower()}-part-{index}?tag=yourtag-20",
+        }
+
+
+def generate_dataset(size, seed=BENCH_SEED, data_dir=BENCH_DATA_DIR):
+    """Write (or reuse) a synthetic JSON-array dataset with `size` records; returns its path."""
+    path = os.path.join(data_dir, f"synthetic-{size}-{seed}.json")
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    model = DatasetModel.from_file()
+    rng = random.Random(seed)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for index in range(size):
+            if index:
+                f.write(',\n')
+            f.write(json.dumps(model.sample(rng, index), ensure_ascii=False))
+        f.write('\n]\n')
+    os.replace(tmp_path, path)
+    print(f"[OK] Generated {size} synthetic records -> {path}")
+    return path
+
+
+# ========================================
+# STAGE RUNNER (child process)
+# ========================================
+def run_stage(stage):
+    """Set up everything `stage` needs, then time only the stage itself. Runs in the child."""
+    import build
+    import generate_index
+    from related_links import build_related_index
+
+    if stage == 'end_to_end':
+        started = time.perf_counter()
+        build.main()
+        return time.perf_counter() - started
+
+    build.ensure_output_dir()
+    if stage == 'load':
+        started = time.perf_counter()
+        build.Dataset.load()
+        return time.perf_counter() - started
+    dataset = build.Dataset.load()
+    env = build.setup_environment()
+    manifest = build.BuildManifest.load(enabled=False)
+
+    if stage == 'related_links':
+        started = time.perf_counter()
+        build_related_index(dataset.records, build.RANDOM_LINKS_PER_PAGE)
+        return time.perf_counter() - started
+    if stage == 'pages':
+        related = build_related_index(dataset.records, build.RANDOM_LINKS_PER_PAGE)
+        started = time.perf_counter()
+        build.generate_pages(dataset.records, env, manifest, dataset.mesh_index, dataset.routes, related)
+        return time.perf_counter() - started
+    if stage == 'brand_hubs':
+        started = time.perf_counter()
+        build.generate_brand_hubs(dataset, env, manifest)
+        return time.perf_counter() - started
+    if stage == 'index':
+        started = time.perf_counter()
+        generate_index.generate_index(dataset, env)
+        return time.perf_counter() - started
+
+    hubs = build.generate_brand_hubs(dataset, env, manifest)
+    started = time.perf_counter()
+    if stage == 'sitemap':
+        build.generate_sitemap(dataset, hubs)
+    elif stage == 'page_manifest':
+        build.write_page_manifest(dataset, hubs)
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return time.perf_counter() - started
+
+
+def child_main(stage, result_path):
+    seconds = run_stage(stage)
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'seconds': seconds, 'peak_rss_mb': peak_rss_mb()}, f)
+
+
+def measure(stage, data_path):
+    """Run one stage in a fresh subprocess and working directory; returns its timing dict."""
+    with tempfile.TemporaryDirectory(prefix='pseo-bench-') as workdir:
+        result_path = os.path.join(workdir, 'result.json')
+        env = {
+            **os.environ,
+            'DATA_FILE': data_path,
+            'INCREMENTAL_BUILD': '0',
+            'PYTHONPATH': os.pathsep.join(filter(None, [REPO_DIR, os.getenv('PYTHONPATH')])),
+        }
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--stage', stage, result_path],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, check=True,
+        )
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+# ========================================
+# BASELINES
+# ========================================
+def latest_results(results_dir=BENCH_RESULTS_DIR):
+    if not os.path.isdir(results_dir):
+        return None
+    runs = sorted(name for name in os.listdir(results_dir) if name.startswith('run-') and name.endswith('.json'))
+    return os.path.join(results_dir, runs[-1]) if runs else None
+
+
+def compare_results(current, baseline, threshold=BENCH_THRESHOLD):
+    """List regressions where a stage got slower or heavier than the baseline by > threshold."""
+    regressions = []
+    for size, stages in current['runs'].items():
+        for stage, result in stages.items():
+            previous = baseline.get('runs', {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            for metric in ('seconds', 'peak_rss_mb'):
+                old, new = previous.get(metric), result.get(metric)
+                if not old or not new or new <= old * (1 + threshold):
+                    continue
+                if metric == 'seconds' and new - old < BENCH_MIN_DELTA_SECONDS:
+                    continue
+                regressions.append(f"{size} records / {stage}: {metric} {old:.3f} -> {new:.3f} "
+                                   f"(+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    print("=" * 60)
+    print(">>> BUILD PIPELINE BENCHMARK")
+    print("=" * 60)
+    unknown = [stage for stage in BENCH_STAGES if stage not in STAGES]
+    if unknown:
+        print(f"[!] Unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+        return 2
+
+    baseline_path = BENCH_BASELINE or latest_results()
+    baseline = None
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    results = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'build_workers': os.getenv('BUILD_WORKERS', '1'),
+        'repeat': BENCH_REPEAT,
+        'runs': {},
+    }
+
+    for size in map(parse_size, BENCH_SIZES.split(',')):
+        data_path = generate_dataset(size)
+        runs = results['runs'][str(size)] = {}
+        for stage in BENCH_STAGES:
+            samples = [measure(stage, data_path) for _ in range(BENCH_REPEAT)]
+            seconds = min(sample['seconds'] for sample in samples)
+            rss = max(sample['peak_rss_mb'] or 0 for sample in samples)
+            runs[stage] = {
+                'seconds': round(seconds, 4),
+                'pages_per_sec': round(size / seconds, 1) if seconds else None,
+                'peak_rss_mb': rss,
+            }
+            print(f"[{size:>8} records] {stage:<14} {seconds:9.3f}s "
+                  f"{runs[stage]['pages_per_sec'] or 0:>11.1f} pages/s {rss:8.1f} MB peak RSS")
+
+    os.makedirs(BENCH_RESULTS_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    results_path = os.path.join(BENCH_RESULTS_DIR, f"run-{stamp}.json")
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"[OK] Saved results to {results_path}")
+
+    if baseline is None:
+        print("[*] No baseline to compare against (this run becomes the baseline)")
+        return 0
+    regressions = compare_results(results, baseline)
+    if regressions:
+        print(f"[!] {len(regressions)} regressions vs {baseline_path} (threshold {BENCH_THRESHOLD:.0%}):")
+        for line in regressions:
+            print(f"    - {line}")
+        return 1
+    print(f"[OK] No regressions vs {baseline_path} (threshold {BENCH_THRESHOLD:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--stage':
+        child_main(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(main())
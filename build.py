@@ -1,35 +1,127 @@
 import os
+import bisect
 import json
 import datetime
+import gzip
 import shutil
 import hashlib
+import importlib
+import itertools
 import random
+import re
+import sys
+import tempfile
 import textwrap
-from collections import defaultdict
-from jinja2 import Environment, FileSystemLoader
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xml.sax.saxutils import escape as xml_escape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, meta
 
+from build_profiler import BuildProfiler, ChunkTimings
+from related_links import build_related_index, load_vocabulary, vocabulary_path
+import utility_css
+
 # ========================================
 # CONFIGURATION
 # ========================================
-DATA_FILE = 'data/dataset.json'
-TEMPLATE_DIR = 'templates'
+DATA_FILE = os.getenv('DATA_FILE', 'data/dataset.json')
+# Source files are resolved next to this module, not the working directory
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(SOURCE_DIR, 'templates')
+# Compiled template bytecode shared by every build process and pool worker ('' disables it)
+TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR', '.jinja_cache').strip()
 OUTPUT_DIR = 'output'
 BASE_URL = os.getenv('BASE_URL', 'https://alonsoalviraa.github.io/pseo-fixhub').strip()
 GA_MEASUREMENT_ID = os.getenv('GA_MEASUREMENT_ID', '').strip()
 CUSTOM_DOMAIN = os.getenv('CUSTOM_DOMAIN', '').strip()
 BUILD_SEED = int(os.getenv('BUILD_SEED', '42'))
 
+# Parallel rendering: BUILD_WORKERS=1 renders inline, 0 uses every CPU core.
+BUILD_WORKERS = int(os.getenv('BUILD_WORKERS', '1'))
+BUILD_CHUNK_SIZE = max(1, int(os.getenv('BUILD_CHUNK_SIZE', '64')))
+# Threads that write SVG badges alongside rendering (0 writes them inline)
+BADGE_WRITER_THREADS = int(os.getenv('BADGE_WRITER_THREADS', '2'))
+
+# Incremental builds: skip outputs whose inputs (record, template chain, config) are unchanged.
+# Set INCREMENTAL_BUILD=0 to force a full rebuild.
+INCREMENTAL_BUILD = os.getenv('INCREMENTAL_BUILD', '1').strip() != '0'
+BUILD_MANIFEST_FILE = '.build_manifest.json'
+BUILD_MANIFEST_VERSION = 1
+# Modules (under SOURCE_DIR) whose code shapes manifest-tracked outputs; editing one re-renders them.
+# Every module the build pipeline imports belongs here.
+BUILD_SOURCE_MODULES = ('build.py', 'related_links.py', 'build_profiler.py', 'generate_index.py',
+                        'generate_backlinks_plan.py', 'utility_css.py')
+
+# Sitemap protocol limits per file; SITEMAP_SHARD_BY_BUCKET=1 writes one shard per hash bucket
+SITEMAP_INDEX_FILE = 'sitemap_index.xml'
+SITEMAP_MAX_URLS = min(50000, int(os.getenv('SITEMAP_MAX_URLS', '50000')))
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+SITEMAP_SHARD_BY_BUCKET = os.getenv('SITEMAP_SHARD_BY_BUCKET', '0').strip() == '1'
+
+# Per-phase timings and page render histogram (see build_profiler.py)
+BUILD_STATS_FILE = 'build_stats.json'
+# Print a progress line every N pages (one line per page costs more than rendering it at scale)
+BUILD_PROGRESS_EVERY = max(1, int(os.getenv('BUILD_PROGRESS_EVERY', '1000')))
+
+# Output optimization: minify HTML (incl. inline JSON-LD) and write precompressed
+# <file>.gz sidecars (gzip -9) next to every HTML page, XML sitemap index and stylesheet
+MINIFY_HTML = os.getenv('MINIFY_HTML', '1').strip() != '0'
+PRECOMPRESS_OUTPUT = os.getenv('PRECOMPRESS_OUTPUT', '1').strip() != '0'
+PRECOMPRESS_SUFFIXES = ('.html', '.xml', '.css')
+
+# Page/badge shard layout: HASH_SHARD_DEPTH directory levels of HASH_SHARD_WIDTH hex chars
+# each (1 x 2 -> 'ab/slug.html', 2 x 2 -> 'ab/cd/slug.html')
+HASH_SHARD_WIDTH = min(8, max(1, int(os.getenv('HASH_SHARD_WIDTH', '2'))))
+HASH_SHARD_DEPTH = min(32 // HASH_SHARD_WIDTH, max(1, int(os.getenv('HASH_SHARD_DEPTH', '1'))))
+# Guides listed per bucket index page (index.html, index-2.html, ...)
+BUCKET_INDEX_PAGE_SIZE = max(1, int(os.getenv('BUCKET_INDEX_PAGE_SIZE', '500')))
+# Guides per brand hub page; each brand also gets one sub-hub per device type (brands/<brand>/<device>/)
+HUB_PAGE_SIZE = max(1, int(os.getenv('HUB_PAGE_SIZE', '100')))
+
 # Dedicated hashed buckets to keep top-level directories compliant with MD5 pagination hashing rules
 BRANDS_HASH_ROOT = hashlib.md5('brands'.encode('utf-8')).hexdigest()[:2]
 IMAGES_HASH_ROOT = hashlib.md5('images'.encode('utf-8')).hexdigest()[:2]
+DEVICES_HASH_ROOT = hashlib.md5('device'.encode('utf-8')).hexdigest()[:2]
+ASSETS_HASH_ROOT = hashlib.md5('assets'.encode('utf-8')).hexdigest()[:2]
+
+# Build-time stylesheet (utility_css.py): generated from the classes found in the templates
+# plus these modules, written as <ASSETS_HASH_ROOT>/site.<content hash>.css
+STYLESHEET_CONTENT = tuple(os.path.join(SOURCE_DIR, name) for name in ('generate_index.py',))
+# Hex chars of the content SHA-256 in fingerprinted asset names (stylesheet, hero badges)
+ASSET_HASH_LENGTH = 12
+
+# Static-host cache headers (Netlify / Cloudflare Pages `_headers` syntax; empty disables):
+# fingerprinted assets are immutable, HTML/XML keep fixed URLs and revalidate after HTML_MAX_AGE
+CACHE_HEADERS_FILE = os.getenv('CACHE_HEADERS_FILE', '_headers').strip()
+HTML_MAX_AGE = max(0, int(os.getenv('HTML_MAX_AGE', '300')))
+# Wildcard URL rules, so the file stays a handful of lines at any catalogue size (Cloudflare
+# Pages reads at most 100). Page buckets may share the asset roots' names, so the fingerprinted
+# rules also match the extension; the patterns must not overlap, since hosts merge matches.
+IMMUTABLE_URL_PATTERNS = (f"/{IMAGES_HASH_ROOT}/*.svg", f"/{ASSETS_HASH_ROOT}/site.*.css")
+REVALIDATED_URL_PATTERNS = ('/', '/*/', '/*.html', f"/{SITEMAP_INDEX_FILE}", '/sitemap-*.xml.gz')
+
+# Staged builds: render into STAGED_BUILDS_DIR/<build-id>, hardlink unchanged outputs from the
+# previous build, then atomically flip the `output` symlink to the new directory
+STAGED_BUILD = os.getenv('STAGED_BUILD', '0').strip() == '1'
+STAGED_BUILDS_DIR = os.getenv('STAGED_BUILDS_DIR', '.builds')
+STAGED_BUILDS_KEEP = max(1, int(os.getenv('STAGED_BUILDS_KEEP', '2')))
+# Outputs of the `styles`, `index` and `outreach` steps; seeded from the previous build so a run
+# with BUILD_STEPS excluding them (or the standalone scripts) still publishes them
+STAGED_CARRY_OVER = ('index.html', DEVICES_HASH_ROOT, ASSETS_HASH_ROOT, 'backlinks_outreach.md')
 
 # 🔥 CHINA TECH OPTIMIZATION FLAGS
 USE_PAGINATION_HASHING = True  # Distribute files across subdirectories
-USE_SPIDER_MESH = True          # Random internal linking mesh
+USE_SPIDER_MESH = True          # Relevance-ranked internal linking mesh
 USE_CONTENT_SALTING = True      # Vary content structure
 
 # Spider Mesh Config
-RANDOM_LINKS_PER_PAGE = 10      # Number of random internal links
+RANDOM_LINKS_PER_PAGE = 10      # Number of related internal links per page
+# Share of related links drawn at random instead of by relevance (crawl exploration)
+RELATED_EXPLORATION_SHARE = float(os.getenv('RELATED_EXPLORATION_SHARE', '0.2'))
+# Fixed document frequencies for the related-links IDF (python related_links.py writes them).
+# Without the file IDF comes from the catalogue, and any data edit can move every page's links.
+RELATED_VOCABULARY_FILE = os.getenv('RELATED_VOCABULARY_FILE', vocabulary_path(DATA_FILE))
 
 # ========================================
 # CONTENT SALTING: TITLE/DESCRIPTION VARIATIONS
@@ -53,58 +145,146 @@ DESCRIPTION_VARIANTS = [
 # ========================================
 # CONTENT ENRICHMENT HELPERS
 # ========================================
-def infer_symptoms(item):
-    """Heuristic-based symptom hints to provide richer context."""
-    device = item.get('device_type', '').lower()
-    error = item.get('error_code', '').upper()
-    hints = [
-        f"Intermittent performance or repeated code {error} after a reset",
-        "Cycles stopping unexpectedly before completion",
-        "Unusual noises or vibrations during operation"
-    ]
+# Every keyword the enrichment rules react to, matched in one compiled pass per record.
+# The lookahead makes matches overlap, so results equal independent `kw in text` checks
+# (keep entries from being prefixes of one another, or the longer one would be shadowed).
+ENRICHMENT_KEYWORDS = (
+    'drain', 'pump', 'filter', 'sensor', 'thermistor', 'door', 'latch', 'hose',
+    'vent', 'exhaust', 'reset', 'restart', 'valve', 'seal', 'gasket', 'unplug', 'power',
+)
+KEYWORD_MATCHER = re.compile('(?=(' + '|'.join(map(re.escape, ENRICHMENT_KEYWORDS)) + '))')
+
+# Declarative rule tables: (features that trigger the rule, text appended).
+# Features are matched keywords plus a 'device:<type>' tag for the appliance type.
+SYMPTOM_RULES = (
+    (('drain', 'pump'), "Water remaining in the tub or slow draining after a cycle"),
+    (('filter',), "Visible debris or lint accumulation around service panels"),
+    (('sensor', 'thermistor'), "Inconsistent temperature readings or heat cycles"),
+    (('door', 'latch'), "Door will not lock or unlock cleanly before starting"),
+    (('hose',), "Moisture around hose connections or kinks along the line"),
+    (('device:washer', 'device:dishwasher'), "Persistent odor from standing water between washes"),
+)
+
+CAUSE_RULES = (
+    (('drain',), "Drain pump struggling because of clogs or kinked hoses"),
+    (('filter',), "Maintenance overdue on intake or debris filters"),
+    (('sensor',), "Misreadings from moisture or temperature sensors"),
+    (('vent', 'exhaust'), "Restricted ventilation leading to overheating"),
+    (('reset',), "Firmware protection triggered after repeated failed cycles"),
+)
+
+TIP_RULES = (
+    (('filter',), "Add a calendar reminder to clean intake and drain filters every 30 days."),
+    (('device:dryer',), "Clear lint from vents and ducts at least once per season to maintain airflow."),
+)
+
+PART_RULES = (
+    (('hose',), "OEM drain or inlet hose kit"),
+    (('filter',), "Lint/debris filter compatible with your model"),
+    (('pump',), "Circulation or drain pump assembly"),
+    (('sensor', 'thermistor'), "Replacement sensor/thermistor with harness"),
+    (('valve',), "Water inlet valve"),
+    (('seal', 'gasket'), "Door gasket or sealant kit"),
+    (('device:dryer',), "High-temp vent duct and clamps"),
+    (('device:dishwasher',), "Dishwasher-safe descaler or cleaning tablets"),
+)
+
+CHECK_RULES = (
+    (('drain', 'hose'), "Run a short cycle and listen for the drain pump; note any unusual noises."),
+    (('filter',), "Inspect filters for debris under running water until flow is clear."),
+    (('sensor',), "Check sensor connectors for corrosion or loose pins."),
+    (('door', 'latch'), "Open/close the door three times to confirm the latch engages cleanly."),
+)
+
+# Per-step explanations: the first matching rule wins, STEP_FALLBACK otherwise.
+STEP_RULES = (
+    (('unplug', 'power'), " This fully discharges the control board and prevents accidental shorts while you inspect the unit."),
+    (('hose', 'drain'), " Clearing hoses and drain paths restores proper water flow and removes the most common cause of this code."),
+    (('filter',), " A clogged filter restricts circulation; rinsing it under running water often clears the code immediately."),
+    (('reset', 'restart'), " After hardware checks, a clean restart lets the appliance reinitialize sensors and run a self-test."),
+)
+STEP_FALLBACK = " Take a moment to confirm the step is completed before moving forward to avoid repeating diagnostics."
+
+
+SYMPTOM_BASE = (
+    "Cycles stopping unexpectedly before completion",
+    "Unusual noises or vibrations during operation",
+)
+CAUSE_BASE = (
+    "Temporary glitch cleared by a full power cycle",
+    "Blocked air or water pathways reducing flow efficiency",
+    "Loose connectors or aging components that need reseating",
+)
+TIP_BASE = (
+    "Log the date of this repair so you can identify recurring patterns over time.",
+    "Run a quick rinse or empty cycle monthly to keep sensors clean.",
+    "Inspect power cords and hoses for visible wear whenever you move the appliance.",
+)
+CHECK_BASE = (
+    "Power-cycle the appliance for 5 minutes to clear transient faults.",
+    "Verify the unit is level and stable to reduce vibration-related codes.",
+)
+NO_PARTS = ("No parts typically required—start with cleaning and resets.",)
+SAFETY_NOTE = "Disconnect power and water supplies before opening panels. Keep floors dry to prevent slips."
+PRO_HELP = "If the error returns after completing these steps twice, contact a certified technician to check the control board, pump, and wiring harness."
+
+# Enrichment outputs that depend only on a record's features, device type or a single fix step
+# are built once per distinct input and shared (read-only tuples/dicts) by every page using them.
+ENRICHMENT_CACHE_SIZE = max(1, int(os.getenv('ENRICHMENT_CACHE_SIZE', '100000')))
+_shared_enrichments = {}
+
+
+def shared_enrichment(kind, key, build):
+    """Return the cached output for (kind, key), calling build() on first use."""
+    cache_key = (kind, key)
+    value = _shared_enrichments.get(cache_key)
+    if value is None:
+        if len(_shared_enrichments) >= ENRICHMENT_CACHE_SIZE:
+            _shared_enrichments.clear()
+        value = _shared_enrichments[cache_key] = build()
+    return value
+
+
+def extract_keywords(text):
+    """Return the set of ENRICHMENT_KEYWORDS found in already-lowercased text."""
+    return frozenset(KEYWORD_MATCHER.findall(text))
+
+
+def extract_features(item):
+    """One join + one scan per record: keyword hits plus the device tag."""
+    text = ' '.join(item.get('fix_steps', [])).lower()
+    features = set(KEYWORD_MATCHER.findall(text))
+    device = (item.get('device_type') or '').lower()
+    if device:
+        features.add(f"device:{device}")
+    return frozenset(features)
 
-    keywords = ' '.join(item.get('fix_steps', [])).lower()
-    if 'drain' in keywords or 'pump' in keywords:
-        hints.append("Water remaining in the tub or slow draining after a cycle")
-    if 'filter' in keywords:
-        hints.append("Visible debris or lint accumulation around service panels")
-    if 'sensor' in keywords or 'thermistor' in keywords:
-        hints.append("Inconsistent temperature readings or heat cycles")
-    if 'door' in keywords or 'latch' in keywords:
-        hints.append("Door will not lock or unlock cleanly before starting")
-    if 'hose' in keywords:
-        hints.append("Moisture around hose connections or kinks along the line")
-    if device in ('washer', 'dishwasher'):
-        hints.append("Persistent odor from standing water between washes")
 
-    return hints
+def apply_rules(rules, features):
+    """Texts of every rule whose trigger set intersects the features, in table order."""
+    return [text for triggers, text in rules if not features.isdisjoint(triggers)]
 
 
-def infer_causes(item):
-    """Map common error surfaces to possible root causes."""
-    causes = [
-        "Temporary glitch cleared by a full power cycle",
-        "Blocked air or water pathways reducing flow efficiency",
-        "Loose connectors or aging components that need reseating"
-    ]
+def infer_symptoms(item, features=None):
+    """Heuristic-based symptom hints to provide richer context."""
+    features = extract_features(item) if features is None else features
+    error = item.get('error_code', '').upper()
+    shared = shared_enrichment('symptoms', features, lambda: SYMPTOM_BASE + tuple(apply_rules(SYMPTOM_RULES, features)))
+    return (f"Intermittent performance or repeated code {error} after a reset",) + shared
 
-    keywords = ' '.join(item.get('fix_steps', [])).lower()
-    if 'drain' in keywords:
-        causes.append("Drain pump struggling because of clogs or kinked hoses")
-    if 'filter' in keywords:
-        causes.append("Maintenance overdue on intake or debris filters")
-    if 'sensor' in keywords:
-        causes.append("Misreadings from moisture or temperature sensors")
-    if 'vent' in keywords or 'exhaust' in keywords:
-        causes.append("Restricted ventilation leading to overheating")
-    if 'reset' in keywords:
-        causes.append("Firmware protection triggered after repeated failed cycles")
 
-    return causes
+def infer_causes(item, features=None):
+    """Map common error surfaces to possible root causes."""
+    features = extract_features(item) if features is None else features
+    return shared_enrichment('causes', features, lambda: CAUSE_BASE + tuple(apply_rules(CAUSE_RULES, features)))
 
 
 def recommend_toolkit(device_type):
     """Return a short list of tools suitable for the appliance type."""
+    return shared_enrichment('toolkit', device_type, lambda: _build_toolkit(device_type))
+
+
+def _build_toolkit(device_type):
     device = (device_type or '').lower()
     base = [
         "Phillips and flathead screwdrivers",
@@ -121,45 +301,33 @@ def recommend_toolkit(device_type):
         base.append("Vacuum with hose attachment for lint or debris")
     if device:
         base.append(f"Replacement parts specific to your {device_type.lower()} model")
-    return base
+    return tuple(base)
 
 
 def expand_fix_steps(fix_steps):
-    """Transform terse fix steps into explanatory paragraphs."""
-    expanded = []
-    for idx, step in enumerate(fix_steps, start=1):
-        lower = step.lower()
-        detail = step
-        if 'unplug' in lower or 'power' in lower:
-            detail += " This fully discharges the control board and prevents accidental shorts while you inspect the unit."
-        elif 'hose' in lower or 'drain' in lower:
-            detail += " Clearing hoses and drain paths restores proper water flow and removes the most common cause of this code."
-        elif 'filter' in lower:
-            detail += " A clogged filter restricts circulation; rinsing it under running water often clears the code immediately."
-        elif 'reset' in lower or 'restart' in lower:
-            detail += " After hardware checks, a clean restart lets the appliance reinitialize sensors and run a self-test."
-        else:
-            detail += " Take a moment to confirm the step is completed before moving forward to avoid repeating diagnostics."
-        expanded.append({
-            'title': f"Step {idx}",
-            'body': detail
-        })
-    return expanded
+    """Transform terse fix steps into explanatory paragraphs (one shared dict per distinct step)."""
+    return tuple(
+        shared_enrichment('step', (idx, step), lambda: _expand_step(idx, step))
+        for idx, step in enumerate(fix_steps, start=1)
+    )
+
+
+def _expand_step(idx, step):
+    keywords = extract_keywords(step.lower())
+    suffix = next(
+        (text for triggers, text in STEP_RULES if not keywords.isdisjoint(triggers)),
+        STEP_FALLBACK,
+    )
+    return {
+        'title': f"Step {idx}",
+        'body': step + suffix
+    }
 
 
-def maintenance_tips(item):
+def maintenance_tips(item, features=None):
     """Provide ongoing prevention ideas derived from the data."""
-    tips = [
-        "Log the date of this repair so you can identify recurring patterns over time.",
-        "Run a quick rinse or empty cycle monthly to keep sensors clean.",
-        "Inspect power cords and hoses for visible wear whenever you move the appliance."
-    ]
-
-    if 'filter' in ' '.join(item.get('fix_steps', [])).lower():
-        tips.append("Add a calendar reminder to clean intake and drain filters every 30 days.")
-    if item.get('device_type', '').lower() == 'dryer':
-        tips.append("Clear lint from vents and ducts at least once per season to maintain airflow.")
-    return tips
+    features = extract_features(item) if features is None else features
+    return shared_enrichment('tips', features, lambda: TIP_BASE + tuple(apply_rules(TIP_RULES, features)))
 
 
 def estimate_time_required(fix_steps, severity):
@@ -184,73 +352,61 @@ def classify_difficulty(severity):
     return "Advanced — consider a pro"
 
 
-def recommend_parts(item):
+def recommend_parts(item, features=None):
     """Infer likely replacement parts users may need to order."""
-    suggestions = []
-    steps_text = ' '.join(item.get('fix_steps', [])).lower()
-    device = (item.get('device_type') or '').lower()
-
-    if 'hose' in steps_text:
-        suggestions.append("OEM drain or inlet hose kit")
-    if 'filter' in steps_text:
-        suggestions.append("Lint/debris filter compatible with your model")
-    if 'pump' in steps_text:
-        suggestions.append("Circulation or drain pump assembly")
-    if 'sensor' in steps_text or 'thermistor' in steps_text:
-        suggestions.append("Replacement sensor/thermistor with harness")
-    if 'valve' in steps_text:
-        suggestions.append("Water inlet valve")
-    if 'seal' in steps_text or 'gasket' in steps_text:
-        suggestions.append("Door gasket or sealant kit")
+    features = extract_features(item) if features is None else features
+    return shared_enrichment('parts', features, lambda: tuple(apply_rules(PART_RULES, features)) or NO_PARTS)
 
-    if device == 'dryer':
-        suggestions.append("High-temp vent duct and clamps")
-    elif device == 'dishwasher':
-        suggestions.append("Dishwasher-safe descaler or cleaning tablets")
 
-    return suggestions or ["No parts typically required—start with cleaning and resets."]
-
-
-def diagnostic_checks(item):
+def diagnostic_checks(item, features=None):
     """Provide simple checks to validate the issue before repairing."""
-    checks = [
-        "Power-cycle the appliance for 5 minutes to clear transient faults.",
-        "Verify the unit is level and stable to reduce vibration-related codes.",
-    ]
+    features = extract_features(item) if features is None else features
+    return shared_enrichment('checks', features, lambda: CHECK_BASE + tuple(apply_rules(CHECK_RULES, features)))
 
-    steps_text = ' '.join(item.get('fix_steps', [])).lower()
-    if 'drain' in steps_text or 'hose' in steps_text:
-        checks.append("Run a short cycle and listen for the drain pump; note any unusual noises.")
-    if 'filter' in steps_text:
-        checks.append("Inspect filters for debris under running water until flow is clear.")
-    if 'sensor' in steps_text:
-        checks.append("Check sensor connectors for corrosion or loose pins.")
-    if 'door' in steps_text or 'latch' in steps_text:
-        checks.append("Open/close the door three times to confirm the latch engages cleanly.")
 
-    return checks
-
-
-def build_enriched_payload(item):
-    """Combine the raw item with derived, richer content fields."""
+def build_enriched_payload(item, features=None, **fields):
+    """
+    Combine the raw item, any per-page `fields` (routes) and derived content in one dict.
+    This is the only copy made of the record; list-valued enrichments are shared tuples.
+    """
+    features = extract_features(item) if features is None else features
+    fix_steps = item.get('fix_steps', ())
     return {
         **item,
-        'symptoms': infer_symptoms(item),
-        'causes': infer_causes(item),
+        **fields,
+        'symptoms': infer_symptoms(item, features),
+        'causes': infer_causes(item, features),
         'toolkit': recommend_toolkit(item.get('device_type')),
-        'expanded_steps': expand_fix_steps(item.get('fix_steps', [])),
-        'maintenance_tips': maintenance_tips(item),
-        'safety_note': "Disconnect power and water supplies before opening panels. Keep floors dry to prevent slips.",
-        'pro_help': "If the error returns after completing these steps twice, contact a certified technician to check the control board, pump, and wiring harness.",
-        'time_required': estimate_time_required(item.get('fix_steps', []), item.get('severity')),
+        'expanded_steps': expand_fix_steps(fix_steps),
+        'maintenance_tips': maintenance_tips(item, features),
+        'safety_note': SAFETY_NOTE,
+        'pro_help': PRO_HELP,
+        'time_required': estimate_time_required(fix_steps, item.get('severity')),
         'difficulty': classify_difficulty(item.get('severity')),
-        'recommended_parts': recommend_parts(item),
-        'diagnostic_checks': diagnostic_checks(item),
+        'recommended_parts': recommend_parts(item, features),
+        'diagnostic_checks': diagnostic_checks(item, features),
         'faq_entries': build_faq_entries(item),
-        'hero_image': item.get('hero_image'),
+        'hero_image': fields['hero_image'] if 'hero_image' in fields else item.get('hero_image'),
     }
 
 
+def enrich_records(items, page_fields=None):
+    """
+    Batch enrichment: extract features for many records and build their payloads.
+    Records sharing fix_steps and device type reuse one feature set. `page_fields`, when
+    given, holds the per-page route fields for each item, in the same order.
+    """
+    feature_cache = {}
+    payloads = []
+    for item, fields in zip(items, page_fields or itertools.repeat({})):
+        key = (tuple(item.get('fix_steps', [])), (item.get('device_type') or '').lower())
+        features = feature_cache.get(key)
+        if features is None:
+            features = feature_cache[key] = extract_features(item)
+        payloads.append(build_enriched_payload(item, features, **fields))
+    return payloads
+
+
 def build_faq_entries(item):
     """Generate practical FAQs for each guide."""
     code = item.get('error_code', 'the error')
@@ -281,23 +437,10 @@ def build_faq_entries(item):
     return faqs
 
 
-def ensure_images_dir():
-    images_dir = os.path.join(OUTPUT_DIR, IMAGES_HASH_ROOT)
-    os.makedirs(images_dir, exist_ok=True)
-    return images_dir
-
-
-def write_svg_badge(item, images_dir):
-    """Create a lightweight SVG hero badge per guide to improve visual quality without external assets."""
-    slug = item.get('slug', 'guide')
-    brand = item.get('device_brand', 'Appliance')
-    device = item.get('device_type', 'Device')
-    code = item.get('error_code', '').upper()
-
-    palette = ['#0EA5E9', '#22C55E', '#F97316', '#6366F1', '#EC4899', '#F59E0B']
-    color = palette[hash(slug) % len(palette)]
+BADGE_PALETTE = ('#0EA5E9', '#22C55E', '#F97316', '#6366F1', '#EC4899', '#F59E0B')
 
-    svg_content = textwrap.dedent(f"""
+# Dedented once at import; filled per guide with str.format.
+SVG_BADGE_TEMPLATE = textwrap.dedent("""
     <svg xmlns='http://www.w3.org/2000/svg' width='960' height='540' viewBox='0 0 960 540' role='img' aria-label='Guide hero image for {brand} {device} error {code}'>
       <defs>
         <linearGradient id='g' x1='0' y1='0' x2='1' y2='1'>
@@ -316,327 +459,1712 @@ def write_svg_badge(item, images_dir):
     </svg>
     """)
 
-    path = os.path.join(images_dir, f"{slug}.svg")
-    with open(path, 'w', encoding='utf-8') as svg_file:
-        svg_file.write(svg_content)
 
+def ensure_images_dir():
+    images_dir = os.path.join(OUTPUT_DIR, IMAGES_HASH_ROOT)
+    os.makedirs(images_dir, exist_ok=True)
+    # Badges now live in shard subdirectories; drop the old flat <slug>.svg files.
+    for entry in os.listdir(images_dir):
+        legacy_path = os.path.join(images_dir, entry)
+        if entry.endswith('.svg') and os.path.isfile(legacy_path):
+            os.remove(legacy_path)
+    return images_dir
+
+
+def hash_shard_dirs(slug):
+    """Shard directories for a slug: HASH_SHARD_DEPTH slices of HASH_SHARD_WIDTH hex chars of its MD5."""
+    digest = hashlib.md5(slug.encode('utf-8')).hexdigest()
+    return [digest[level * HASH_SHARD_WIDTH:(level + 1) * HASH_SHARD_WIDTH] for level in range(HASH_SHARD_DEPTH)]
+
+
+def content_digest(content):
+    """SHA-256 hex digest of an asset's content (str or bytes)."""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_fingerprint(content):
+    """Short SHA-256 of an asset's content, embedded in its file name."""
+    return content_digest(content)[:ASSET_HASH_LENGTH]
+
+
+def get_badge_path(slug, fingerprint=None):
+    """
+    Badge path relative to IMAGES_HASH_ROOT, sharded like pages: '<md5[:2]>/<slug>.<fingerprint>.svg'
+    ('<md5[:2]>/<slug>.svg' when no content fingerprint is known).
+    """
+    name = f"{slug}.{fingerprint}.svg" if fingerprint else f"{slug}.svg"
+    return '/'.join(hash_shard_dirs(slug) + [name])
+
+
+def badge_color(slug):
+    """Palette colour derived from an MD5 of the slug, stable across processes and runs."""
+    digest = hashlib.md5(slug.encode('utf-8')).digest()
+    return BADGE_PALETTE[int.from_bytes(digest[:4], 'big') % len(BADGE_PALETTE)]
+
+
+def render_svg_badge(item):
+    """Build the SVG hero badge markup for one guide."""
+    slug = item.get('slug', 'guide')
+    return SVG_BADGE_TEMPLATE.format(
+        brand=xml_escape(str(item.get('device_brand', 'Appliance')), {"'": '&apos;'}),
+        device=xml_escape(str(item.get('device_type', 'Device')), {"'": '&apos;'}),
+        code=xml_escape(item.get('error_code', '').upper(), {"'": '&apos;'}),
+        color=badge_color(slug),
+    )
+
+
+def write_svg_badge(item, images_dir):
+    """Create a lightweight SVG hero badge per guide to improve visual quality without external assets."""
+    slug = item.get('slug', 'guide')
+    svg_content = render_svg_badge(item)
+    path = os.path.join(images_dir, *get_badge_path(slug, content_fingerprint(svg_content)).split('/'))
+    write_output(path, svg_content)
     return path
 
+
+class BadgeWriter:
+    """
+    Writes hero badges off the render path on a small thread pool.
+    Badges whose content digest (computed once per record, see RouteTable.badge_digest) matches
+    the build manifest and exist on disk are skipped without re-rendering or touching the file.
+    """
+
+    def __init__(self, manifest, threads=None):
+        threads = BADGE_WRITER_THREADS if threads is None else threads
+        self.manifest = manifest
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+        self.futures = []
+        self.written = 0
+        self.skipped = 0
+        # (wall, cpu) seconds spent hashing and writing badges, summed over threads
+        self.elapsed = [0.0, 0.0]
+
+    def submit(self, path, digest, item):
+        """Record the badge of `item` under `digest` (see RouteTable.badge_digests); render it only if stale."""
+        started, cpu = time.perf_counter(), time.thread_time()
+        if digest is None:
+            digest = content_digest(render_svg_badge(item))
+        self.manifest.record(path, digest)
+        if self.manifest.is_fresh(path, digest):
+            self.skipped += 1
+        elif self.executor is None:
+            self.written += 1
+            write_output(path, render_svg_badge(item))
+        else:
+            self.written += 1
+            self.futures.append(self.executor.submit(self._timed_write, path, item))
+            if len(self.futures) >= 1024:
+                self._drain()
+        self.elapsed[0] += time.perf_counter() - started
+        self.elapsed[1] += time.thread_time() - cpu
+
+    @staticmethod
+    def _timed_write(path, item):
+        started, cpu = time.perf_counter(), time.thread_time()
+        write_output(path, render_svg_badge(item))
+        return time.perf_counter() - started, time.thread_time() - cpu
+
+    def _drain(self):
+        for future in self.futures:
+            wall, cpu = future.result()
+            self.elapsed[0] += wall
+            self.elapsed[1] += cpu
+        self.futures = []
+
+    def close(self):
+        self._drain()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+# ========================================
+# OUTPUT WRITER
+# ========================================
+def _file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Preserved verbatim (or compacted separately): raw-text elements and comments
+PRESERVED_MARKUP = re.compile(r'<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.S | re.I)
+JSON_LD_SCRIPT = re.compile(r'(<script\b[^>]*application/ld\+json[^>]*>)(.*)(</script\s*>)', re.S | re.I)
+# Whitespace before/after these tags (and stashed <script>/<style> blocks) never renders
+BLOCK_TAGS = (r'(?:(?i:!doctype)|html|head|body|meta|link|title|base|div|section|header|footer|nav|main|article'
+              r'|aside|ul|ol|li|dl|dt|dd|p|h[1-6]|table|thead|tbody|tfoot|tr|td|th|form|fieldset|details|summary'
+              r'|figure|blockquote|hr|br)')
+SPACE_BEFORE_BLOCK = re.compile(r' (?=</?' + BLOCK_TAGS + r'\b|\x01)')
+SPACE_AFTER_BLOCK = re.compile(r'(</?' + BLOCK_TAGS + r'\b[^>]*>|\x01\d+\x01) ')
+# HTML whitespace only: \s would also collapse non-breaking spaces
+HTML_WHITESPACE = re.compile(r'[ \t\n\r\f]+')
+STASHED_MARKUP = re.compile(r'[\x00\x01](\d+)[\x00\x01]')
+
+
+def minify_json_ld(script):
+    """Re-serialise a JSON-LD <script> compactly; invalid JSON is left untouched."""
+    match = JSON_LD_SCRIPT.fullmatch(script)
+    try:
+        data = json.loads(match.group(2))
+    except ValueError:
+        return script
+    compact = json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return f"{match.group(1)}{compact}{match.group(3)}"
+
+
+def minify_html(html):
+    """
+    Whitespace-safe HTML minification: drop comments (except conditional ones), collapse
+    whitespace runs to one space and remove it around block-level tags. <pre>/<textarea>
+    keep their content, JSON-LD is re-serialised compactly, other scripts/styles only lose
+    indentation.
+    """
+    stash = []
+
+    def keep(match):
+        block = match.group(0)
+        tag = (match.group(1) or '').lower()
+        if not tag:
+            if not block.startswith('<!--[if'):
+                return ''
+        elif tag in ('script', 'style'):
+            if JSON_LD_SCRIPT.fullmatch(block):
+                block = minify_json_ld(block)
+            else:
+                block = '\n'.join(line.strip() for line in block.splitlines() if line.strip())
+            stash.append(block)
+            return f"\x01{len(stash) - 1}\x01"
+        stash.append(block)
+        return f"\x00{len(stash) - 1}\x00"
+
+    html = PRESERVED_MARKUP.sub(keep, html)
+    html = HTML_WHITESPACE.sub(' ', html)
+    html = SPACE_BEFORE_BLOCK.sub('', html)
+    html = SPACE_AFTER_BLOCK.sub(lambda match: match.group(1), html).strip()
+    return STASHED_MARKUP.sub(lambda match: stash[int(match.group(1))], html) + '\n'
+
+
+def precompressed_path(path):
+    """Path of the .gz sidecar for outputs that get one, else None."""
+    return f"{path}.gz" if PRECOMPRESS_OUTPUT and path.endswith(PRECOMPRESS_SUFFIXES) else None
+
+
+def remove_output(path):
+    """Delete a generated file together with its precompressed sidecar."""
+    for stale_path in (path, f"{path}.gz"):
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+
+def write_output(path, content):
+    """
+    Write a generated file only when its bytes differ from what is already on disk.
+    Unchanged files keep their mtime; changed files are written to a temp file in the
+    same directory and renamed into place so readers never see a partial file.
+    HTML is minified first (MINIFY_HTML), and HTML/XML get a gzip -9 .gz sidecar
+    (PRECOMPRESS_OUTPUT) whenever the file changes or the sidecar is missing.
+    Returns True when the file was (re)written.
+    """
+    if MINIFY_HTML and path.endswith('.html'):
+        content = minify_html(content.decode('utf-8') if isinstance(content, bytes) else content)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    sidecar = precompressed_path(path)
+    try:
+        unchanged = os.path.getsize(path) == len(data) and \
+            _file_digest(path) == hashlib.sha256(data).hexdigest()
+    except OSError:
+        unchanged = False
+
+    if not unchanged:
+        _replace_file(path, data)
+    if sidecar and (not unchanged or not os.path.exists(sidecar)):
+        # mtime=0 keeps the sidecar byte-identical for identical content
+        _replace_file(sidecar, gzip.compress(data, compresslevel=9, mtime=0))
+    return not unchanged
+
+
+def _replace_file(path, data):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path)[-16:])
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class AtomicOutput:
+    """
+    Streaming counterpart of write_output() for files too large to build in memory.
+    Bytes go to a temp file as they are written; on close the temp file replaces `path`
+    only if its digest differs, otherwise it is discarded and the old file keeps its mtime.
+    HTML/XML pages (bounded in size) are handed to write_output() on close to be minified
+    and precompressed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.changed = False
+        self.size = 0
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(self.path)[-16:])
+        self.file = os.fdopen(fd, 'wb')
+        self.digest = hashlib.sha256()
+        return self
+
+    def write(self, data):
+        data = data.encode('utf-8') if isinstance(data, str) else data
+        self.digest.update(data)
+        self.size += len(data)
+        self.file.write(data)
+        return len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.file.close()
+        try:
+            if exc_type is None and (precompressed_path(self.path) or (MINIFY_HTML and self.path.endswith('.html'))):
+                with open(self.tmp_path, 'rb') as f:
+                    self.changed = write_output(self.path, f.read())
+            elif exc_type is None:
+                try:
+                    unchanged = os.path.getsize(self.path) == self.size and \
+                        _file_digest(self.path) == self.digest.hexdigest()
+                except OSError:
+                    unchanged = False
+                if not unchanged:
+                    os.chmod(self.tmp_path, 0o644)
+                    os.replace(self.tmp_path, self.path)
+                    self.changed = True
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        return False
+
 # ========================================
 # HELPER FUNCTIONS
 # ========================================
 def get_hash_path(slug):
     """
     Generate a hashed subdirectory structure to avoid flat file structure.
-    Example: 
+    Example (default 1 level x 2 chars; HASH_SHARD_DEPTH=2 gives output/a3/f2/...):
       error-e4-samsung-washer -> hash = 'a3f2' -> output/a3/error-e4-samsung-washer.html
     """
     if not USE_PAGINATION_HASHING:
         return slug
     
-    # Create a short hash from the slug (first 2 chars of MD5)
-    hash_obj = hashlib.md5(slug.encode('utf-8'))
-    hash_prefix = hash_obj.hexdigest()[:2]
-    
-    return os.path.join(hash_prefix, slug)
+    return os.path.join(*hash_shard_dirs(slug), slug)
 
-def get_random_title_template():
+def record_rng(slug):
+    """
+    Random stream for one record's salting and mesh picks, seeded by BUILD_SEED and its slug
+    only, so adding or reordering other records never changes what this page draws.
+    """
+    return random.Random(f"{BUILD_SEED}:{slug}")
+
+def select_related_indices(index, ranked, routes, rng):
+    """
+    Pick the spider-mesh targets for one page: the best-ranked neighbours, plus a
+    RELATED_EXPLORATION_SHARE of random picks (also used to top up short neighbour lists).
+    Random picks land on the slug-hash ring (RouteTable.hash_ring) rather than on a position,
+    so inserting a record only moves the picks that fall next to it. The links come back
+    sorted by slug, so a page only changes when its set of targets does.
+    """
+    total_items = len(routes)
+    n_links = min(RANDOM_LINKS_PER_PAGE, total_items - 1)
+    if n_links <= 0:
+        return []
+    n_ranked = n_links - int(round(n_links * RELATED_EXPLORATION_SHARE))
+    chosen = [idx for idx in ranked[:n_ranked] if idx != index]
+    seen = set(chosen)
+    seen.add(index)
+    if len(chosen) < n_links:
+        points, ring = routes.hash_ring()
+    while len(chosen) < n_links:
+        # First record clockwise from a random point that is not linked yet
+        slot = bisect.bisect_left(points, rng.getrandbits(64)) % total_items
+        while ring[slot] in seen:
+            slot = (slot + 1) % total_items
+        seen.add(ring[slot])
+        chosen.append(ring[slot])
+    chosen.sort(key=routes.slugs.__getitem__)
+    return chosen
+
+def get_random_title_template(rng=random):
     """Get a random title variant for content salting."""
-    return random.choice(TITLE_VARIANTS)
+    return rng.choice(TITLE_VARIANTS)
 
-def get_random_description_template():
+def get_random_description_template(rng=random):
     """Get a random description variant for content salting."""
-    return random.choice(DESCRIPTION_VARIANTS)
+    return rng.choice(DESCRIPTION_VARIANTS)
+
+# Every page layout get_template_variant() may return; preloaded once per process.
+PAGE_TEMPLATE_VARIANTS = ['page.html']
+HUB_TEMPLATES = ['brand_hub.html']
 
-def get_template_variant():
+def get_template_variant(rng=random):
     """
     Returns template variant name (for rotating between multiple page layouts).
     For now we use one, but you can create page_v1.html, page_v2.html, etc.
     """
-    # For advanced content salting, create multiple template variants
-    # and rotate: return random.choice(['page.html', 'page_v2.html', 'page_v3.html'])
-    return 'page.html'
+    # For advanced content salting, add page_v2.html, page_v3.html to PAGE_TEMPLATE_VARIANTS
+    # and rotate: return rng.choice(PAGE_TEMPLATE_VARIANTS)
+    return PAGE_TEMPLATE_VARIANTS[0]
 
 
 def slugify(value: str) -> str:
     """Create URL-safe slugs for hub pages."""
     return ''.join(ch.lower() if ch.isalnum() else '-' for ch in value).strip('-')
 
+
+class RouteTable:
+    """
+    Array-backed routes for every record, computed once per build.
+    Position i in each list belongs to record i of the dataset, so stages look up
+    URLs by index instead of re-hashing slugs. All URL logic lives here.
+    """
+
+    __slots__ = ('slugs', 'buckets', 'page_paths', 'page_urls', 'badge_paths', 'badge_digests', 'badge_source',
+                 'brand_slugs', 'hub_urls', '_brand_routes', '_positions', '_ring')
+
+    def __init__(self):
+        self.slugs = []
+        self.buckets = []       # hash bucket directory ('' when pagination hashing is off)
+        self.page_paths = []    # output-relative page path, always '/'-separated
+        self.page_urls = []
+        self.badge_paths = []   # fingerprinted hero badge path relative to IMAGES_HASH_ROOT (see badge_path)
+        self.badge_digests = []  # SHA-256 of each badge's SVG (see badge_digest)
+        self.badge_source = None  # position -> record, to render badges whose digest is not known yet
+        self.brand_slugs = []
+        self.hub_urls = []
+        self._brand_routes = {}
+        self._positions = None
+        self._ring = None
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Build from any iterable of objects exposing .slug and .device_brand (e.g. MeshEntry).
+        Entries carry no badge content, so badge paths are not fingerprinted.
+        """
+        routes = cls()
+        for entry in entries:
+            routes.add(entry.slug, entry.device_brand)
+        return routes
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def add(self, slug, brand, badge_digest=None):
+        """Append the route for the next record and return its position."""
+        hash_path = get_hash_path(slug).replace('\\', '/')
+        brand_slug, hub_url = self.brand_route(brand)
+        self.slugs.append(slug)
+        self.buckets.append(hash_path[:-len(slug) - 1] if hash_path != slug else '')
+        self.page_paths.append(f"{hash_path}.html")
+        self.page_urls.append(f"{BASE_URL}/{hash_path}.html")
+        self.badge_paths.append(None)
+        self.badge_digests.append(badge_digest)
+        self.brand_slugs.append(brand_slug)
+        self.hub_urls.append(hub_url)
+        self._positions = None
+        self._ring = None
+        return len(self.slugs) - 1
+
+    def route_for(self, position, item):
+        """Return `position`, registering the record first if the table has not seen it yet."""
+        if position == len(self.slugs):
+            self.add(item.get('slug', f"page-{position}"), item.get('device_brand', ''),
+                     content_digest(render_svg_badge(item)))
+        return position
+
+    @staticmethod
+    def brand_slug(brand):
+        return slugify(brand or '') or 'brand'
+
+    def brand_route(self, brand):
+        """(brand_slug, hub_url) for a brand name; strings are shared across records."""
+        route = self._brand_routes.get(brand)
+        if route is None:
+            brand_slug = self.brand_slug(brand)
+            route = (brand_slug, f"{BASE_URL}/{BRANDS_HASH_ROOT}/brands/{brand_slug}/")
+            self._brand_routes[brand] = route
+        return route
+
+    @staticmethod
+    def device_route(device_type):
+        """(device_slug, output-relative directory) of a device-type listing (pages are page-N.html)."""
+        device_slug = slugify(device_type or '') or 'other'
+        return device_slug, f"{DEVICES_HASH_ROOT}/device/{device_slug}"
+
+    @staticmethod
+    def output_url(path):
+        """Public URL of an output-relative path; index.html pages are addressed by their directory (like hubs)."""
+        if path == 'index.html' or path.endswith('/index.html'):
+            path = path[:-len('index.html')]
+        return f"{BASE_URL}/{path}"
+
+    def hash_path(self, position):
+        """Page path without the .html extension (the form used by related-page links)."""
+        return self.page_paths[position][:-5]
+
+    def output_path(self, position):
+        return os.path.join(OUTPUT_DIR, *self.page_paths[position].split('/'))
+
+    def badge_digest(self, position):
+        """SHA-256 of a record's badge SVG, rendered from badge_source on first use (None without one)."""
+        digest = self.badge_digests[position]
+        if digest is None and self.badge_source is not None:
+            digest = self.badge_digests[position] = content_digest(render_svg_badge(self.badge_source(position)))
+        return digest
+
+    def badge_path(self, position):
+        """Badge path relative to IMAGES_HASH_ROOT, fingerprinted when the badge digest is known."""
+        path = self.badge_paths[position]
+        if path is None:
+            digest = self.badge_digest(position)
+            path = self.badge_paths[position] = get_badge_path(
+                self.slugs[position], digest and digest[:ASSET_HASH_LENGTH],
+            )
+        return path
+
+    def badge_output_path(self, position):
+        return os.path.join(OUTPUT_DIR, IMAGES_HASH_ROOT, *self.badge_path(position).split('/'))
+
+    def hero_url(self, position):
+        return f"{BASE_URL}/{IMAGES_HASH_ROOT}/{self.badge_path(position)}"
+
+    def position(self, slug):
+        if self._positions is None:
+            self._positions = {slug: i for i, slug in enumerate(self.slugs)}
+        return self._positions.get(slug)
+
+    def hash_ring(self):
+        """(sorted 64-bit slug hashes, record positions in the same order) for consistent-hash picks."""
+        if self._ring is None:
+            points = sorted(
+                (int(hashlib.md5(slug.encode('utf-8')).hexdigest()[:16], 16), position)
+                for position, slug in enumerate(self.slugs)
+            )
+            self._ring = ([point for point, _ in points], [position for _, position in points])
+        return self._ring
+
+# ========================================
+# INCREMENTAL BUILD MANIFEST
+# ========================================
+def _digest_default(value):
+    return value.as_dict() if isinstance(value, Record) else str(value)
+
+
+def hash_inputs(*parts):
+    """Stable SHA-256 digest over JSON-serialisable build inputs (Records hash like their dicts)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_digest_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def source_fingerprint():
+    """Digest of BUILD_SOURCE_MODULES; line endings are normalised so a CRLF checkout matches an LF one."""
+    digest = hashlib.sha256()
+    for name in BUILD_SOURCE_MODULES:
+        with open(os.path.join(SOURCE_DIR, name), 'rb') as f:
+            digest.update(f"{name}\0".encode('utf-8') + f.read().replace(b'\r\n', b'\n') + b'\0')
+    return digest.hexdigest()
+
+
+def vocabulary_fingerprint():
+    """Digest of RELATED_VOCABULARY_FILE (None without one): its weights pick every page's related links."""
+    if not os.path.exists(RELATED_VOCABULARY_FILE):
+        return None
+    with open(RELATED_VOCABULARY_FILE, 'rb') as f:
+        return content_digest(f.read().replace(b'\r\n', b'\n'))
+
+
+def config_fingerprint():
+    """Digest of every setting, and of the build code, that changes rendered output."""
+    return hash_inputs({
+        'manifest_version': BUILD_MANIFEST_VERSION,
+        'source': source_fingerprint(),
+        'base_url': BASE_URL,
+        'analytics_id': GA_MEASUREMENT_ID,
+        'build_seed': BUILD_SEED,
+        'pagination_hashing': USE_PAGINATION_HASHING,
+        'spider_mesh': USE_SPIDER_MESH,
+        'content_salting': USE_CONTENT_SALTING,
+        'links_per_page': RANDOM_LINKS_PER_PAGE,
+        'exploration_share': RELATED_EXPLORATION_SHARE,
+        'related_vocabulary': vocabulary_fingerprint(),
+        'minify_html': MINIFY_HTML,
+        'precompress': PRECOMPRESS_OUTPUT,
+    })
+
+
+def iter_template_chain(env, template_name):
+    """Yield (name, source) for a template and every template it extends/includes/imports."""
+    pending = [template_name]
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        source, _, _ = env.loader.get_source(env, name)
+        yield name, source
+        for ref in meta.find_referenced_templates(env.parse(source)):
+            if ref:
+                pending.append(ref)
+
+
+def template_chain_hash(env, template_name):
+    """
+    Hash a template together with every template it extends/includes/imports,
+    so editing base.html invalidates page.html and brand_hub.html outputs.
+    """
+    digests = [
+        (name, hashlib.sha256(source.encode('utf-8')).hexdigest())
+        for name, source in iter_template_chain(env, template_name)
+    ]
+    # Every layout links the stylesheet and inlines its critical rules
+    stylesheet = env.globals.get('stylesheet')
+    return hash_inputs(sorted(digests), stylesheet and [stylesheet.url, stylesheet.critical])
+
+
+class BuildManifest:
+    """
+    Persisted map of output path -> input digest used to skip unchanged renders.
+    It also remembers the date each output's inputs last changed (its sitemap lastmod).
+    """
+
+    def __init__(self, path, previous=None, enabled=True, previous_lastmod=None, reuse_dir=None):
+        self.path = path
+        self.previous = previous or {}
+        self.previous_lastmod = previous_lastmod or {}
+        self.current = {}
+        self.lastmod = {}
+        self.enabled = enabled
+        self.reuse_dir = reuse_dir
+        self.today = datetime.date.today().isoformat()
+
+    @classmethod
+    def load(cls, enabled=None, previous_dir=None):
+        """
+        Read the previous manifest. It is read even when incremental builds are disabled:
+        skipping is then off (is_fresh() is always False), but lastmod dates carry over.
+        `previous_dir` is the last build's directory when staging into a fresh OUTPUT_DIR;
+        fresh outputs are then hardlinked from it instead of being left in place.
+        """
+        enabled = INCREMENTAL_BUILD if enabled is None else enabled
+        previous_path = os.path.join(previous_dir or OUTPUT_DIR, BUILD_MANIFEST_FILE)
+        previous, previous_lastmod = {}, {}
+        if os.path.exists(previous_path):
+            try:
+                with open(previous_path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get('version') == BUILD_MANIFEST_VERSION:
+                    previous = stored.get('outputs', {})
+                    previous_lastmod = stored.get('lastmod', {})
+            except (OSError, ValueError):
+                previous, previous_lastmod = {}, {}
+        path = os.path.join(OUTPUT_DIR, BUILD_MANIFEST_FILE)
+        return cls(path, previous, enabled, previous_lastmod, previous_dir)
+
+    @staticmethod
+    def key_for(output_path):
+        return os.path.relpath(output_path, OUTPUT_DIR).replace('\\', '/')
+
+    def is_fresh(self, output_path, digest):
+        """True when the output exists on disk and was built from identical inputs."""
+        if not self.enabled:
+            return False
+        key = self.key_for(output_path)
+        if self.previous.get(key) != digest:
+            return False
+        if self.reuse_dir is None:
+            return os.path.exists(output_path)
+        source = os.path.join(self.reuse_dir, *key.split('/'))
+        if not link_or_copy(source, output_path):
+            return False
+        sidecar = precompressed_path(output_path)
+        if sidecar:
+            link_or_copy(f"{source}.gz", sidecar)
+        return True
+
+    def record(self, output_path, digest):
+        key = self.key_for(output_path)
+        self.current[key] = digest
+        if self.previous.get(key) == digest and key in self.previous_lastmod:
+            self.lastmod[key] = self.previous_lastmod[key]
+        else:
+            self.lastmod[key] = self.today
+
+    def stale_keys(self):
+        """Outputs the previous build recorded that this build has not (yet) recorded."""
+        return sorted(key for key in self.previous if key not in self.current)
+
+    def forget(self, keys):
+        """Drop previous entries (pruned outputs) so save(keep_previous=True) does not carry them over."""
+        for key in keys:
+            self.previous.pop(key, None)
+            self.previous_lastmod.pop(key, None)
+
+    def lastmod_for(self, output_path):
+        """Date (YYYY-MM-DD) the output's inputs last changed; today when unknown."""
+        return self.lastmod.get(self.key_for(output_path), self.today)
+
+    def save(self, keep_previous=False):
+        """
+        Persist this build's digests. `keep_previous` also keeps the entries of outputs a
+        partial build (some steps skipped) did not record, so the next build can still skip them.
+        """
+        outputs, lastmod = self.current, self.lastmod
+        if keep_previous:
+            outputs = {**self.previous, **self.current}
+            lastmod = {**self.previous_lastmod, **self.lastmod}
+        write_output(self.path, json.dumps(
+            {'version': BUILD_MANIFEST_VERSION, 'outputs': outputs, 'lastmod': lastmod},
+            sort_keys=True))
+
+    def advance(self):
+        """Start the next build of a long-lived process: everything known so far becomes 'previous'."""
+        self.previous = {**self.previous, **self.current}
+        self.previous_lastmod = {**self.previous_lastmod, **self.lastmod}
+        self.current = {}
+        self.lastmod = {}
+        self.today = datetime.date.today().isoformat()
+
+# ========================================
+# STAGED OUTPUT
+# ========================================
+def link_or_copy(source, destination):
+    """
+    Hardlink `source` to `destination`, copying when links are unsupported (e.g. across
+    devices). Returns False when `source` does not exist. Sharing inodes is safe because
+    every writer replaces files via rename instead of writing into them.
+    """
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError:
+        if not os.path.isfile(source):
+            return False
+        shutil.copy2(source, destination)
+    return True
+
+
+class StagedOutput:
+    """
+    Build into a fresh directory and publish it atomically: `output` becomes a symlink that
+    is flipped to the finished build with a single rename, so readers see either the old
+    site or the new one. A failed build leaves the live site untouched.
+    """
+
+    def __init__(self, live_dir=None):
+        self.live_dir = live_dir or OUTPUT_DIR
+        self.previous_dir = os.path.realpath(self.live_dir) if os.path.isdir(self.live_dir) else None
+        build_id = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.stage_dir = os.path.join(STAGED_BUILDS_DIR, build_id)
+
+    def begin(self):
+        """Create the stage directory, seed it with companion outputs and point OUTPUT_DIR at it."""
+        global OUTPUT_DIR
+        os.makedirs(self.stage_dir)
+        if self.previous_dir:
+            # Steps that run in this build overwrite (or prune) these; skipped steps keep them.
+            for name in STAGED_CARRY_OVER:
+                source = os.path.join(self.previous_dir, name)
+                if os.path.isdir(source):
+                    for root, _, files in os.walk(source):
+                        for filename in files:
+                            relative = os.path.relpath(os.path.join(root, filename), self.previous_dir)
+                            link_or_copy(os.path.join(root, filename), os.path.join(self.stage_dir, relative))
+                elif os.path.isfile(source):
+                    link_or_copy(source, os.path.join(self.stage_dir, name))
+                    link_or_copy(f"{source}.gz", os.path.join(self.stage_dir, f"{name}.gz"))
+        OUTPUT_DIR = self.stage_dir
+        return self
+
+    def abort(self):
+        global OUTPUT_DIR
+        OUTPUT_DIR = self.live_dir
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+
+    def commit(self):
+        """Flip the live symlink to the stage directory and prune old builds."""
+        global OUTPUT_DIR
+        OUTPUT_DIR = self.live_dir
+        if os.path.isdir(self.live_dir) and not os.path.islink(self.live_dir):
+            # First staged build: move the real directory aside so `output` can become a symlink.
+            os.rename(self.live_dir, f"{self.stage_dir}-previous")
+        swap_link = f"{self.live_dir}.swap"
+        if os.path.lexists(swap_link):
+            os.remove(swap_link)
+        link_parent = os.path.dirname(os.path.abspath(self.live_dir))
+        os.symlink(os.path.relpath(os.path.abspath(self.stage_dir), link_parent), swap_link)
+        os.replace(swap_link, self.live_dir)
+        self.prune()
+
+    def prune(self):
+        """Keep the live build plus the newest STAGED_BUILDS_KEEP - 1 previous builds."""
+        live = os.path.realpath(self.live_dir)
+        builds = sorted(
+            (os.path.join(STAGED_BUILDS_DIR, name) for name in os.listdir(STAGED_BUILDS_DIR)),
+            key=os.path.getmtime, reverse=True,
+        )
+        kept = 1
+        for build_dir in builds:
+            if os.path.realpath(build_dir) == live:
+                continue
+            if kept < STAGED_BUILDS_KEEP:
+                kept += 1
+                continue
+            shutil.rmtree(build_dir, ignore_errors=True)
+
 # ========================================
 # CORE FUNCTIONS
 # ========================================
+DATA_READ_CHUNK = 1 << 16
+
+# Lightweight per-record entry the spider mesh links to.
+MeshEntry = namedtuple('MeshEntry', ['slug', 'error_code', 'device_brand'])
+# Generated stylesheet: full CSS, the inlined critical subset and the fingerprinted output path/URL
+Stylesheet = namedtuple('Stylesheet', ['css', 'critical', 'digest', 'path', 'url'])
+
+# Dataset fields stored in Record slots (anything else goes to Record.extra). Categorical
+# fields are interned so every record naming the same brand/device/severity shares one string.
+RECORD_FIELDS = ('slug', 'error_code', 'device_brand', 'device_type', 'model_series', 'fix_steps',
+                 'severity', 'estimated_cost', 'affiliate_link')
+INTERNED_FIELDS = frozenset({'device_brand', 'device_type', 'model_series', 'severity', 'estimated_cost'})
+
+
+class Record:
+    """
+    Compact read-only dataset record: known fields live in __slots__ instead of a per-record
+    dict, categorical strings are interned and identical fix_steps lists become one shared
+    tuple. Supports the dict reads the build uses (get, [], in, keys, ** unpacking).
+    """
+
+    __slots__ = RECORD_FIELDS + ('extra',)
+
+    @classmethod
+    def from_dict(cls, data, shared=None):
+        """Build a Record; `shared` maps step tuples to their first instance across a dataset."""
+        record = cls()
+        extra = None
+        for key, value in data.items():
+            if key not in RECORD_FIELDS:
+                extra = extra or {}
+                extra[key] = value
+                continue
+            if key == 'fix_steps' and isinstance(value, list):
+                value = tuple(sys.intern(step) if isinstance(step, str) else step for step in value)
+                if shared is not None:
+                    value = shared.setdefault(value, value)
+            elif key in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, key, value)
+        record.extra = extra
+        return record
+
+    def get(self, key, default=None):
+        if key in RECORD_FIELDS:
+            return getattr(self, key, default)
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        keys = [field for field in RECORD_FIELDS if hasattr(self, field)]
+        return keys + list(self.extra) if self.extra else keys
+
+    def as_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+
+_MISSING = object()
+
+
+def _iter_json_lines(f):
+    for line_no, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"Invalid JSON on line {line_no} of {f.name}: {exc}") from exc
+
+
+def _iter_json_array(f):
+    """Incrementally decode the objects of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip whitespace and separators between elements.
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                if buf[pos] == ',' and not started:
+                    raise ValueError(f"{f.name} is not a JSON array")
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf = buf[pos:] + f.read(DATA_READ_CHUNK)
+            pos = 0
+            eof = len(buf) == 0
+
+        if pos >= len(buf):
+            raise ValueError(f"Unexpected end of {f.name} (unterminated JSON array)")
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError(f"{f.name} is not a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+            # A scalar ending exactly at the buffer edge may still be truncated.
+            complete = eof or end < len(buf)
+        except ValueError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # The element straddles the read boundary: pull in more text and retry.
+            chunk = f.read(DATA_READ_CHUNK)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield record
+        pos = end
+        if pos > DATA_READ_CHUNK:
+            buf = buf[pos:]
+            pos = 0
+
+
+def iter_records(path=None):
+    """
+    Stream dataset records one at a time.
+    Accepts a JSON array (parsed incrementally) or JSON Lines (.jsonl/.ndjson).
+    """
+    path = path or DATA_FILE
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            yield from _iter_json_lines(f)
+        else:
+            yield from _iter_json_array(f)
+
+
 def load_data():
     """Load the dataset from JSON."""
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return list(iter_records())
+
+
+def build_mesh_index(records):
+    """Collect the slug/code/brand triples the spider mesh links to, in dataset order."""
+    index = []
+    for position, item in enumerate(records):
+        index.append(MeshEntry(
+            item.get('slug', f"page-{position}"),
+            item.get('error_code'),
+            item.get('device_brand'),
+        ))
+    return index
 
-def setup_environment():
-    """Setup Jinja2 environment."""
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+class Dataset:
+    """
+    The dataset parsed once per build and shared by every pipeline step.
+    Records (compact Record objects) keep dataset order; routes, the spider-mesh index and the brand/device/severity
+    group-by indexes (lists of record positions, in dataset order) are built during the parse.
+    """
+
+    __slots__ = ('source', 'records', 'mesh_index', 'routes', 'by_brand', 'by_device', 'by_severity')
+
+    def __init__(self, records, source=None):
+        self.source = source
+        self.records = []
+        self.mesh_index = []
+        self.routes = RouteTable()
+        self.by_brand = defaultdict(list)
+        self.by_device = defaultdict(list)
+        self.by_severity = defaultdict(list)
+        # Badges are rendered and fingerprinted on first use, not while parsing
+        self.routes.badge_source = self.records.__getitem__
+        shared_steps = {}
+        for position, item in enumerate(records):
+            if not isinstance(item, Record):
+                item = Record.from_dict(item, shared_steps)
+            entry = MeshEntry(item.get('slug', f"page-{position}"), item.get('error_code'), item.get('device_brand'))
+            self.records.append(item)
+            self.mesh_index.append(entry)
+            self.routes.add(entry.slug, entry.device_brand)
+            self.by_brand[item.get('device_brand', 'Other')].append(position)
+            self.by_device[item.get('device_type', 'Other')].append(position)
+            self.by_severity[item.get('severity')].append(position)
+
+    @classmethod
+    def load(cls, path=None):
+        """Parse DATA_FILE (or `path`) once."""
+        path = path or DATA_FILE
+        return cls(iter_records(path), path)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+def as_dataset(data):
+    """Wrap an iterable of records in a Dataset unless it already is one."""
+    return data if isinstance(data, Dataset) else Dataset(data)
+
+
+def setup_environment(auto_reload=False, preload=True):
+    """
+    Setup Jinja2 environment.
+    Compiled bytecode is persisted in TEMPLATE_CACHE_DIR (validated against the
+    template source checksum), so new processes and pool workers skip compilation.
+    """
+    bytecode_cache = None
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR, '%s.jinja.cache')
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=bytecode_cache,
+        auto_reload=auto_reload,
+    )
+    attach_stylesheet(env)
+    if preload:
+        preload_templates(env)
     return env
 
+
+def attach_stylesheet(env):
+    """
+    Generate the site stylesheet from the classes the templates (and STYLESHEET_CONTENT) use
+    and expose it to every template as `stylesheet`. The critical subset inlined in <head>
+    covers the layout shell before <main> and each template's <header>.
+    """
+    texts, above_fold = [], []
+    for name in env.list_templates(extensions=['html']):
+        source = env.loader.get_source(env, name)[0]
+        texts.append(source)
+        if '<main' in source:
+            above_fold.append(source.split('<main', 1)[0])
+        elif '</header>' in source:
+            above_fold.append(source.split('</header>', 1)[0])
+    for path in STYLESHEET_CONTENT:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+
+    css = utility_css.generate_css(utility_css.scan_classes(texts))
+    critical = utility_css.generate_css(utility_css.scan_classes(above_fold))
+    digest = content_fingerprint(css)
+    path = f"{ASSETS_HASH_ROOT}/site.{digest}.css"
+    env.globals['stylesheet'] = Stylesheet(css, critical, digest, path, f"{BASE_URL}/{path}")
+    return env.globals['stylesheet']
+
+
+def write_stylesheet(stylesheet):
+    """Write the fingerprinted stylesheet and remove previous fingerprints."""
+    path = os.path.join(OUTPUT_DIR, *stylesheet.path.split('/'))
+    changed = write_output(path, stylesheet.css)
+    assets_dir = os.path.dirname(path)
+    for name in os.listdir(assets_dir):
+        if name.startswith('site.') and name.endswith('.css') and name != os.path.basename(path):
+            remove_output(os.path.join(assets_dir, name))
+    return changed
+
+
+def preload_templates(env):
+    """
+    Load every page variant and hub template, plus the layouts/partials they extend,
+    into the environment cache up front (from bytecode when the cache is warm).
+    """
+    names = PAGE_TEMPLATE_VARIANTS + HUB_TEMPLATES
+    names += [name for name in env.list_templates(extensions=['html']) if name not in names]
+    return {name: env.get_template(name) for name in names}
+
 def ensure_output_dir():
     """Create output directory if it doesn't exist."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # Remove legacy folders that are not 2-char hex hashes to satisfy the pagination hashing test suite.
+    # Remove legacy folders that are not hex hash roots (2-char brand/image roots or
+    # HASH_SHARD_WIDTH-char page shards) to satisfy the pagination hashing test suite.
     for entry in os.listdir(OUTPUT_DIR):
         full_path = os.path.join(OUTPUT_DIR, entry)
         if os.path.isdir(full_path):
-            is_hash = len(entry) == 2 and all(c in '0123456789abcdef' for c in entry)
+            is_hash = len(entry) in (2, HASH_SHARD_WIDTH) and all(c in '0123456789abcdef' for c in entry)
             if not is_hash:
                 shutil.rmtree(full_path)
 
-def generate_pages(data, env):
+_WORKER_ENV = None
+
+
+def _init_render_worker():
+    """Process-pool initializer: build one Jinja environment per worker."""
+    global _WORKER_ENV
+    _WORKER_ENV = setup_environment()
+
+
+def resolve_worker_count():
+    """Number of render processes; BUILD_WORKERS=0 means one per CPU core."""
+    if BUILD_WORKERS <= 0:
+        return os.cpu_count() or 1
+    return BUILD_WORKERS
+
+
+def page_fields(job):
+    """The route fields the page template links to, merged into the record by enrichment."""
+    return {
+        'hero_image': job['hero_image'],
+        'page_url': job['page_url'],
+        'brand_slug': job['brand_slug'],
+        'brand_hub_url': job['brand_hub_url'],
+    }
+
+
+def plan_page(index, item, routes, mesh_index, related, rng=None):
+    """
+    Plan one page: its spider-mesh links, salted title/description and template variant,
+    plus the route fields the template links to. Returns the render job; draws its random
+    choices from `rng`, the record's own stream (record_rng) by default. Salting is drawn
+    first: the mesh may consume a varying number of draws as its neighbours change.
+    """
+    total_items = len(mesh_index)
+    rng = rng or record_rng(routes.slugs[index])
+
+    # ========================================
+    # 🔥 OPTIMIZATION 3: CONTENT SALTING
+    # ========================================
+    if USE_CONTENT_SALTING:
+        # Inject randomized title and description
+        title_template = get_random_title_template(rng)
+        desc_template = get_random_description_template(rng)
+        
+        custom_title = title_template.format(
+            code=item.get('error_code'),
+            brand=item.get('device_brand'),
+            device=item.get('device_type')
+        )
+        
+        custom_description = desc_template.format(
+            code=item.get('error_code'),
+            brand=item.get('device_brand'),
+            device=item.get('device_type'),
+            cost=item.get('estimated_cost')
+        )
+    else:
+        custom_title = None
+        custom_description = None
+    # Select template variant (for advanced salting with multiple templates)
+    template_name = get_template_variant(rng)
+    
+    # ========================================
+    # 🔥 OPTIMIZATION 2: SPIDER MESH (Random Internal Linking)
+    # ========================================
+    related_pages = []
+    
+    if USE_SPIDER_MESH:
+        # Precomputed relevance neighbours (brand/device/series/keywords) + exploration picks
+        related_indices = select_related_indices(index, related.neighbours(index), routes, rng)
+        
+        for related_idx in related_indices:
+            related_item = mesh_index[related_idx]
+            
+            related_pages.append({
+                'slug': routes.hash_path(related_idx),  # Use hashed path for correct URL
+                'url': routes.page_urls[related_idx],
+                'error_code': related_item.error_code,
+                'device_brand': related_item.device_brand
+            })
+    else:
+        # Fallback: sequential linking
+        for i in range(1, 4):
+            related_idx = (index + i) % total_items
+            related_item = mesh_index[related_idx]
+            
+            related_pages.append({
+                'slug': routes.hash_path(related_idx),
+                'url': routes.page_urls[related_idx],
+                'error_code': related_item.error_code,
+                'device_brand': related_item.device_brand
+            })
+    
+    return {
+        'item': item,
+        'slug': routes.slugs[index],
+        'filepath': routes.output_path(index),
+        'page_url': routes.page_urls[index],
+        'brand_slug': routes.brand_slugs[index],
+        'brand_hub_url': routes.hub_urls[index],
+        'hero_image': routes.hero_url(index),
+        'template_name': template_name,
+        'related_pages': related_pages,
+        'custom_title': custom_title,
+        'custom_description': custom_description,
+    }
+
+
+def render_page_html(job, env, enriched_item):
+    """Render a planned page to an HTML string."""
+    return env.get_template(job['template_name']).render(
+        item=enriched_item,
+        related_pages=job['related_pages'],
+        now=datetime.datetime.now(),
+        custom_title=job['custom_title'],
+        custom_description=job['custom_description'],
+        analytics_id=GA_MEASUREMENT_ID,
+    )
+
+
+def render_page(job, env, enriched_item=None, timings=None):
+    """
+    Enrich the record, render the template and write one page (badges are written separately).
+    When a ChunkTimings is passed, render and write times are recorded for the build stats.
+    """
+    timings = timings or ChunkTimings()
+    if enriched_item is None:
+        with timings.measure('enrichment'):
+            enriched_item = build_enriched_payload(job['item'], **page_fields(job))
+
+    started = time.perf_counter()
+    with timings.measure('render'):
+        html_content = render_page_html(job, env, enriched_item)
+    timings.pages.add(job['slug'], (time.perf_counter() - started) * 1000)
+
+    with timings.measure('file writes'):
+        write_output(job['filepath'], html_content)
+
+
+def render_page_chunk(jobs, env=None):
+    """
+    Render a chunk of planned pages; runs inline or inside a pool worker.
+    Returns (pages rendered, timing stats for BuildProfiler.merge_chunk).
+    """
+    env = env or _WORKER_ENV
+    timings = ChunkTimings()
+    with timings.measure('enrichment'):
+        enriched_items = enrich_records([job['item'] for job in jobs], [page_fields(job) for job in jobs])
+    for job, enriched_item in zip(jobs, enriched_items):
+        render_page(job, env, enriched_item, timings)
+    return len(jobs), timings.as_stats()
+
+
+def generate_pages(data, env, manifest=None, mesh_index=None, routes=None, related=None, profiler=None,
+                   positions=None, buckets=None, links=None):
     """
     Generate HTML pages for each data item.
     Implements: Pagination Hashing + Spider Mesh + Content Salting
+
+    `data` may be any iterable of records (e.g. iter_records()) when `mesh_index`
+    and `related` (a related_links.RelatedIndex) are supplied; only the indexes are
+    kept in memory, full records are streamed.
+
+    When a BuildManifest is supplied, pages whose inputs (record, hero badge URL, related
+    links, salted title/description, template chain and config) are unchanged are skipped.
+    Salting and exploration links come from per-record streams (record_rng), so a page
+    only changes when its own record or the records it links to change.
+
+    Enrichment, render, file-write and badge-write timings go to `profiler`
+    (a build_profiler.BuildProfiler) when one is supplied.
+
+    `positions` limits planning to those record positions (a BuildScope) and `buckets` the
+    bucket indexes rewritten; `links`, when a dict, receives each planned page's link targets
+    (slug -> frozenset of hashed paths).
     """
     
-    total_items = len(data)
+    if mesh_index is None:
+        mesh_index = build_mesh_index(data)
+    if related is None and USE_SPIDER_MESH:
+        related = build_related_index(data, RANDOM_LINKS_PER_PAGE)
+    if routes is None:
+        routes = RouteTable.from_entries(mesh_index)
+    total_items = len(mesh_index)
     generated_count = 0
-
-    images_dir = ensure_images_dir()
+    skipped_count = 0
+    manifest = manifest or BuildManifest.load(enabled=False)
+    profiler = profiler or BuildProfiler(enabled=False)
+    config_hash = config_fingerprint()
+    template_hashes = {}
+
+    ensure_images_dir()
+    badges = BadgeWriter(manifest)
     
-    # Track files per hashed directory for optional directory index generation
-    subdir_pages = defaultdict(list)
+    created_dirs = set()
+
+    # Pages are planned serially and rendered in chunks, either inline or on a process
+    # pool when BUILD_WORKERS > 1.
+    workers = resolve_worker_count()
+    executor = None
+    in_flight = []
+    pending_chunk = []
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker)
+        print(f"[*] Parallel rendering: {workers} workers, chunks of {BUILD_CHUNK_SIZE} pages")
+
+    def collect(result):
+        rendered, stats = result
+        profiler.merge_chunk(stats)
+        return rendered
+
+    def dispatch(chunk):
+        """Render a chunk inline or queue it on the pool; returns pages finished so far."""
+        if executor is None:
+            return collect(render_page_chunk(chunk, env))
+        finished = 0
+        # Bound the number of queued chunks so planned jobs never pile up in memory.
+        while len(in_flight) >= workers * 2:
+            finished += collect(in_flight.pop(0).result())
+        in_flight.append(executor.submit(render_page_chunk, chunk))
+        return finished
     
     for index, item in enumerate(data):
-        slug = item.get('slug', f"page-{index}")
+        if (index + 1) % BUILD_PROGRESS_EVERY == 0:
+            print(f"[{index+1}/{total_items}] Generating pages...")
+        if positions is not None and index not in positions:
+            continue
         
         # ========================================
         # 🔥 OPTIMIZATION 1: PAGINATION HASHING
         # ========================================
-        hash_path = get_hash_path(slug)
-        
-        # Create subdirectory if using hashing
-        subdir = ''
-        if USE_PAGINATION_HASHING:
-            subdir = os.path.dirname(hash_path)
-            full_subdir = os.path.join(OUTPUT_DIR, subdir)
-            if not os.path.exists(full_subdir):
-                os.makedirs(full_subdir)
-        
-        filename = f"{hash_path}.html"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        
-        # ========================================
-        # 🔥 OPTIMIZATION 2: SPIDER MESH (Random Internal Linking)
-        # ========================================
-        related_pages = []
+        # Routes are precomputed once per build; no per-page hashing here.
+        subdir = routes.buckets[index]
+        if subdir and subdir not in created_dirs:
+            os.makedirs(os.path.join(OUTPUT_DIR, subdir), exist_ok=True)
+            created_dirs.add(subdir)
         
-        if USE_SPIDER_MESH:
-            # Random sampling for diverse internal linking
-            random_indices = random.sample(range(total_items), min(RANDOM_LINKS_PER_PAGE, total_items))
-            
-            for rand_idx in random_indices:
-                if rand_idx == index:  # Skip self-linking
-                    continue
-                related_item = data[rand_idx]
-                related_slug = related_item.get('slug', f"page-{rand_idx}")
-                related_hash_path = get_hash_path(related_slug)
-                
-                related_pages.append({
-                    'slug': related_hash_path,  # Use hashed path for correct URL
-                    'error_code': related_item.get('error_code'),
-                    'device_brand': related_item.get('device_brand')
-                })
-        else:
-            # Fallback: sequential linking
-            for i in range(1, 4):
-                related_idx = (index + i) % total_items
-                related_item = data[related_idx]
-                related_slug = related_item.get('slug', f"page-{related_idx}")
-                related_hash_path = get_hash_path(related_slug)
-                
-                related_pages.append({
-                    'slug': related_hash_path,
-                    'error_code': related_item.get('error_code'),
-                    'device_brand': related_item.get('device_brand')
-                })
-        
-        # ========================================
-        # 🔥 OPTIMIZATION 3: CONTENT SALTING
-        # ========================================
-        if USE_CONTENT_SALTING:
-            # Inject randomized title and description
-            title_template = get_random_title_template()
-            desc_template = get_random_description_template()
-            
-            custom_title = title_template.format(
-                code=item.get('error_code'),
-                brand=item.get('device_brand'),
-                device=item.get('device_type')
-            )
-            
-            custom_description = desc_template.format(
-                code=item.get('error_code'),
-                brand=item.get('device_brand'),
-                device=item.get('device_type'),
-                cost=item.get('estimated_cost')
-            )
-        else:
-            custom_title = None
-            custom_description = None
-        
-        # Select template variant (for advanced salting with multiple templates)
-        template_name = get_template_variant()
-        template = env.get_template(template_name)
+        filepath = routes.output_path(index)
         
+        # 🔥 OPTIMIZATIONS 2 + 3: spider mesh links and content salting (see plan_page)
+        job = plan_page(index, item, routes, mesh_index, related)
+        if links is not None:
+            links[job['slug']] = frozenset(page['slug'] for page in job['related_pages'])
+        template_name = job['template_name']
+        if template_name not in template_hashes:
+            template_hashes[template_name] = template_chain_hash(env, template_name)
+
+        page_digest = hash_inputs(
+            config_hash, template_hashes[template_name], item, job['hero_image'],
+            job['related_pages'], job['custom_title'], job['custom_description'],
+        )
+        badges.submit(routes.badge_output_path(index), routes.badge_digest(index), item)
+        manifest.record(filepath, page_digest)
+        if manifest.is_fresh(filepath, page_digest):
+            skipped_count += 1
+            continue
+
         # ========================================
         # RENDER THE PAGE
         # ========================================
-        print(f"[{generated_count+1}/{total_items}] Generating {filename}...")
-
-        hero_path = write_svg_badge(item, images_dir)
-        brand_slug = slugify(item.get('device_brand', '')) or 'brand'
-        item_with_hero = {
-            **item,
-            'hero_image': f"{BASE_URL}/{IMAGES_HASH_ROOT}/{slug}.svg",
-            'page_url': f"{BASE_URL}/{hash_path}.html",
-            'brand_slug': brand_slug,
-            'brand_hub_url': f"{BASE_URL}/{BRANDS_HASH_ROOT}/brands/{brand_slug}/",
-        }
-
-        enriched_item = build_enriched_payload(item_with_hero)
-
-        html_content = template.render(
-            item=enriched_item,
-            related_pages=related_pages,
-            now=datetime.datetime.now(),
-            custom_title=custom_title,
-            custom_description=custom_description,
-            analytics_id=GA_MEASUREMENT_ID,
-        )
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        if USE_PAGINATION_HASHING and subdir:
-            subdir_pages[subdir].append(os.path.basename(filename))
-
-        generated_count += 1
-
-    # Generate lightweight index.html files per hashed directory to prevent 404s
+        pending_chunk.append(job)
+        if len(pending_chunk) >= BUILD_CHUNK_SIZE:
+            generated_count += dispatch(pending_chunk)
+            pending_chunk = []
+
+    if pending_chunk:
+        generated_count += dispatch(pending_chunk)
+    if executor is not None:
+        generated_count += sum(collect(future.result()) for future in in_flight)
+        executor.shutdown()
+    badges.close()
+    profiler.add('badge writes', *badges.elapsed, calls=badges.written + badges.skipped)
+
+    if skipped_count:
+        print(f"[OK] Skipped {skipped_count} unchanged pages (incremental build)")
+    print(f"[OK] Hero badges: {badges.written} written, {badges.skipped} unchanged")
+
+    # Generate lightweight index pages per hashed directory to prevent 404s
     # when users manually browse to /<hash>/ or /<hash>/index.html.
     if USE_PAGINATION_HASHING:
-        for subdir, pages in subdir_pages.items():
-            index_path = os.path.join(OUTPUT_DIR, subdir, 'index.html')
-            # Redirect to the first page in the bucket and include a simple fallback list.
-            redirect_target = pages[0]
-            link_list = '\n'.join([f"        <li><a href=\"{p}\">{p}</a></li>" for p in pages])
-
-            index_html = f"""<!doctype html>
-<html lang=\"en\">
-<head>
-  <meta charset=\"utf-8\">
-  <meta http-equiv=\"refresh\" content=\"0; url={redirect_target}\">
-  <title>Redirecting...</title>
-</head>
-<body>
-  <p>If you are not redirected, open the guide here: <a href=\"{redirect_target}\">{redirect_target}</a>.</p>
-  <ul>
-{link_list}
-  </ul>
-</body>
-</html>
-"""
-
-            with open(index_path, 'w', encoding='utf-8') as index_file:
-                index_file.write(index_html)
+        write_bucket_indexes(routes, manifest, config_hash, buckets)
 
     return generated_count
 
 
-def generate_brand_hubs(data, env):
-    """Build hub pages per brand to mirror Hugo-style bundles and improve crawlability."""
+def bucket_index_name(page_number):
+    return 'index.html' if page_number == 1 else f"index-{page_number}.html"
+
+
+def remove_stale_index_pages(directory, page_count):
+    """Delete index-N.html pages beyond `page_count` left over from a larger previous build."""
+    stale_number = page_count + 1
+    while os.path.exists(os.path.join(directory, bucket_index_name(stale_number))):
+        remove_output(os.path.join(directory, bucket_index_name(stale_number)))
+        stale_number += 1
+
+
+def write_bucket_index_page(path, bucket, names, page_number, page_count):
+    """Stream one bucket index page to disk; returns True when its bytes changed."""
+    with AtomicOutput(path) as out:
+        write_bucket_index_html(out, bucket, names, page_number, page_count)
+    return out.changed
+
+
+def write_bucket_index_html(out, bucket, names, page_number, page_count):
+    """Write one bucket index page to `out`: page 1 redirects to the bucket's first guide, all pages list guides."""
+    out.write('<!doctype html>\n<html lang="en">\n<head>\n  <meta charset="utf-8">\n')
+    if page_number == 1:
+        out.write(f'  <meta http-equiv="refresh" content="0; url={names[0]}">\n'
+                  '  <title>Redirecting...</title>\n</head>\n<body>\n'
+                  f'  <p>If you are not redirected, open the guide here: <a href="{names[0]}">{names[0]}</a>.</p>\n')
+    else:
+        out.write(f'  <title>Guides in /{bucket}/ (page {page_number} of {page_count})</title>\n'
+                  '</head>\n<body>\n')
+    out.write('  <ul>\n')
+    for name in names:
+        out.write(f'        <li><a href="{name}">{name}</a></li>\n')
+    out.write('  </ul>\n')
+    if page_count > 1:
+        links = []
+        if page_number > 1:
+            links.append(f'<a href="{bucket_index_name(page_number - 1)}" rel="prev">Previous</a>')
+        if page_number < page_count:
+            links.append(f'<a href="{bucket_index_name(page_number + 1)}" rel="next">Next</a>')
+        out.write(f'  <p>Page {page_number} of {page_count}: {" | ".join(links)}</p>\n')
+    out.write('</body>\n</html>\n')
+
+
+def write_bucket_indexes(routes, manifest, config_hash, buckets=None):
+    """
+    Write paginated index pages (index.html, index-2.html, ...) for every hash bucket,
+    or only for `buckets` when given. Buckets are walked from the route table in dataset
+    order, each page lists at most BUCKET_INDEX_PAGE_SIZE guides and is streamed to disk,
+    and pages left over from a previously larger bucket are removed.
+    """
+    bucket_of = routes.buckets.__getitem__
+    sizes = defaultdict(int)
+    for bucket in routes.buckets:
+        sizes[bucket] += 1
+
+    written = 0
+    positions = sorted(range(len(routes)), key=bucket_of)
+    for bucket, bucket_positions in itertools.groupby(positions, key=bucket_of):
+        if not bucket or (buckets is not None and bucket not in buckets):
+            continue
+        bucket_dir = os.path.join(OUTPUT_DIR, *bucket.split('/'))
+        page_count = -(-sizes[bucket] // BUCKET_INDEX_PAGE_SIZE)
+        for page_number in range(1, page_count + 1):
+            names = [routes.page_paths[position].rsplit('/', 1)[-1]
+                     for position in itertools.islice(bucket_positions, BUCKET_INDEX_PAGE_SIZE)]
+            index_path = os.path.join(bucket_dir, bucket_index_name(page_number))
+            index_digest = hash_inputs(config_hash, names, page_number, page_count)
+            manifest.record(index_path, index_digest)
+            if manifest.is_fresh(index_path, index_digest):
+                continue
+            written += write_bucket_index_page(index_path, bucket, names, page_number, page_count)
+
+        remove_stale_index_pages(bucket_dir, page_count)
+
+    print(f"[OK] Bucket indexes: {len(sizes)} buckets, {written} pages written")
+    return written
+
+
+def hub_page_url(hub_url, page_number):
+    """URL of page `page_number` of a hub whose first page is the directory URL `hub_url`."""
+    return hub_url if page_number == 1 else f"{hub_url}{bucket_index_name(page_number)}"
+
+
+def render_hub_chunk(jobs, env=None):
+    """Render a chunk of planned hub pages; runs inline or inside a pool worker."""
+    env = env or _WORKER_ENV
     template = env.get_template('brand_hub.html')
-    hubs = []
-
-    grouped = defaultdict(list)
-    for item in data:
-        grouped[item.get('device_brand', 'Other')].append(item)
-
-    for brand, items in grouped.items():
-        brand_slug = slugify(brand) or 'brand'
-        hub_dir = os.path.join(OUTPUT_DIR, BRANDS_HASH_ROOT, 'brands', brand_slug)
-        os.makedirs(hub_dir, exist_ok=True)
-
-        hub_entries = []
-        for entry in items:
-            slug = entry.get('slug')
-            hash_path = get_hash_path(slug)
-            hub_entries.append({
-                'error_code': entry.get('error_code'),
-                'device_type': entry.get('device_type'),
-                'severity': entry.get('severity'),
-                'url': f"{BASE_URL}/{hash_path}.html".replace('\\', '/'),
-            })
-
-        html_content = template.render(
-            brand=brand,
-            brand_slug=brand_slug,
-            entries=hub_entries,
-            total=len(hub_entries),
-            base_url=BASE_URL,
-            analytics_id=GA_MEASUREMENT_ID,
-        )
-
-        output_path = os.path.join(hub_dir, 'index.html')
-        with open(output_path, 'w', encoding='utf-8') as hub_file:
-            hub_file.write(html_content)
+    for job in jobs:
+        write_output(job['path'], template.render(**job['context']))
+    return len(jobs)
+
+
+def brand_hub_sections(dataset, brand):
+    """
+    Hub sections of one brand as (device_type, directory, url, positions): the brand hub
+    (device_type None) first, then one sub-hub per device type. Also returns the sub-hub
+    links shown on the brand hub.
+    """
+    routes, records = dataset.routes, dataset.records
+    brand_slug, hub_url = routes.brand_route(brand)
+    hub_dir = os.path.join(OUTPUT_DIR, BRANDS_HASH_ROOT, 'brands', brand_slug)
+    positions = dataset.by_brand[brand]
+
+    by_device = defaultdict(list)
+    for position in positions:
+        by_device[records[position].get('device_type', 'Other')].append(position)
+    sections = [(None, hub_dir, hub_url, positions)]
+    devices = []
+    for device_type in sorted(by_device):
+        device_slug = RouteTable.device_route(device_type)[0]
+        device_url = f"{hub_url}{device_slug}/"
+        sections.append((device_type, os.path.join(hub_dir, device_slug), device_url, by_device[device_type]))
+        devices.append({'name': device_type, 'url': device_url, 'count': len(by_device[device_type])})
+    return sections, devices
+
+
+def hub_page_count(section):
+    return -(-len(section[3]) // HUB_PAGE_SIZE)
+
+
+def hub_page_context(dataset, brand, section, devices, page_number):
+    """Template context for page `page_number` of a hub section."""
+    routes, records = dataset.routes, dataset.records
+    brand_slug, hub_url = routes.brand_route(brand)
+    device_type, _, section_url, section_positions = section
+    page_count = hub_page_count(section)
+    page = section_positions[(page_number - 1) * HUB_PAGE_SIZE:page_number * HUB_PAGE_SIZE]
+    return {
+        'brand': brand,
+        'brand_slug': brand_slug,
+        'brand_hub_url': hub_url,
+        'device': device_type,
+        'scope': f"{brand} {device_type}" if device_type else brand,
+        'devices': devices if device_type is None else [],
+        # Only the card fields a hub needs
+        'entries': [
+            {
+                'error_code': records[position].get('error_code'),
+                'device_type': records[position].get('device_type'),
+                'severity': records[position].get('severity'),
+                'url': routes.page_urls[position],
+            }
+            for position in page
+        ],
+        'total': len(section_positions),
+        'page_number': page_number,
+        'page_count': page_count,
+        'prev_url': hub_page_url(section_url, page_number - 1) if page_number > 1 else None,
+        'next_url': hub_page_url(section_url, page_number + 1) if page_number < page_count else None,
+        'base_url': BASE_URL,
+        'analytics_id': GA_MEASUREMENT_ID,
+    }
 
-        hubs.append({
-            'brand': brand,
-            'slug': brand_slug,
-            'url': f"{BASE_URL}/{BRANDS_HASH_ROOT}/brands/{brand_slug}/",
-            'count': len(hub_entries),
-        })
 
-    print(f"[OK] Generated {len(hubs)} brand hubs")
+def generate_brand_hubs(data, env, manifest=None, brands=None):
+    """
+    Build hub pages per brand to mirror Hugo-style bundles and improve crawlability.
+    Each brand hub (brands/<brand>/) and its per-device sub-hubs (brands/<brand>/<device>/)
+    are paginated at HUB_PAGE_SIZE guides (index.html, index-2.html, ...). Pages are planned
+    serially and the stale ones rendered in chunks on the BUILD_WORKERS process pool.
+    With `brands`, only those brands' hubs are planned; the others are just listed.
+    Returns one entry per hub page, for the sitemap and page manifest.
+    """
+    hubs = []
+    jobs = []
+    manifest = manifest or BuildManifest.load(enabled=False)
+    hub_inputs_hash = hash_inputs(config_fingerprint(), template_chain_hash(env, 'brand_hub.html'))
+    dataset = as_dataset(data)
+
+    for brand in dataset.by_brand:
+        sections, devices = brand_hub_sections(dataset, brand)
+        planned = brands is None or brand in brands
+        for section in sections:
+            device_type, section_dir, section_url, section_positions = section
+            page_count = hub_page_count(section)
+            for page_number in range(1, page_count + 1):
+                output_path = os.path.join(section_dir, bucket_index_name(page_number))
+                if planned:
+                    context = hub_page_context(dataset, brand, section, devices, page_number)
+                    hub_digest = hash_inputs(hub_inputs_hash, context)
+                    manifest.record(output_path, hub_digest)
+                    if not manifest.is_fresh(output_path, hub_digest):
+                        jobs.append({'path': output_path, 'context': context})
+
+                hubs.append({
+                    'brand': brand,
+                    'device': device_type,
+                    'slug': RouteTable.brand_slug(brand),
+                    'url': hub_page_url(section_url, page_number),
+                    'path': output_path,
+                    'page': page_number,
+                    'count': len(section_positions),
+                })
+            if planned:
+                remove_stale_index_pages(section_dir, page_count)
+        if not planned:
+            continue
+
+        # Sub-hubs of device types the brand no longer has
+        hub_dir = sections[0][1]
+        device_dirs = {os.path.basename(section[1]) for section in sections[1:]}
+        if os.path.isdir(hub_dir):
+            for name in os.listdir(hub_dir):
+                if os.path.isdir(os.path.join(hub_dir, name)) and name not in device_dirs:
+                    shutil.rmtree(os.path.join(hub_dir, name))
+
+    workers = resolve_worker_count()
+    chunks = [jobs[i:i + BUILD_CHUNK_SIZE] for i in range(0, len(jobs), BUILD_CHUNK_SIZE)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as executor:
+            rendered_count = sum(executor.map(render_hub_chunk, chunks))
+    else:
+        rendered_count = sum(render_hub_chunk(chunk, env) for chunk in chunks)
+
+    print(f"[OK] Generated {len(dataset.by_brand)} brand hubs, {len(hubs)} hub pages ({rendered_count} re-rendered)")
     return hubs
 
-def generate_sitemap(data, hubs=None):
+class SitemapWriter:
     """
-    Generate sitemap.xml for Google Search Console.
-    Respects pagination hashing for URLs.
+    Streams <url> entries into gzip-compressed sitemap shards, rotating to a new shard at
+    SITEMAP_MAX_URLS entries or SITEMAP_MAX_BYTES uncompressed bytes, or when the shard
+    group changes (one group per hash bucket with SITEMAP_SHARD_BY_BUCKET=1).
+    Shards are gzipped with mtime=0 so unchanged shards are byte-identical and not rewritten.
     """
-    sitemap_path = os.path.join(OUTPUT_DIR, 'sitemap.xml')
-    root = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    
-    for item in data:
-        slug = item.get('slug')
-        hash_path = get_hash_path(slug)
-        
-        # URL must reflect the hashed path structure
-        # Fix: Convert Windows backslashes to forward slashes for URLs
-        url = f"{BASE_URL}/{hash_path}.html".replace('\\', '/')
-        lastmod = datetime.date.today().isoformat()
-        
-        entry = f"""  <url>
-    <loc>{url}</loc>
-    <lastmod>{lastmod}</lastmod>
-    <changefreq>monthly</changefreq>
-    <priority>0.8</priority>
-  </url>\n"""
-        root += entry
-        
+
+    HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    FOOTER = b'</urlset>\n'
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or OUTPUT_DIR
+        self.shards = []  # (filename, url count, newest lastmod, group)
+        self.group_counts = defaultdict(int)
+        self.changed = 0
+        self._output = None
+        self._gzip = None
+        self._group = None
+
+    def _shard_name(self, group):
+        self.group_counts[group] += 1
+        number = self.group_counts[group]
+        if group is None:
+            return f"sitemap-{number}.xml.gz"
+        group = group.replace('/', '-')
+        return f"sitemap-{group}.xml.gz" if number == 1 else f"sitemap-{group}-{number}.xml.gz"
+
+    def _open(self, group):
+        self._close()
+        name = self._shard_name(group)
+        self._output = AtomicOutput(os.path.join(self.output_dir, name)).__enter__()
+        self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._output, mtime=0)
+        self._gzip.write(self.HEADER)
+        self._group = group
+        self._count = 0
+        self._bytes = len(self.HEADER)
+        self._lastmod = ''
+        self._name = name
+
+    def _close(self):
+        if self._output is None:
+            return
+        self._gzip.write(self.FOOTER)
+        self._gzip.close()
+        self._output.__exit__(None, None, None)
+        self.changed += self._output.changed
+        self.shards.append((self._name, self._count, self._lastmod, self._group))
+        self._output = None
+
+    def keep(self, shards):
+        """List shards written by an earlier build (left untouched on disk) at this point of the index."""
+        self._close()
+        self._group = None
+        self.shards.extend(shards)
+
+    def add(self, url, lastmod, changefreq, priority, group=None):
+        entry = (
+            f"  <url>\n    <loc>{xml_escape(url)}</loc>\n    <lastmod>{lastmod}</lastmod>\n"
+            f"    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n"
+        ).encode('utf-8')
+        if (self._output is None or group != self._group or self._count >= SITEMAP_MAX_URLS
+                or self._bytes + len(entry) + len(self.FOOTER) > SITEMAP_MAX_BYTES):
+            self._open(group)
+        self._gzip.write(entry)
+        self._count += 1
+        self._bytes += len(entry)
+        self._lastmod = max(self._lastmod, lastmod)
+
+    def close(self):
+        """Finish the last shard and remove shards (and the legacy sitemap.xml) not written this build."""
+        self._close()
+        written = {shard[0] for shard in self.shards}
+        for name in os.listdir(self.output_dir):
+            stale_shard = name.startswith('sitemap-') and name.endswith('.xml.gz') and name not in written
+            if stale_shard or name == 'sitemap.xml':
+                os.remove(os.path.join(self.output_dir, name))
+        return self.shards
+
+
+def generate_sitemap(data, hubs=None, manifest=None, groups=None, previous_shards=None):
+    """
+    Generate gzip sitemap shards plus sitemap_index.xml for Google Search Console.
+    URLs come from the dataset's route table; each <lastmod> is the date the page's
+    inputs last changed according to the build manifest.
+
+    With SITEMAP_SHARD_BY_BUCKET, `groups` limits the rewrite to those shard groups; the
+    others are listed from `previous_shards` (what the last call returned). Returns the shards.
+    """
+    routes = as_dataset(data).routes
+    manifest = manifest or BuildManifest.load(enabled=False)
     hubs = hubs or []
 
+    positions = range(len(routes))
+    if SITEMAP_SHARD_BY_BUCKET:
+        positions = sorted(positions, key=routes.buckets.__getitem__)
+
+    kept = defaultdict(list)
+    for shard in previous_shards or ():
+        kept[shard[3]].append(shard)
+    if not SITEMAP_SHARD_BY_BUCKET or groups is None \
+            or not set(routes.buckets) <= set(groups) | set(kept):
+        groups = None
+
+    writer = SitemapWriter()
+    for position in positions:
+        group = routes.buckets[position] if SITEMAP_SHARD_BY_BUCKET else None
+        if groups is not None and group not in groups:
+            writer.keep(kept.pop(group, ()))
+            continue
+        # URL must reflect the hashed path structure (RouteTable always uses forward slashes)
+        writer.add(
+            routes.page_urls[position],
+            manifest.lastmod_for(routes.output_path(position)),
+            'monthly', '0.8',
+            group=group,
+        )
     for hub in hubs:
-        entry = f"""  <url>
-    <loc>{hub['url']}</loc>
-    <lastmod>{datetime.date.today().isoformat()}</lastmod>
-    <changefreq>weekly</changefreq>
-    <priority>0.6</priority>
-  </url>\n"""
-        root += entry
-
-    root += '</urlset>'
-    
-    with open(sitemap_path, 'w', encoding='utf-8') as f:
-        f.write(root)
-    print(f"[OK] Generated sitemap.xml with {len(data) + len(hubs)} URLs")
+        writer.add(
+            hub['url'],
+            manifest.lastmod_for(hub['path']) if 'path' in hub else manifest.today,
+            'weekly', '0.6',
+            group=BRANDS_HASH_ROOT if SITEMAP_SHARD_BY_BUCKET else None,
+        )
+    shards = writer.close()
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for name, _, lastmod, _ in shards:
+        lines.append(f"  <sitemap>\n    <loc>{BASE_URL}/{name}</loc>\n    <lastmod>{lastmod}</lastmod>\n  </sitemap>")
+    lines.append('</sitemapindex>\n')
+    write_output(os.path.join(OUTPUT_DIR, SITEMAP_INDEX_FILE), '\n'.join(lines))
+
+    url_count = sum(shard[1] for shard in shards)
+    print(f"[OK] Generated {SITEMAP_INDEX_FILE} with {len(shards)} shards, {url_count} URLs "
+          f"({writer.changed} shards changed)")
+    return shards
 
 def generate_robots():
     """
@@ -650,7 +2178,7 @@ User-agent: *
 Allow: /
 
 # Sitemaps
-Sitemap: {BASE_URL}/sitemap.xml
+Sitemap: {BASE_URL}/{SITEMAP_INDEX_FILE}
 
 # Crawl-delay for aggressive bots
 User-agent: AhrefsBot
@@ -683,8 +2211,7 @@ User-agent: Baiduspider
 Allow: /
 """
     
-    with open(robots_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_output(robots_path, content)
     print(f"[OK] Generated robots.txt")
 
 
@@ -694,8 +2221,7 @@ def write_cname():
         return
 
     cname_path = os.path.join(OUTPUT_DIR, 'CNAME')
-    with open(cname_path, 'w', encoding='utf-8') as cname_file:
-        cname_file.write(CUSTOM_DOMAIN.strip())
+    write_output(cname_path, CUSTOM_DOMAIN.strip())
     print(f"[OK] Wrote CNAME for custom domain: {CUSTOM_DOMAIN}")
 
 
@@ -710,55 +2236,283 @@ def write_page_manifest(data, hubs=None):
         "",
     ]
 
+    dataset = as_dataset(data)
+
     lines = []
-    for item in data:
-        slug = item.get('slug')
+    for item, url in zip(dataset.records, dataset.routes.page_urls):
         label = f"{item.get('device_brand')} {item.get('device_type')}".strip()
-        hash_path = get_hash_path(slug)
-        url = f"{BASE_URL}/{hash_path}.html".replace('\\', '/')
         lines.append(f"{item.get('error_code')} | {label} | {url}")
 
     if hubs:
         lines.append("")
         lines.append("# Brand hubs")
         for hub in hubs:
-            lines.append(f"{hub['brand']} | {hub['count']} guides | {hub['url']}")
+            label = f"{hub['brand']} {hub['device']}" if hub.get('device') else hub['brand']
+            if hub.get('page', 1) > 1:
+                label += f" (page {hub['page']})"
+            lines.append(f"{label} | {hub['count']} guides | {hub['url']}")
 
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(header + lines))
+    write_output(manifest_path, '\n'.join(header + lines))
     print(f"[OK] Wrote page manifest with {len(lines)} entries to {manifest_path}")
 
 
-def main():
-    print("=" * 60)
-    print(">>> pSEO CHINA TECH FACTORY - STARTING BUILD")
-    print("=" * 60)
-    print(f"[*] Pagination Hashing: {'ENABLED' if USE_PAGINATION_HASHING else 'DISABLED'}")
-    print(f"[*] Spider Mesh Linking: {'ENABLED' if USE_SPIDER_MESH else 'DISABLED'}")
-    print(f"[*] Content Salting: {'ENABLED' if USE_CONTENT_SALTING else 'DISABLED'}")
-    print("=" * 60)
-    
-    ensure_output_dir()
-    
-    data = load_data()
-    print(f"[>] Loaded {len(data)} records from {DATA_FILE}")
-    
-    env = setup_environment()
-    
-    random.seed(BUILD_SEED)
+def write_cache_headers():
+    """
+    Write CACHE_HEADERS_FILE for static hosts: fingerprinted assets are cached for a year as
+    immutable, pages and sitemaps get a short max-age and revalidate (the host supplies ETags).
+    """
+    if not CACHE_HEADERS_FILE:
+        return
+    policies = (
+        (IMMUTABLE_URL_PATTERNS, 'public, max-age=31536000, immutable'),
+        (REVALIDATED_URL_PATTERNS, f"public, max-age={HTML_MAX_AGE}, must-revalidate"),
+    )
+    lines = [
+        "# FixHub cache headers (generated)",
+        "# Fingerprinted assets never change under the same URL; pages and sitemaps revalidate.",
+    ]
+    for patterns, cache_control in policies:
+        for pattern in patterns:
+            lines += [pattern, f"  Cache-Control: {cache_control}"]
+
+    headers_path = os.path.join(OUTPUT_DIR, CACHE_HEADERS_FILE)
+    write_output(headers_path, '\n'.join(lines) + '\n')
+    print(f"[OK] Wrote {sum(len(patterns) for patterns, _ in policies)} cache header rules to {headers_path}")
+
+
+def write_build_stats(profiler):
+    """Write the profiler report to output/build_stats.json and print the slowest phases."""
+    report = profiler.report()
+    stats_path = os.path.join(OUTPUT_DIR, BUILD_STATS_FILE)
+    write_output(stats_path, json.dumps(report, indent=2) + '\n')
+    slowest = sorted(report['phases'].items(), key=lambda pair: pair[1]['wall_s'], reverse=True)[:3]
+    summary = ', '.join(f"{name} {entry['wall_s']:.2f}s" for name, entry in slowest)
+    print(f"[OK] Wrote build stats to {stats_path} ({report['total']['wall_s']:.2f}s total; {summary})")
+
+
+BUCKET_INDEX_NAME = re.compile(r'index(-\d+)?\.html')
+
+
+class BuildScope:
+    """
+    The slice of the catalogue a record-level rebuild (watch mode) plans: page positions,
+    brands whose hubs, device types whose listings and hash buckets whose indexes are
+    rewritten. `keys` are outputs of the edited records' previous routes; those keys, the
+    scoped brands' hub pages and the scoped buckets' index pages are pruned when not re-recorded.
+    """
+
+    def __init__(self, positions=(), brands=(), devices=(), buckets=(), keys=()):
+        self.positions = frozenset(positions)
+        self.brands = frozenset(brands)
+        self.devices = frozenset(devices)
+        self.buckets = frozenset(buckets)
+        self.keys = frozenset(keys)
+        self.hub_roots = tuple(f"{BRANDS_HASH_ROOT}/brands/{RouteTable.brand_slug(brand)}/" for brand in self.brands)
+
+    def owns(self, key):
+        if key in self.keys or key.startswith(self.hub_roots):
+            return True
+        bucket, _, name = key.rpartition('/')
+        return bool(bucket) and bucket in self.buckets and BUCKET_INDEX_NAME.fullmatch(name) is not None
+
+
+class BuildContext:
+    """State one build shares across its pipeline steps."""
+
+    def __init__(self, dataset, env, manifest, profiler, output_dir):
+        self.dataset = dataset
+        self.env = env
+        self.manifest = manifest
+        self.profiler = profiler
+        self.output_dir = output_dir
+        self.related = None
+        self.hubs = []
+        self.pages_rendered = 0
+        self.steps = []
+        self.scope = None            # BuildScope of a record-level rebuild; None builds everything
+        self.page_links = None       # dict filled with each planned page's links (watch mode)
+        self.sitemap_shards = None
+
+
+def styles_step(ctx):
+    stylesheet = ctx.env.globals['stylesheet']
+    changed = write_stylesheet(stylesheet)
+    print(f"[OK] Stylesheet {stylesheet.path} ({len(stylesheet.css)} bytes, "
+          f"{len(stylesheet.critical)} inlined){'' if changed else ' unchanged'}")
+
+
+def related_links_step(ctx):
+    if USE_SPIDER_MESH:
+        ctx.related = build_related_index(
+            ctx.dataset.records, RANDOM_LINKS_PER_PAGE, load_vocabulary(RELATED_VOCABULARY_FILE),
+        )
+
+
+def pages_step(ctx):
+    dataset = ctx.dataset
+    scope = ctx.scope
+    ctx.pages_rendered = generate_pages(
+        dataset.records, ctx.env, ctx.manifest, dataset.mesh_index, dataset.routes, ctx.related, ctx.profiler,
+        positions=scope and scope.positions, buckets=scope and scope.buckets, links=ctx.page_links,
+    )
+    print(f"\n[OK] Successfully generated {ctx.pages_rendered} pages.")
+
+
+def brand_hubs_step(ctx):
+    ctx.hubs = generate_brand_hubs(ctx.dataset, ctx.env, ctx.manifest, ctx.scope and ctx.scope.brands)
 
-    count = generate_pages(data, env)
-    print(f"\n[OK] Successfully generated {count} pages.")
 
-    hubs = generate_brand_hubs(data, env)
+def sitemap_step(ctx):
+    groups = None
+    if ctx.scope is not None:
+        # Shard groups whose URLs or <lastmod> dates can have moved
+        buckets = ctx.dataset.routes.buckets
+        groups = ctx.scope.buckets | {buckets[position] for position in ctx.scope.positions} | {BRANDS_HASH_ROOT}
+    ctx.sitemap_shards = generate_sitemap(ctx.dataset, ctx.hubs, ctx.manifest, groups, ctx.sitemap_shards)
 
-    generate_sitemap(data, hubs)
+
+def robots_step(ctx):
     generate_robots()
     write_cname()
-    write_page_manifest(data, hubs)
+
+
+def headers_step(ctx):
+    write_cache_headers()
+
+
+def prune_stale_outputs(manifest, scope=None):
+    """
+    Delete every output the previous build recorded that this one did not: pages and badges
+    of removed records, superseded badge fingerprints, bucket indexes and hub pages of emptied
+    buckets and brands, plus the directories they leave empty. A scoped build only prunes the
+    keys its BuildScope owns and forgets them. Returns how many were dropped.
+    """
+    stale = manifest.stale_keys()
+    if scope is not None:
+        stale = [key for key in stale if scope.owns(key)]
+        manifest.forget(stale)
+    output_root = os.path.abspath(OUTPUT_DIR)
+    for key in stale:
+        path = os.path.join(OUTPUT_DIR, *key.split('/'))
+        remove_output(path)
+        directory = os.path.dirname(path)
+        while os.path.abspath(directory) != output_root and os.path.isdir(directory) \
+                and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+    return len(stale)
+
+
+def manifest_step(ctx):
+    write_page_manifest(ctx.dataset, ctx.hubs)
+    scoped = ctx.scope is not None
+    # A partial build only recorded some outputs, so it keeps the rest; a scoped one still prunes what it owns
+    partial = scoped or not set(MANIFEST_STEPS) <= set(ctx.steps)
+    if scoped or not partial:
+        print(f"[OK] Removed {prune_stale_outputs(ctx.manifest, ctx.scope)} stale outputs")
+    ctx.manifest.save(keep_previous=partial)
+
+
+# Pipeline steps by name. Each takes the BuildContext; "module:function" entries are
+# imported on first use so companion scripts plug in without an import cycle.
+PIPELINE_STEPS = {
+    'related_links': related_links_step,
+    'styles': styles_step,
+    'pages': pages_step,
+    'brand_hubs': brand_hubs_step,
+    'index': 'generate_index:index_step',
+    'sitemap': sitemap_step,
+    'robots': robots_step,
+    'outreach': 'generate_backlinks_plan:outreach_step',
+    'headers': headers_step,
+    'manifest': manifest_step,
+}
+
+# Steps whose outputs are tracked in the build manifest
+MANIFEST_STEPS = ('pages', 'brand_hubs')
+
+# Steps run in order by build_site (BUILD_STEPS=pages,brand_hubs,sitemap,manifest for a partial run)
+BUILD_STEPS = [name.strip() for name in os.getenv('BUILD_STEPS', ','.join(PIPELINE_STEPS)).split(',') if name.strip()]
+
+
+def resolve_step(name):
+    """Return the callable registered for pipeline step `name`."""
+    step = PIPELINE_STEPS.get(name)
+    if step is None:
+        raise ValueError(f"Unknown build step: {name} (available: {', '.join(PIPELINE_STEPS)})")
+    if isinstance(step, str):
+        module_name, function_name = step.split(':')
+        step = PIPELINE_STEPS[name] = getattr(importlib.import_module(module_name), function_name)
+    return step
+
+
+def run_steps(ctx, steps):
+    """Run the named pipeline steps in order against `ctx`, each timed as a profiler phase."""
+    ctx.steps = list(steps)
+    for name in ctx.steps:
+        step = resolve_step(name)
+        with ctx.profiler.phase(name.replace('_', ' ')):
+            step(ctx)
+
+
+def build_site(previous_dir=None, steps=None):
+    """
+    Parse the dataset once and run every pipeline step (BUILD_STEPS) into OUTPUT_DIR.
+    `previous_dir` is the last build's directory when staging (unchanged outputs are
+    hardlinked from it).
+    """
+    profiler = BuildProfiler()
+    ensure_output_dir()
+
+    with profiler.phase('load'):
+        dataset = Dataset.load()
+    print(f"[>] Loaded {len(dataset)} records from {DATA_FILE}")
+
+    with profiler.phase('templates'):
+        env = setup_environment()
+    manifest = BuildManifest.load(previous_dir=previous_dir)
+    print(f"[*] Incremental Build: {'ENABLED' if manifest.enabled else 'DISABLED'}")
+
+    ctx = BuildContext(dataset, env, manifest, profiler, OUTPUT_DIR)
+    run_steps(ctx, steps or BUILD_STEPS)
+
+    profiler.meta.update({
+        'records': len(dataset),
+        'pages_rendered': ctx.pages_rendered,
+        'workers': resolve_worker_count(),
+        'incremental': manifest.enabled,
+        'steps': ctx.steps,
+    })
+    write_build_stats(profiler)
+
+
+def main():
+    print("=" * 60)
+    print(">>> pSEO CHINA TECH FACTORY - STARTING BUILD")
+    print("=" * 60)
+    print(f"[*] Pagination Hashing: {'ENABLED' if USE_PAGINATION_HASHING else 'DISABLED'}")
+    print(f"[*] Spider Mesh Linking: {'ENABLED' if USE_SPIDER_MESH else 'DISABLED'}")
+    print(f"[*] Content Salting: {'ENABLED' if USE_CONTENT_SALTING else 'DISABLED'}")
+    print("=" * 60)
+    
+    staged = StagedOutput().begin() if STAGED_BUILD else None
+    if staged:
+        print(f"[*] Staged Build: writing to {staged.stage_dir}")
+    try:
+        build_site(staged.previous_dir if staged else None)
+    except BaseException:
+        if staged:
+            staged.abort()
+            print(f"[!] Build failed; {staged.live_dir}/ left untouched")
+        raise
+    if staged:
+        staged.commit()
+        print(f"[OK] Swapped {staged.live_dir} -> {staged.stage_dir}")
     print("=" * 60)
     print(">>> BUILD COMPLETE <<<")
     print("=" * 60)
 
 if __name__ == "__main__":
+    # Steps imported from companion scripts do `from build import ...`; let them share this module.
+    sys.modules.setdefault('build', sys.modules[__name__])
     main()
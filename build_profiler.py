@@ -0,0 +1,197 @@
+"""
+Build instrumentation: per-phase wall/CPU time and peak memory, plus a per-page
+render-time histogram, written to output/build_stats.json by build.py.
+
+Environment switches:
+  BUILD_TRACEMALLOC=1  also record Python heap peaks per phase (slower builds)
+  BUILD_PROFILE=1      dump a cProfile file per top-level phase into BUILD_PROFILE_DIR
+"""
+
+import cProfile
+import datetime
+import heapq
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACEMALLOC_ENABLED = os.getenv('BUILD_TRACEMALLOC', '0').strip() == '1'
+CPROFILE_ENABLED = os.getenv('BUILD_PROFILE', '0').strip() == '1'
+PROFILE_DIR = os.getenv('BUILD_PROFILE_DIR', 'build_profiles')
+
+# Upper bounds (ms) of the per-page render histogram buckets
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SLOWEST_PAGES = 20
+
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident set size of this process so far, in MB (None where unsupported).
+    With children=True: the largest peak among its terminated child processes (pool workers).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    divisor = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+    return round(peak / divisor, 2)
+
+
+class PageTimings:
+    """Render-time histogram and slowest-slug heap; cheap to merge across pool workers."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.slowest = []
+
+    def add(self, slug, ms):
+        self.count += 1
+        self.total_ms += ms
+        for position, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if ms <= bound:
+                self.buckets[position] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        entry = (ms, slug)
+        if len(self.slowest) < SLOWEST_PAGES:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        for entry in other.slowest:
+            if len(self.slowest) < SLOWEST_PAGES:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def report(self):
+        labels = [f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'histogram_ms': dict(zip(labels, self.buckets)),
+            'slowest': [
+                {'slug': slug, 'ms': round(ms, 3)}
+                for ms, slug in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+class BuildProfiler:
+    """Collects phase measurements for one build. A disabled profiler records nothing."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = {}
+        self.pages = PageTimings()
+        self.meta = {}
+        self.worker_peak_rss_mb = None
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        if enabled and TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _entry(self, name):
+        return self.phases.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+
+    @contextmanager
+    def phase(self, name):
+        """Time a top-level build phase (wall, CPU, peak RSS, optional heap peak/cProfile)."""
+        if not self.enabled:
+            yield
+            return
+        profile = cProfile.Profile() if CPROFILE_ENABLED else None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profile.dump_stats(os.path.join(PROFILE_DIR, f"{name.replace(' ', '_')}.prof"))
+            entry = self._entry(name)
+            entry['wall_s'] += time.perf_counter() - wall
+            entry['cpu_s'] += time.process_time() - cpu
+            entry['calls'] += 1
+            entry['peak_rss_mb'] = peak_rss_mb()
+            if tracemalloc.is_tracing():
+                entry['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+
+    def add(self, name, wall_s, cpu_s=0.0, calls=1):
+        """Accumulate a sub-phase measured elsewhere (inside the page loop or a pool worker)."""
+        if not self.enabled:
+            return
+        entry = self._entry(name)
+        entry['wall_s'] += wall_s
+        entry['cpu_s'] += cpu_s
+        entry['calls'] += calls
+
+    def merge_chunk(self, stats):
+        """Fold the timings returned by one render chunk into the build totals."""
+        if not self.enabled or not stats:
+            return
+        for name, (wall_s, cpu_s, calls) in stats['phases'].items():
+            self.add(name, wall_s, cpu_s, calls)
+        self.pages.merge(stats['pages'])
+        if stats['pid'] != os.getpid() and stats['peak_rss_mb'] is not None:
+            self.worker_peak_rss_mb = max(self.worker_peak_rss_mb or 0, stats['peak_rss_mb'])
+
+    def report(self):
+        phases = {
+            name: {key: round(value, 4) if isinstance(value, float) else value
+                   for key, value in entry.items()}
+            for name, entry in self.phases.items()
+        }
+        return {
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            **self.meta,
+            'total': {
+                'wall_s': round(time.perf_counter() - self._started, 4),
+                'cpu_s': round(time.process_time() - self._cpu_started, 4),
+                'peak_rss_mb': peak_rss_mb(),
+                # Render pool workers: live peak reported with each chunk, and reaped children
+                'peak_rss_workers_mb': self.worker_peak_rss_mb,
+                'peak_rss_children_mb': peak_rss_mb(children=True),
+            },
+            'phases': phases,
+            'page_render': self.pages.report(),
+        }
+
+
+class ChunkTimings:
+    """Per-chunk accumulator used by render workers; returned to the parent as plain data."""
+
+    def __init__(self):
+        self.phases = {}
+        self.pages = PageTimings()
+
+    @contextmanager
+    def measure(self, name):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.thread_time() - cpu
+            totals[2] += 1
+
+    def as_stats(self):
+        return {'phases': {name: tuple(values) for name, values in self.phases.items()},
+                'pages': self.pages, 'pid': os.getpid(), 'peak_rss_mb': peak_rss_mb()}
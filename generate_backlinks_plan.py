@@ -1,8 +1,9 @@
-import json
-from collections import defaultdict
+import os
 from pathlib import Path
 
-DATA_PATH = Path("data/dataset.json")
+from build import Dataset, write_output
+
+DATA_PATH = Path(os.getenv("DATA_FILE", "data/dataset.json"))
 OUTPUT_PATH = Path("output/backlinks_outreach.md")
 
 EMAIL_TEMPLATE = """Subject: Free {brand} troubleshooting guide for your readers
@@ -36,16 +37,16 @@ RESOURCE_TYPES = [
 
 
 def load_dataset():
-    with DATA_PATH.open() as f:
-        return json.load(f)
+    """Parse records (JSON array or JSON Lines) into the shared dataset model."""
+    return Dataset.load(str(DATA_PATH))
 
 
-def build_brand_index(items):
-    brand_index = defaultdict(list)
-    for item in items:
-        brand = item.get("device_brand", "Unknown")
-        brand_index[brand].append(item)
-    return brand_index
+def build_brand_index(dataset):
+    """One sample record and a guide count per brand, read off the dataset's brand index."""
+    return {
+        brand: {"sample": dataset.records[positions[0]], "count": len(positions)}
+        for brand, positions in dataset.by_brand.items()
+    }
 
 
 def make_anchor_suggestions(entry):
@@ -76,15 +77,15 @@ def build_report(brand_index):
     lines.append("")
     lines.append("| Marca | Guías publicadas | Ejemplo de anchor |")
     lines.append("| --- | ---: | --- |")
-    for brand, entries in sorted(brand_index.items(), key=lambda kv: kv[0]):
-        anchor = make_anchor_suggestions(entries[0])[0]
-        lines.append(f"| {brand} | {len(entries)} | {anchor} |")
+    for brand, meta in sorted(brand_index.items(), key=lambda kv: kv[0]):
+        anchor = make_anchor_suggestions(meta["sample"])[0]
+        lines.append(f"| {brand} | {meta['count']} | {anchor} |")
     lines.append("")
 
     lines.append("## Outreach Checklist (por marca)")
     lines.append("")
-    for brand, entries in sorted(brand_index.items(), key=lambda kv: kv[0]):
-        sample = entries[0]
+    for brand, meta in sorted(brand_index.items(), key=lambda kv: kv[0]):
+        sample = meta["sample"]
         lines.append(f"### {brand}")
         lines.append("")
         lines.append("**Búsquedas sugeridas**")
@@ -114,13 +115,18 @@ def build_report(brand_index):
     return "\n".join(lines)
 
 
+def write_plan(dataset, output_path=OUTPUT_PATH):
+    write_output(str(output_path), build_report(build_brand_index(dataset)))
+    print(f"Wrote {output_path}")
+
+
+def outreach_step(ctx):
+    """build.py pipeline step: write the playbook from the build's parsed dataset."""
+    write_plan(ctx.dataset, Path(ctx.output_dir) / OUTPUT_PATH.name)
+
+
 def main():
-    items = load_dataset()
-    brand_index = build_brand_index(items)
-    report = build_report(brand_index)
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_PATH.write_text(report, encoding="utf-8")
-    print(f"Wrote {OUTPUT_PATH}")
+    write_plan(load_dataset())
 
 
 if __name__ == "__main__":
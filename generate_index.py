@@ -1,220 +1,165 @@
 """
 Index Page Generator
-Genera una página principal con listado de todas las páginas generadas
+Genera una portada compacta (output/index.html) con enlaces a listados paginados por tipo de
+aparato (<md5('device')[:2]>/device/<tipo>/page-N.html), renderizados con Jinja en streaming.
+Corre como paso `index` del pipeline de build.py o de forma independiente.
 """
 
 import os
-import json
-from jinja2 import Environment, FileSystemLoader
+import shutil
+
+from build import DEVICES_HASH_ROOT, AtomicOutput, Dataset, RouteTable, remove_output, setup_environment
 
 # Configuration
-DATA_FILE = 'data/dataset.json'
-TEMPLATE_DIR = 'templates'
+DATA_FILE = os.getenv('DATA_FILE', 'data/dataset.json')
 OUTPUT_DIR = 'output'
 BASE_URL = os.getenv('BASE_URL', 'https://alonsoalviraa.github.io/pseo-fixhub').strip()
-BRANDS_HASH_ROOT = __import__('hashlib').md5('brands'.encode('utf-8')).hexdigest()[:2]
 GA_MEASUREMENT_ID = os.getenv('GA_MEASUREMENT_ID', '').strip()
+DEVICE_PAGE_SIZE = max(1, int(os.getenv('DEVICE_PAGE_SIZE', '60')))
+HOME_SAMPLES_PER_DEVICE = max(0, int(os.getenv('HOME_SAMPLES_PER_DEVICE', '6')))
+
+SEVERITY_CLASSES = {
+    'Low': 'bg-green-100 text-green-700',
+    'Medium': 'bg-yellow-100 text-yellow-700',
+    'High': 'bg-orange-100 text-orange-700',
+    'Critical': 'bg-red-100 text-red-700',
+    'None': 'bg-slate-100 text-slate-700',
+}
 
 def load_data():
-    """Load the dataset from JSON."""
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Parse the dataset (JSON array or JSON Lines) into the shared model."""
+    return Dataset.load(DATA_FILE)
 
-def get_hash_path(slug):
-    """Generate hash path (same logic as build.py)."""
-    import hashlib
-    hash_obj = hashlib.md5(slug.encode('utf-8'))
-    hash_prefix = hash_obj.hexdigest()[:2]
-    return os.path.join(hash_prefix, slug)
-
-
-def slugify(value: str) -> str:
-    return ''.join(ch.lower() if ch.isalnum() else '-' for ch in value).strip('-')
-
-def generate_index():
-    """Generate index.html with all pages listed."""
-    data = load_data()
-
-    # Group by device type
-    by_device = {}
-    by_brand = {}
-    for item in data:
-        device_type = item.get('device_type', 'Other')
-        if device_type not in by_device:
-            by_device[device_type] = []
-
-        brand = item.get('device_brand', 'Other')
-        if brand not in by_brand:
-            by_brand[brand] = {
-                'slug': slugify(brand),
-                'count': 0,
-                'devices': set(),
-            }
-
-        slug = item.get('slug')
-        hash_path = get_hash_path(slug).replace('\\', '/')
-
-        by_device[device_type].append({
-            'error_code': item.get('error_code'),
-            'device_brand': item.get('device_brand'),
-            'device_type': device_type,
-            'severity': item.get('severity'),
-            'url': f"{BASE_URL}/{hash_path}.html".replace('\\', '/')
-        })
-
-        by_brand[brand]['count'] += 1
-        by_brand[brand]['devices'].add(device_type)
-    
-    analytics_snippet = ""
-    if GA_MEASUREMENT_ID:
-        analytics_snippet = f"""
-    <!-- Google Analytics -->
-    <script async src=\"https://www.googletagmanager.com/gtag/js?id={GA_MEASUREMENT_ID}\"></script>
-    <script>
-        window.dataLayer = window.dataLayer || [];
-        function gtag(){{dataLayer.push(arguments);}}
-        gtag('js', new Date());
-        gtag('config', '{GA_MEASUREMENT_ID}');
-    </script>
-        """
-
-    # Generate HTML manually (simple template)
-    html = f"""<!DOCTYPE html>
-<html lang=\"en\">
-<head>
-    <meta charset=\"UTF-8\">
-    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
-    <title>FixHub - Automated Repair Knowledge Base</title>
-    <meta name=\"description\" content=\"Complete database of error codes and repair guides for appliances. 100% automated, always up-to-date.\">
-    <script src=\"https://cdn.tailwindcss.com\"></script>
-    <script>
-        tailwind.config = {{
-          theme: {{
-            extend: {{
-              colors: {{
-                primary: '#0f172a',
-                accent: '#38bdf8',
-              }}
-            }}
-          }}
-        }}
-    </script>
-    <style>
-        body {{ font-family: 'Inter', sans-serif; }}
-        .glass-panel {{
-            background: rgba(255, 255, 255, 0.7);
-            backdrop-filter: blur(10px);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-        }}
-    </style>
-{analytics_snippet}
-  </head>
-<body class=\"bg-gradient-to-br from-slate-50 to-slate-100 min-h-screen\">
-
-    <nav class=\"bg-white/80 backdrop-blur-md border-b border-slate-200 sticky top-0 z-10\">
-        <div class=\"max-w-6xl mx-auto px-4 py-4 flex justify-between items-center\">
-            <a href=\"index.html\" class=\"font-bold text-2xl text-slate-800\">Fix<span class=\"text-accent\">Hub</span></a>
-            <div class=\"text-sm text-slate-500\">The Automated Repair Knowledge Base</div>
-        </div>
-    </nav>
-
-    <main class=\"max-w-6xl mx-auto px-4 py-12\">
-
-        <header class=\"text-center mb-16\">
-            <h1 class=\"text-5xl md:text-6xl font-extrabold text-slate-900 mb-4\">
-                Fix Any <span class=\"text-accent\">Error Code</span>
-            </h1>
-            <p class=\"text-xl text-slate-600 max-w-2xl mx-auto\">
-                Automated repair guides for {len(data)} common appliance errors.
-                100% free, always updated.
-            </p>
-        </header>
-
-        <section class=\"mb-12\">
-            <h2 class=\"text-3xl font-bold text-slate-800 mb-4 flex items-center\">
-                <span class=\"w-2 h-8 bg-accent mr-3 rounded\"></span>
-                Browse by brand
-            </h2>
-            <div class=\"grid md:grid-cols-2 lg:grid-cols-3 gap-4\">
-"""
-
-    for brand, meta in sorted(by_brand.items()):
-        hub_url = f"{BASE_URL}/{BRANDS_HASH_ROOT}/brands/{meta['slug']}/"
-        devices = ', '.join(sorted(meta['devices']))
-        html += f"""
-                <a href=\"{hub_url}\" class=\"glass-panel p-6 rounded-xl hover:shadow-lg transition-all hover:-translate-y-1 block\">
-                    <div class=\"flex justify-between items-start mb-3\">
-                        <span class=\"text-2xl font-bold text-accent\">{brand}</span>
-                        <span class=\"text-xs px-2 py-1 rounded-full bg-slate-900 text-white\">{meta['count']} guides</span>
-                    </div>
-                    <p class=\"text-sm text-slate-500\">Devices: {devices}</p>
-                </a>
-"""
-
-    html += """
-            </div>
-        </section>
-
-"""
-    
-    # Add sections by device type
-    for device_type, items in sorted(by_device.items()):
-        html += f"""
-        <section class="mb-12">
-            <h2 class="text-3xl font-bold text-slate-800 mb-6 flex items-center">
-                <span class="w-2 h-8 bg-accent mr-3 rounded"></span>
-                {device_type} Error Codes
-            </h2>
-            <div class="grid md:grid-cols-2 lg:grid-cols-3 gap-4">
-"""
-        
-        for item in items:
-            severity_color = {
-                'Low': 'bg-green-100 text-green-700',
-                'Medium': 'bg-yellow-100 text-yellow-700',
-                'High': 'bg-orange-100 text-orange-700',
-                'Critical': 'bg-red-100 text-red-700',
-                'None': 'bg-slate-100 text-slate-700'
-            }.get(item['severity'], 'bg-slate-100 text-slate-700')
-            
-            html += f"""
-                <a href="{item['url']}" class="glass-panel p-6 rounded-xl hover:shadow-lg transition-all hover:-translate-y-1 block">
-                    <div class="flex justify-between items-start mb-3">
-                        <span class="text-2xl font-bold text-accent">{item['error_code']}</span>
-                        <span class="text-xs px-2 py-1 rounded-full {severity_color}">{item['severity']}</span>
-                    </div>
-                    <h3 class="font-semibold text-slate-800 mb-1">{item['device_brand']} {item['device_type']}</h3>
-                    <p class="text-sm text-slate-500">Click to see repair guide &rarr;</p>
-                </a>
-"""
-        
-        html += """
-            </div>
-        </section>
-"""
-    
-    # Footer
-    html += """
-        
-        <footer class="text-center py-12 border-t border-slate-200 mt-16">
-            <p class="text-slate-500 mb-4">Powered by Programmatic SEO</p>
-            <p class="text-xs text-slate-400">&copy; 2025 FixHub. All guides auto-generated.</p>
-        </footer>
-
-    </main>
-
-</body>
-</html>
-"""
-    
-    # Write to file
-    output_path = os.path.join(OUTPUT_DIR, 'index.html')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-    
-    print(f"[OK] Generated index.html with {len(data)} repair guides")
-    print(f"     Grouped into {len(by_device)} device categories and {len(by_brand)} brand hubs")
+def device_page_url(directory, page_number):
+    return f"{BASE_URL}/{directory}/page-{page_number}.html"
+
+def device_page_path(output_dir, directory, page_number):
+    return os.path.join(output_dir, *directory.split('/'), f"page-{page_number}.html")
+
+def guide_entry(item, url):
+    """Card fields for one guide (the only per-guide data the listings hold in memory)."""
+    return {
+        'error_code': item.get('error_code'),
+        'device_brand': item.get('device_brand'),
+        'device_type': item.get('device_type', 'Other'),
+        'severity': item.get('severity'),
+        'url': url,
+    }
+
+def render_to(path, template, **context):
+    """Stream a template to disk chunk by chunk; the file is only replaced if its bytes changed."""
+    with AtomicOutput(path) as out:
+        for chunk in template.generate(**context):
+            out.write(chunk)
+    return out.changed
+
+def prune_device_pages(output_dir, page_counts):
+    """Remove device listings (or trailing pages) left over from a larger previous catalogue."""
+    device_root = os.path.join(output_dir, DEVICES_HASH_ROOT, 'device')
+    if not os.path.isdir(device_root):
+        return
+    for device_slug in os.listdir(device_root):
+        if device_slug not in page_counts:
+            shutil.rmtree(os.path.join(device_root, device_slug))
+            continue
+        page_number = page_counts[device_slug] + 1
+        while os.path.exists(os.path.join(device_root, device_slug, f"page-{page_number}.html")):
+            remove_output(os.path.join(device_root, device_slug, f"page-{page_number}.html"))
+            page_number += 1
+
+def common_context():
+    return {
+        'home_url': f"{BASE_URL}/index.html",
+        'analytics_id': GA_MEASUREMENT_ID,
+        'severity_classes': SEVERITY_CLASSES,
+    }
+
+def device_page_count(dataset, device_type):
+    return -(-len(dataset.by_device[device_type]) // DEVICE_PAGE_SIZE)
+
+def device_listing_context(dataset, device_type, page_number):
+    """Template context for one page of a device-type listing."""
+    records, page_urls = dataset.records, dataset.routes.page_urls
+    positions = dataset.by_device[device_type]
+    directory = RouteTable.device_route(device_type)[1]
+    page_count = device_page_count(dataset, device_type)
+    page = positions[(page_number - 1) * DEVICE_PAGE_SIZE:page_number * DEVICE_PAGE_SIZE]
+    return {
+        'device': device_type,
+        'guides': [guide_entry(records[position], page_urls[position]) for position in page],
+        'total': len(positions),
+        'page_number': page_number,
+        'page_count': page_count,
+        'prev_url': device_page_url(directory, page_number - 1) if page_number > 1 else None,
+        'next_url': device_page_url(directory, page_number + 1) if page_number < page_count else None,
+        **common_context(),
+    }
+
+def home_context(dataset):
+    """Template context for the home page: per-device samples and the brand hub list."""
+    records, page_urls = dataset.records, dataset.routes.page_urls
+    devices = [
+        {
+            'name': device_type,
+            'count': len(positions),
+            'url': device_page_url(RouteTable.device_route(device_type)[1], 1),
+            'samples': [
+                guide_entry(records[position], page_urls[position])
+                for position in positions[:HOME_SAMPLES_PER_DEVICE]
+            ],
+        }
+        for device_type, positions in sorted(dataset.by_device.items())
+    ]
+    brands = [
+        {
+            'name': brand,
+            'hub_url': dataset.routes.brand_route(brand)[1],
+            'count': len(positions),
+            'devices': sorted({records[position].get('device_type', 'Other') for position in positions}),
+        }
+        for brand, positions in sorted(dataset.by_brand.items())
+    ]
+    return {'total': len(dataset), 'brands': brands, 'devices': devices, **common_context()}
+
+def generate_index(dataset=None, env=None, output_dir=OUTPUT_DIR, devices=None):
+    """
+    Generate the compact home page plus paginated device-type listings.
+    Guides come from the dataset's device and brand indexes; each listing page is rendered
+    from a page-sized slice, and the home page only holds a few samples per device type,
+    so its weight stays flat regardless of catalogue size. `devices` limits the listings
+    rendered to those device types (a watch-mode BuildScope); the home page is always rendered.
+    """
+    dataset = dataset if dataset is not None else load_data()
+    env = env or setup_environment()
+
+    device_template = env.get_template('device_index.html')
+    page_counts = {}
+    written = 0
+    for device_type in sorted(dataset.by_device):
+        device_slug, directory = RouteTable.device_route(device_type)
+        page_count = device_page_count(dataset, device_type)
+        page_counts[device_slug] = page_count
+        if devices is not None and device_type not in devices:
+            continue
+        for page_number in range(1, page_count + 1):
+            written += render_to(
+                device_page_path(output_dir, directory, page_number), device_template,
+                **device_listing_context(dataset, device_type, page_number),
+            )
+
+    prune_device_pages(output_dir, page_counts)
+
+    context = home_context(dataset)
+    render_to(os.path.join(output_dir, 'index.html'), env.get_template('home.html'), **context)
+
+    print(f"[OK] Generated index.html with {len(dataset)} repair guides")
+    print(f"     Grouped into {len(context['devices'])} device categories ({sum(page_counts.values())} listing pages, "
+          f"{written} changed) and {len(context['brands'])} brand hubs")
 
+def index_step(ctx):
+    """build.py pipeline step: reuse the build's parsed dataset, templates and output directory."""
+    generate_index(ctx.dataset, ctx.env, ctx.output_dir, ctx.scope and ctx.scope.devices)
+
 if __name__ == "__main__":
     print("=" * 60)
     print(">>> INDEX PAGE GENERATOR")
@@ -16,7 +16,7 @@ User-agent: *
 Allow: /
 
 # Sitemaps
-Sitemap: {BASE_URL}/sitemap.xml
+Sitemap: {BASE_URL}/sitemap_index.xml
 
 # Crawl-delay for aggressive bots
 User-agent: AhrefsBot
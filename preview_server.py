@@ -0,0 +1,299 @@
+"""
+Local preview server that renders the site on demand instead of materialising output/.
+
+Hashed URLs are resolved to records through the dataset's in-memory indexes: guide pages
+(/<bucket>/<slug>.html), hero badges, bucket indexes, brand hubs and sub-hubs, device
+listings, the stylesheet and the home page. Each response is rendered on first request with
+the build's own plan/enrich/render functions and kept in a bounded LRU cache, which is
+cleared whenever the dataset or a template changes (the dataset is re-parsed on data edits).
+Related links are computed per requested page from one RelatedIndex that data edits sync in
+place (with a vocabulary, only the lists near the changed records are recomputed), so startup
+and reloads never score the whole catalogue.
+
+Run: python preview_server.py  (PREVIEW_HOST / PREVIEW_PORT / PREVIEW_CACHE_SIZE)
+"""
+import os
+import re
+import threading
+import traceback
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import unquote, urlsplit
+
+PREVIEW_HOST = os.getenv('PREVIEW_HOST', '127.0.0.1')
+PREVIEW_PORT = int(os.getenv('PREVIEW_PORT', '8000'))
+PREVIEW_CACHE_SIZE = max(1, int(os.getenv('PREVIEW_CACHE_SIZE', '2000')))
+# Internal links point at the preview server unless BASE_URL is set explicitly.
+os.environ.setdefault('BASE_URL', f"http://{PREVIEW_HOST}:{PREVIEW_PORT}")
+
+from watchdog.observers import Observer  # noqa: E402
+
+import build  # noqa: E402
+import generate_index  # noqa: E402
+from related_links import RelatedIndex, load_vocabulary  # noqa: E402
+from watch_build import ChangeCollector  # noqa: E402
+
+HTML = 'text/html; charset=utf-8'
+SVG = 'image/svg+xml'
+CSS = 'text/css; charset=utf-8'
+INDEX_PAGE = re.compile(r'^index(?:-(\d+))?\.html$')
+LISTING_PAGE = re.compile(r'^page-(\d+)\.html$')
+# Guards the shared RelatedIndex: request threads fill its cache while reloads re-file records
+RELATED_LOCK = threading.Lock()
+
+
+class PageCache:
+    """Thread-safe LRU of rendered responses keyed by output-relative path."""
+
+    def __init__(self, size=PREVIEW_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, path):
+        with self.lock:
+            response = self.entries.get(path)
+            if response is not None:
+                self.entries.move_to_end(path)
+            return response
+
+    def put(self, path, response, generation):
+        """Store a response rendered during `generation`; dropped if the cache was cleared since."""
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[path] = response
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+
+class SiteRelated:
+    """Position-based view of the shared RelatedIndex for one dataset; lists are computed on request."""
+
+    def __init__(self, index, routes):
+        self.index = index
+        self.routes = routes
+
+    def neighbours(self, position):
+        slug = self.routes.slugs[position]
+        with RELATED_LOCK:
+            # A request still rendering the previous dataset may ask for a record just removed
+            slugs = self.index.neighbours_of(slug) if slug in self.index else ()
+        positions = map(self.routes.position, slugs)
+        return [position for position in positions if position is not None]
+
+
+class PreviewSite:
+    """One parsed dataset plus the lookups that map output paths back to records."""
+
+    def __init__(self, dataset, related_index=None):
+        """`related_index` is the previous site's RelatedIndex, synced in place for this dataset."""
+        self.dataset = dataset
+        routes = dataset.routes
+        self.related_index = related_index
+        self.related = None
+        if build.USE_SPIDER_MESH:
+            with RELATED_LOCK:
+                self.related_index = related_index or RelatedIndex(
+                    build.RANDOM_LINKS_PER_PAGE, load_vocabulary(build.RELATED_VOCABULARY_FILE),
+                )
+                self.related_index.sync(dataset.records)
+            self.related = SiteRelated(self.related_index, routes)
+        self.brands = {routes.brand_route(brand)[0]: brand for brand in dataset.by_brand}
+        self.devices = {build.RouteTable.device_route(device)[0]: device for device in dataset.by_device}
+        self.buckets = defaultdict(list)
+        for position, bucket in enumerate(routes.buckets):
+            if bucket:
+                self.buckets[bucket].append(position)
+
+    def render(self, path, env):
+        """Render the output-relative `path`; returns (content type, body) or None if nothing maps to it."""
+        parts = path.split('/')
+        if path == 'index.html':
+            return HTML, env.get_template('home.html').render(**generate_index.home_context(self.dataset))
+        if path == env.globals['stylesheet'].path:
+            return CSS, env.globals['stylesheet'].css
+        if parts[0] == build.IMAGES_HASH_ROOT and path.endswith('.svg'):
+            return self.render_badge('/'.join(parts[1:]))
+        if parts[:2] == [build.BRANDS_HASH_ROOT, 'brands'] and len(parts) in (4, 5):
+            response = self.render_hub(parts[2], parts[3] if len(parts) == 5 else None, parts[-1], env)
+            if response:
+                return response
+        if parts[:2] == [build.DEVICES_HASH_ROOT, 'device'] and len(parts) == 4:
+            response = self.render_listing(parts[2], parts[3], env)
+            if response:
+                return response
+        if path.endswith('.html'):
+            position = self.dataset.routes.position(parts[-1][:-5])
+            if position is not None and self.dataset.routes.page_paths[position] == path:
+                return self.render_page(position, env)
+            return self.render_bucket_index('/'.join(parts[:-1]), parts[-1])
+        return None
+
+    def render_page(self, position, env):
+        routes = self.dataset.routes
+        item = self.dataset.records[position]
+        # Salting comes from the record's own stream, exactly as in the build.
+        job = build.plan_page(position, item, routes, self.dataset.mesh_index, self.related)
+        enriched_item = build.build_enriched_payload(item, **build.page_fields(job))
+        return HTML, build.render_page_html(job, env, enriched_item)
+
+    def render_badge(self, badge_path):
+        # '<shard>/<slug>.<fingerprint>.svg': the badge is only fingerprinted once it is requested
+        routes = self.dataset.routes
+        position = routes.position(badge_path.rsplit('/', 1)[-1].split('.', 1)[0])
+        if position is None or routes.badge_path(position) != badge_path:
+            return None
+        return SVG, build.render_svg_badge(self.dataset.records[position])
+
+    def render_hub(self, brand_slug, device_slug, name, env):
+        brand = self.brands.get(brand_slug)
+        match = INDEX_PAGE.match(name)
+        if brand is None or not match:
+            return None
+        sections, devices = build.brand_hub_sections(self.dataset, brand)
+        for section in sections:
+            if (section[0] is None) != (device_slug is None):
+                continue
+            if device_slug and os.path.basename(section[1]) != device_slug:
+                continue
+            page_number = int(match.group(1) or 1)
+            if not 1 <= page_number <= build.hub_page_count(section):
+                return None
+            context = build.hub_page_context(self.dataset, brand, section, devices, page_number)
+            return HTML, env.get_template('brand_hub.html').render(**context)
+        return None
+
+    def render_listing(self, device_slug, name, env):
+        device_type = self.devices.get(device_slug)
+        match = LISTING_PAGE.match(name)
+        if device_type is None or not match:
+            return None
+        page_number = int(match.group(1))
+        if not 1 <= page_number <= generate_index.device_page_count(self.dataset, device_type):
+            return None
+        context = generate_index.device_listing_context(self.dataset, device_type, page_number)
+        return HTML, env.get_template('device_index.html').render(**context)
+
+    def render_bucket_index(self, bucket, name):
+        positions = self.buckets.get(bucket)
+        match = INDEX_PAGE.match(name)
+        if not positions or not match:
+            return None
+        page_number = int(match.group(1) or 1)
+        page_count = -(-len(positions) // build.BUCKET_INDEX_PAGE_SIZE)
+        if not 1 <= page_number <= page_count:
+            return None
+        page = positions[(page_number - 1) * build.BUCKET_INDEX_PAGE_SIZE:page_number * build.BUCKET_INDEX_PAGE_SIZE]
+        names = [self.dataset.routes.page_paths[position].rsplit('/', 1)[-1] for position in page]
+        out = StringIO()
+        build.write_bucket_index_html(out, bucket, names, page_number, page_count)
+        return HTML, out.getvalue()
+
+
+class PreviewServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, PreviewHandler)
+        self.env = build.setup_environment(auto_reload=True)
+        self.site = PreviewSite(build.Dataset.load())
+        self.cache = PageCache()
+
+    def respond(self, path):
+        """Cached or freshly rendered (content type, body bytes, cache status) for `path`, or None."""
+        response = self.cache.get(path)
+        if response is not None:
+            return response + ('HIT',)
+        generation = self.cache.generation
+        rendered = self.site.render(path, self.env)
+        if rendered is None:
+            return None
+        response = (rendered[0], rendered[1].encode('utf-8'))
+        self.cache.put(path, response, generation)
+        return response + ('MISS',)
+
+    def reload(self, paths):
+        """
+        Apply a burst of file changes: re-parse the dataset if it changed, regenerate the
+        stylesheet from the templates, then drop every cached page.
+        """
+        if os.path.abspath(build.DATA_FILE) in paths:
+            self.site = PreviewSite(build.Dataset.load(), self.site.related_index)
+            print(f"[preview] Reloaded {len(self.site.dataset)} records")
+        build.attach_stylesheet(self.env)
+        self.cache.clear()
+        print(f"[preview] Cache cleared after changes to {', '.join(sorted(paths))}")
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_page(include_body=True)
+
+    def do_HEAD(self):
+        self.send_page(include_body=False)
+
+    def send_page(self, include_body):
+        path = unquote(urlsplit(self.path).path).lstrip('/')
+        if not path or path.endswith('/'):
+            path += 'index.html'
+        try:
+            response = self.server.respond(path)
+        except Exception:
+            traceback.print_exc()
+            self.send_error(500, 'Render failed; see the server log')
+            return
+        if response is None:
+            self.send_error(404, 'No record, hub or listing maps to this URL')
+            return
+        content_type, body, status = response
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Preview-Cache', status)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+
+def watch_changes(server):
+    """Background thread: invalidate the preview whenever the dataset or templates change."""
+    collector = ChangeCollector()
+    observer = Observer()
+    for path in {os.path.dirname(os.path.abspath(build.DATA_FILE)), os.path.abspath(build.TEMPLATE_DIR)}:
+        observer.schedule(collector, path, recursive=True)
+    observer.start()
+    while True:
+        paths = collector.wait_for_burst()
+        try:
+            server.reload(paths)
+        except Exception:
+            # Keep serving the previous dataset; the next save usually fixes a JSON syntax error.
+            traceback.print_exc()
+            server.cache.clear()
+            print("[preview] Reload failed; serving the previous dataset")
+
+
+def main():
+    server = PreviewServer((PREVIEW_HOST, PREVIEW_PORT))
+    threading.Thread(target=watch_changes, args=(server,), daemon=True).start()
+    print(f"[preview] {len(server.site.dataset)} records; serving on {build.BASE_URL}/ "
+          f"(LRU cache of {PREVIEW_CACHE_SIZE} pages). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
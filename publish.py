@@ -0,0 +1,150 @@
+"""
+Incremental publish: sync the build output (output/) into the GitHub Pages directory (docs/).
+
+A content-hash manifest of the last publish (<target>/.publish_manifest.json) decides what
+to touch: new and changed files are copied, files the previous publish wrote that the build
+no longer produces are deleted, and everything else in the target (unchanged pages,
+DEPLOY_STATUS.md, verification files) is left alone. The first publish into a target with
+no manifest treats every file already there as previously published, except PUBLISH_KEEP, so
+a site copied in by hand does not keep pages the build dropped. The public URLs of changed
+and removed pages are written to CHANGED_URLS_FILE for search-engine change pings (e.g. IndexNow).
+
+Run after build.py: python publish.py  (PUBLISH_SOURCE / PUBLISH_TARGET / CHANGED_URLS_FILE)
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+
+from build import BUILD_STATS_FILE, CACHE_HEADERS_FILE, OUTPUT_DIR, RouteTable
+
+PUBLISH_SOURCE = os.getenv('PUBLISH_SOURCE', OUTPUT_DIR)
+PUBLISH_TARGET = os.getenv('PUBLISH_TARGET', 'docs')
+PUBLISH_MANIFEST_FILE = '.publish_manifest.json'
+PUBLISH_MANIFEST_VERSION = 1
+CHANGED_URLS_FILE = os.getenv('CHANGED_URLS_FILE', 'changed_urls.txt')
+# Build reports and host-specific files that are not part of the site (dotfiles such as the
+# build manifest are skipped too). GitHub Pages ignores _headers and compresses responses itself,
+# so .gz sidecars of published files are skipped as well (sitemap shards have no sidecar).
+PUBLISH_EXCLUDE = tuple(name for name in (BUILD_STATS_FILE, CACHE_HEADERS_FILE) if name)
+# Target files the first publish (no manifest yet) must not treat as stale build output
+PUBLISH_KEEP = ('DEPLOY_STATUS.md', 'google*.html', 'CNAME')
+# Outputs whose URLs are worth pinging search engines about
+PING_SUFFIXES = ('.html',)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def publishable_files(root):
+    """Output-relative paths of the files under `root`, skipping dotfiles, .gz sidecars and PUBLISH_EXCLUDE."""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+        for name in filenames:
+            key = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+            sidecar = name.endswith('.gz') and name[:-3] in filenames
+            if not name.startswith('.') and not sidecar and key not in PUBLISH_EXCLUDE:
+                yield key
+
+
+def source_digests(source):
+    """Output-relative path -> SHA-256 of every publishable file under `source`."""
+    return {key: file_digest(os.path.join(source, *key.split('/'))) for key in publishable_files(source)}
+
+
+def load_manifest(path):
+    """Digests recorded by the previous publish; None when missing or from another version."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return stored.get('files', {}) if stored.get('version') == PUBLISH_MANIFEST_VERSION else None
+
+
+def seed_manifest(target):
+    """
+    Stand-in for a missing manifest: every file already in `target` (bar PUBLISH_KEEP) counts
+    as published with an unknown digest, so it is compared on disk and deleted if not rebuilt.
+    """
+    return {key: None for key in publishable_files(target)
+            if not any(fnmatch.fnmatchcase(key, pattern) for pattern in PUBLISH_KEEP)}
+
+
+def copy_file(source, destination):
+    """Copy via a temp file renamed into place, so the target never holds a partial file."""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(destination), f".tmp-{os.path.basename(destination)}")
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def remove_file(path, root):
+    """Delete a published file and any directories it leaves empty below `root`."""
+    if os.path.isfile(path):
+        os.remove(path)
+    directory = os.path.dirname(path)
+    while os.path.abspath(directory) != os.path.abspath(root) and os.path.isdir(directory) \
+            and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def publish(source=PUBLISH_SOURCE, target=PUBLISH_TARGET):
+    """
+    Sync `source` into `target`. Returns (copied, removed, unchanged): the output-relative
+    paths copied and deleted, and how many published files were left as they were.
+    """
+    manifest_path = os.path.join(target, PUBLISH_MANIFEST_FILE)
+    previous = load_manifest(manifest_path)
+    if previous is None:
+        previous = seed_manifest(target) if os.path.isdir(target) else {}
+    current = source_digests(source)
+
+    copied = []
+    for key, digest in sorted(current.items()):
+        destination = os.path.join(target, *key.split('/'))
+        published = previous.get(key)
+        if published is None and os.path.isfile(destination):
+            # Digest unknown (first publish over an existing tree): compare the file itself
+            published = file_digest(destination)
+        if published != digest or not os.path.isfile(destination):
+            copy_file(os.path.join(source, *key.split('/')), destination)
+            copied.append(key)
+
+    removed = sorted(key for key in previous if key not in current)
+    for key in removed:
+        remove_file(os.path.join(target, *key.split('/')), target)
+
+    os.makedirs(target, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        # One entry per line keeps the committed manifest's git diff proportional to the change
+        json.dump({'version': PUBLISH_MANIFEST_VERSION, 'files': current}, f, indent=0, sort_keys=True)
+        f.write('\n')
+    return copied, removed, len(current) - len(copied)
+
+
+def changed_urls(keys):
+    """Public URLs (via RouteTable.output_url) of the pages among the changed or removed paths."""
+    return sorted({RouteTable.output_url(key) for key in keys if key.endswith(PING_SUFFIXES)})
+
+
+def main():
+    copied, removed, unchanged = publish()
+    urls = changed_urls(copied + removed)
+    with open(CHANGED_URLS_FILE, 'w', encoding='utf-8') as f:
+        f.write(''.join(f"{url}\n" for url in urls))
+    print(f"[OK] Published {PUBLISH_SOURCE}/ -> {PUBLISH_TARGET}/: {len(copied)} copied, "
+          f"{len(removed)} removed, {unchanged} unchanged")
+    print(f"[OK] Wrote {len(urls)} changed URLs to {CHANGED_URLS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Related-links engine for the spider mesh.
+
+Scores records against each other with sparse TF-IDF vectors built from brand,
+device_type, model_series, error_code and fix_steps keywords, and keeps the
+top-k neighbours per record (best cosine first, ties broken by slug).
+
+Candidates come from an inverted index instead of pairwise comparisons: the
+selective terms (short posting lists) of a batch of records accumulate partial
+dot products in one sparse matrix product, the records nearest on the slug-hash
+ring of the same brand/device block are always considered, and the best
+candidates are rescored with the exact cosine, again as one sparse product.
+
+IDF weights come from the catalogue itself, or from a fixed vocabulary of
+document frequencies (see main()). With a vocabulary a record's vector only
+depends on its own fields, so an edit, insert or removal only moves the lists
+of the records near it and sync() recomputes just those.
+
+Run: python related_links.py [DATA_FILE]  (writes the vocabulary next to the dataset)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy import sparse
+
+# Field weights applied on top of TF-IDF
+FIELD_WEIGHTS = {
+    'brand': 2.5,
+    'device': 3.0,
+    'series': 2.0,
+    'code': 1.5,
+    'keyword': 0.75,
+}
+
+# Terms whose posting list is longer than this are too common to drive candidate
+# generation (e.g. a brand with 50k guides); they still count in the exact rescoring.
+MAX_POSTINGS = 256
+# Partial-score candidates kept per record before exact rescoring
+CANDIDATE_LIMIT = 200
+# Neighbours taken on each side of a record on its (brand, device_type) block's slug-hash ring
+BLOCK_WINDOW = 16
+# Records scored per batch of sparse products; bounds the memory of one batch
+BATCH_SIZE = 512
+# Scores are rounded before ranking so ties (then broken by slug) do not hinge on float noise
+SCORE_PRECISION = 9
+
+KEYWORD_PATTERN = re.compile(r'[a-z]{3,}')
+STOPWORDS = frozenset("""
+    the and for with from into onto your you are was were has have had not but all any
+    its this that then than them they there these those when what which while will can
+    off out over under again each once only also very more most some such too use using
+    check make sure turn run let set get see try
+""".split())
+
+WINDOW_OFFSETS = np.arange(-BLOCK_WINDOW, BLOCK_WINDOW + 1)
+
+
+def _norm(value):
+    return ' '.join(str(value or '').lower().split())
+
+
+def record_terms(item):
+    """Weighted raw term frequencies for one record, keyed by field-prefixed term."""
+    terms = defaultdict(float)
+    brand = _norm(item.get('device_brand'))
+    device = _norm(item.get('device_type'))
+    series = _norm(item.get('model_series'))
+    code = _norm(item.get('error_code'))
+    if brand:
+        terms['b:' + brand] += FIELD_WEIGHTS['brand']
+    if device:
+        terms['d:' + device] += FIELD_WEIGHTS['device']
+    if series:
+        terms['s:' + series] += FIELD_WEIGHTS['series']
+    if code:
+        terms['e:' + code] += FIELD_WEIGHTS['code']
+    text = ' '.join(item.get('fix_steps') or []).lower()
+    for token in KEYWORD_PATTERN.findall(text):
+        if token not in STOPWORDS:
+            terms['k:' + token] += FIELD_WEIGHTS['keyword']
+    return dict(terms)
+
+
+def record_block(item):
+    """(brand, device_type) block whose slug-hash ring always supplies candidates."""
+    return _norm(item.get('device_brand')), _norm(item.get('device_type'))
+
+
+def slug_hash(slug):
+    """64-bit slug hash (MD5 prefix, stable across processes) that orders a block's ring."""
+    return int(hashlib.md5(slug.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def vocabulary_path(data_file):
+    """Default vocabulary file of a dataset: data/dataset.json -> data/dataset.vocabulary.json."""
+    return os.path.splitext(data_file)[0] + '.vocabulary.json'
+
+
+def build_vocabulary(records):
+    """Document frequency of every term over `records`: {'documents': N, 'terms': {term: df}}."""
+    documents = 0
+    df = Counter()
+    for item in records:
+        documents += 1
+        df.update(record_terms(item).keys())
+    return {'documents': documents, 'terms': dict(sorted(df.items()))}
+
+
+def load_vocabulary(path):
+    """The vocabulary written by main(), or None when there is none (IDF then comes from the catalogue)."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class RelatedIndex:
+    """
+    Top-k neighbour index keyed by slug. neighbours(i) maps through the dataset order
+    given to sync(), so it lists record positions, best first. Lists are computed in
+    batches on first use; precompute() fills them all. `vocabulary` (load_vocabulary)
+    fixes the IDF weights and which terms are selective.
+    """
+
+    def __init__(self, k, vocabulary=None):
+        self.k = k
+        self.vocabulary = vocabulary
+        self._term_ids = {}
+        self._slugs = []
+        self._terms = []
+        self._blocks = []
+        self._positions = {}
+        self._cache = {}                     # slug -> neighbour slugs
+
+    def __len__(self):
+        return len(self._slugs)
+
+    def __contains__(self, slug):
+        return slug in self._positions
+
+    def sync(self, records):
+        """
+        Index `records` (dataset order) and recompute the computed lists they change; returns
+        the slugs whose list changed. With a vocabulary only the records sharing a selective
+        term or a ring window with an added, edited or removed record are recomputed; with
+        catalogue IDF every weight moves, so every computed list is.
+        """
+        slugs, terms, blocks = [], [], []
+        for position, item in enumerate(records):
+            slugs.append(item.get('slug', f"page-{position}"))
+            terms.append(record_terms(item))
+            blocks.append(record_block(item))
+        previous = self._positions
+        positions = {}
+        for position, slug in enumerate(slugs):
+            positions.setdefault(slug, position)
+        moved = [slug for slug in previous if slug not in positions]
+        moved += [slug for slug, position in positions.items() if slug not in previous
+                  or self._terms[previous[slug]] != terms[position]
+                  or self._blocks[previous[slug]] != blocks[position]]
+
+        local = self.vocabulary is not None and self._cache
+        touched = self._touching(moved) if local else set(self._cache)
+        self._index(slugs, terms, blocks)
+        if local:
+            touched |= self._touching(moved)
+
+        stale = {slug: self._cache.pop(slug) for slug in touched if slug in self._cache}
+        for slug in moved:
+            self._cache.pop(slug, None)
+        self._compute([self._positions[slug] for slug in stale if slug in self._positions])
+        return {slug for slug, links in stale.items() if self._cache.get(slug) != links}
+
+    def _touching(self, slugs):
+        """Slugs whose candidates include one of `slugs` (shared selective terms, ring windows)."""
+        rows = [self._positions[slug] for slug in slugs if slug in self._positions]
+        if not rows:
+            return set()
+        columns = np.unique(self._selected[rows].indices)
+        found = np.unique(self._postings[columns].indices)
+        found = np.union1d(found, np.concatenate([self._window(row) for row in rows]))
+        return {self._slugs[position] for position in found}
+
+    def _index(self, slugs, terms, blocks):
+        """Build the TF-IDF matrix, the postings of selective terms and the block rings."""
+        self._slugs, self._terms, self._blocks = slugs, terms, blocks
+        self._positions = {}
+        for position, slug in enumerate(slugs):
+            self._positions.setdefault(slug, position)
+
+        term_ids = self._term_ids
+        indptr, indices, data = [0], [], []
+        for record in terms:
+            for term, weight in record.items():
+                indices.append(term_ids.setdefault(term, len(term_ids)))
+                data.append(weight)
+            indptr.append(len(indices))
+        size = len(slugs)
+        raw = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(size, len(term_ids)),
+        )
+        if self.vocabulary is None:
+            documents = size
+            df = np.bincount(raw.indices, minlength=len(term_ids))
+            selective = (df > 1) & (df <= MAX_POSTINGS)
+        else:
+            # Terms the vocabulary has not seen count as rare
+            documents = self.vocabulary['documents']
+            known = self.vocabulary['terms']
+            df = np.zeros(len(term_ids), dtype=np.int64)
+            for term, column in term_ids.items():
+                df[column] = known.get(term, 0)
+            selective = df <= MAX_POSTINGS
+        idf = np.log((1 + documents) / (1 + df)) + 1.0
+        matrix = (raw @ sparse.diags(idf)).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self._matrix = (sparse.diags(1.0 / norms) @ matrix).tocsr()
+        # Postings of the selective terms: partial scores are selected @ postings
+        self._selected = self._matrix[:, np.flatnonzero(selective)].tocsr()
+        self._postings = self._selected.T.tocsr()
+
+        # Ties and the partial-score cut are broken by slug, never by dataset position
+        self._slug_order = np.empty(size, dtype=np.int64)
+        self._slug_order[np.argsort(np.asarray(slugs, dtype=object), kind='stable')] = np.arange(size)
+        rings = defaultdict(list)
+        for position in sorted(range(size), key=lambda p: (slug_hash(slugs[p]), slugs[p])):
+            rings[blocks[position]].append(position)
+        self._rings = {block: np.asarray(ring) for block, ring in rings.items()}
+        self._ring_slot = np.empty(size, dtype=np.int64)
+        for ring in self._rings.values():
+            self._ring_slot[ring] = np.arange(len(ring))
+
+    def _window(self, position):
+        """Records nearest to `position` on its block's slug-hash ring (itself included)."""
+        ring = self._rings[self._blocks[position]]
+        if len(ring) <= len(WINDOW_OFFSETS):
+            return ring
+        return ring[(self._ring_slot[position] + WINDOW_OFFSETS) % len(ring)]
+
+    def _compute(self, positions):
+        """Score the candidates of every record in `positions` and cache their top-k lists."""
+        slugs, slug_order = self._slugs, self._slug_order
+        for start in range(0, len(positions), BATCH_SIZE):
+            batch = positions[start:start + BATCH_SIZE]
+            partial = (self._selected[batch] @ self._postings).tocsr()
+            pair_rows, pair_cols = [], []
+            for row, position in enumerate(batch):
+                found = partial.indices[partial.indptr[row]:partial.indptr[row + 1]]
+                if len(found) > CANDIDATE_LIMIT:
+                    scores = np.round(partial.data[partial.indptr[row]:partial.indptr[row + 1]], SCORE_PRECISION)
+                    found = found[np.lexsort((slug_order[found], -scores))[:CANDIDATE_LIMIT]]
+                candidates = np.union1d(found, self._window(position))
+                candidates = candidates[candidates != position]
+                pair_rows.append(np.full(len(candidates), position))
+                pair_cols.append(candidates)
+                self._cache[slugs[position]] = ()
+
+            rows = np.concatenate(pair_rows).astype(np.int64)
+            cols = np.concatenate(pair_cols).astype(np.int64)
+            if not len(rows):
+                continue
+            scores = np.asarray(self._matrix[rows].multiply(self._matrix[cols]).sum(axis=1)).ravel()
+            # Per record: highest score first, ties resolved by slug
+            ranked = np.lexsort((slug_order[cols], -np.round(scores, SCORE_PRECISION), rows))
+            rows, cols = rows[ranked], cols[ranked]
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            ends = np.r_[starts[1:], len(rows)]
+            for lo, hi in zip(starts, np.minimum(ends, starts + self.k)):
+                self._cache[slugs[rows[lo]]] = tuple(slugs[col] for col in cols[lo:hi])
+
+    def neighbours_of(self, slug):
+        """The k most similar records to `slug` (self excluded), as slugs, best first."""
+        cached = self._cache.get(slug)
+        if cached is None:
+            self._compute([self._positions[slug]])
+            cached = self._cache[slug]
+        return cached
+
+    def precompute(self):
+        """Fill the neighbour cache for every record (what a full build links anyway)."""
+        self._compute([position for slug, position in self._positions.items() if slug not in self._cache])
+
+    def neighbours(self, position):
+        positions = self._positions
+        return [positions[slug] for slug in self.neighbours_of(self._slugs[position])]
+
+
+def build_related_index(records, k=10, vocabulary=None):
+    """
+    Index every record and precompute its k most similar records (self excluded).
+    `records` is any iterable of dataset dicts, consumed once.
+    """
+    related = RelatedIndex(k, vocabulary)
+    related.sync(records)
+    related.precompute()
+    return related
+
+
+def main():
+    """Write the vocabulary of a dataset (default: build.DATA_FILE) next to it."""
+    import build
+
+    data_file = sys.argv[1] if len(sys.argv) > 1 else build.DATA_FILE
+    vocabulary = build_vocabulary(build.iter_records(data_file))
+    path = vocabulary_path(data_file)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f, ensure_ascii=False, indent=0, sort_keys=True)
+        f.write('\n')
+    print(f"[OK] Wrote {len(vocabulary['terms'])} terms from {vocabulary['documents']} records to {path}")
+
+
+if __name__ == "__main__":
+    main()
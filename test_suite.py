@@ -4,8 +4,14 @@ Verifica que todas las optimizaciones estén funcionando correctamente
 """
 
 import os
+import fnmatch
+import re
+import gzip
 import json
 import hashlib
+import subprocess
+import sys
+import tempfile
 from pathlib import Path
 
 def test_pagination_hashing():
@@ -20,10 +26,11 @@ def test_pagination_hashing():
     if len(subdirs) > 0:
         print(f"  [OK] Found {len(subdirs)} hash subdirectories")
         
-        # Verify they are 2-char hex names
-        valid_hash_dirs = [d for d in subdirs if len(d.name) == 2 and all(c in '0123456789abcdef' for c in d.name)]
+        # Verify they are hex names: 2-char roots or HASH_SHARD_WIDTH-char page shards
+        widths = {2, int(os.getenv('HASH_SHARD_WIDTH', '2'))}
+        valid_hash_dirs = [d for d in subdirs if len(d.name) in widths and all(c in '0123456789abcdef' for c in d.name)]
         if len(valid_hash_dirs) == len(subdirs):
-            print(f"  [OK] All subdirectories use valid 2-char MD5 hashes")
+            print(f"  [OK] All subdirectories use valid MD5 hash prefixes")
             return True
         else:
             print(f"  [FAIL] Some directories don't use hash naming")
@@ -103,30 +110,42 @@ def test_content_salting():
         return False
 
 def test_sitemap():
-    """Test 4: Verify sitemap.xml exists and has correct URLs"""
-    print("\n[TEST 4] Sitemap.xml Generation")
+    """Test 4: Verify sitemap_index.xml lists gzip shards with correct URLs"""
+    print("\n[TEST 4] Sitemap Index + Shards")
     
-    sitemap_path = Path('output/sitemap.xml')
+    index_path = Path('output/sitemap_index.xml')
     
-    if not sitemap_path.exists():
-        print(f"  [FAIL] sitemap.xml not found")
+    if not index_path.exists():
+        print(f"  [FAIL] sitemap_index.xml not found")
         return False
     
-    with open(sitemap_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    with open(index_path, 'r', encoding='utf-8') as f:
+        shard_urls = re.findall(r'<loc>([^<]+)</loc>', f.read())
     
-    # Check for correct URL format (forward slashes)
-    if '\\' in content:
-        print(f"  [FAIL] Sitemap contains backslashes (Windows paths)")
-        return False
+    url_count = 0
+    for shard_url in shard_urls:
+        shard_path = Path('output') / shard_url.rsplit('/', 1)[-1]
+        if not shard_path.exists():
+            print(f"  [FAIL] Shard {shard_path.name} listed in index but missing")
+            return False
+        with gzip.open(shard_path, 'rt', encoding='utf-8') as f:
+            content = f.read()
+        # Check for correct URL format (forward slashes)
+        if '\\' in content:
+            print(f"  [FAIL] {shard_path.name} contains backslashes (Windows paths)")
+            return False
+        shard_count = content.count('<loc>')
+        if shard_count > 50000:
+            print(f"  [FAIL] {shard_path.name} exceeds 50,000 URLs ({shard_count})")
+            return False
+        url_count += shard_count
     
-    url_count = content.count('<loc>')
     if url_count > 0:
-        print(f"  [OK] Sitemap exists with {url_count} URLs")
+        print(f"  [OK] Sitemap index lists {len(shard_urls)} shards with {url_count} URLs")
         print(f"  [OK] URLs use correct forward slashes")
         return True
     else:
-        print(f"  [FAIL] No URLs found in sitemap")
+        print(f"  [FAIL] No URLs found in sitemap shards")
         return False
 
 def test_index_page():
@@ -175,6 +194,586 @@ def test_schema_org():
         print(f"  [FAIL] Schema.org JSON-LD missing or incomplete")
         return False
 
+def test_build_manifest():
+    """Test 7: Verify the incremental build manifest covers every generated page"""
+    print("\n[TEST 7] Incremental Build Manifest")
+
+    manifest_path = Path('output/.build_manifest.json')
+    if not manifest_path.exists():
+        print(f"  [FAIL] .build_manifest.json not found (run build.py)")
+        return False
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        outputs = json.load(f).get('outputs', {})
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        slugs = [item['slug'] for item in json.load(f)]
+
+    tracked = {Path(key).stem for key in outputs}
+    missing = [slug for slug in slugs if slug not in tracked]
+    if missing:
+        print(f"  [FAIL] {len(missing)} pages missing from manifest (e.g. {missing[0]})")
+        return False
+
+    print(f"  [OK] Manifest tracks {len(outputs)} outputs")
+    return True
+
+def run_build(workdir, data_file, **env):
+    """Run build.py in `workdir` (its own output/) against `data_file`; returns the exit code."""
+    env = {**os.environ, 'DATA_FILE': str(data_file), 'PYTHONHASHSEED': '0', **env}
+    result = subprocess.run([sys.executable, str(Path(__file__).resolve().parent / 'build.py')],
+                            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode:
+        print(result.stderr.decode('utf-8', 'replace')[-500:])
+    return result.returncode
+
+def output_files(root):
+    """Output-relative path -> bytes of every file under `root` except the timing report."""
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in Path(root).rglob('*')
+            if path.is_file() and path.name != 'build_stats.json'}
+
+def test_parallel_build():
+    """Test 8: Verify a parallel build writes the same bytes as a serial one"""
+    print("\n[TEST 8] Parallel Build Determinism")
+
+    data_file = Path('data/dataset.json').resolve()
+    with tempfile.TemporaryDirectory() as serial, tempfile.TemporaryDirectory() as parallel:
+        if run_build(serial, data_file, BUILD_WORKERS='1', INCREMENTAL_BUILD='0'):
+            print("  [FAIL] Serial build failed")
+            return False
+        if run_build(parallel, data_file, BUILD_WORKERS='2', BUILD_CHUNK_SIZE='4', INCREMENTAL_BUILD='0'):
+            print("  [FAIL] Parallel build failed")
+            return False
+        expected = output_files(Path(serial) / 'output')
+        actual = output_files(Path(parallel) / 'output')
+
+    differing = sorted(key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key))
+    if differing:
+        print(f"  [FAIL] {len(differing)} outputs differ between serial and parallel builds (e.g. {differing[0]})")
+        return False
+
+    print(f"  [OK] {len(expected)} outputs byte-identical with BUILD_WORKERS=1 and BUILD_WORKERS=2")
+    return True
+
+def test_streaming_parse():
+    """Test 9: Verify the streaming dataset parser at every read-chunk size"""
+    print("\n[TEST 9] Streaming Dataset Parse")
+
+    import build
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    chunk_size = build.DATA_READ_CHUNK
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            array_file = Path(workdir) / 'dataset.json'
+            # Irregular whitespace and non-ASCII text so elements straddle chunk boundaries anywhere
+            array_file.write_text('[\n' + ' ,\n\t'.join(json.dumps(item, ensure_ascii=False, indent=1)
+                                                         for item in records) + '\n]\n', encoding='utf-8')
+            lines_file = Path(workdir) / 'dataset.jsonl'
+            lines_file.write_text('\n'.join(json.dumps(item) for item in records) + '\n\n', encoding='utf-8')
+            for build.DATA_READ_CHUNK in (1, 7, 100, 4096, 1 << 16):
+                for path in (array_file, lines_file):
+                    parsed = list(build.iter_records(str(path)))
+                    if parsed != records:
+                        print(f"  [FAIL] {path.name} parsed differently with {build.DATA_READ_CHUNK}-char reads")
+                        return False
+
+            broken_file = Path(workdir) / 'broken.json'
+            broken_file.write_text(json.dumps(records)[:-2], encoding='utf-8')
+            try:
+                list(build.iter_records(str(broken_file)))
+                print("  [FAIL] Truncated JSON array was accepted")
+                return False
+            except ValueError:
+                pass
+    finally:
+        build.DATA_READ_CHUNK = chunk_size
+
+    print(f"  [OK] {len(records)} records parsed identically from JSON and JSON Lines at 5 chunk sizes")
+    return True
+
+def test_related_index():
+    """Test 10: Verify related links match an exhaustive TF-IDF cosine ranking"""
+    print("\n[TEST 10] Related Links Index")
+
+    import math
+    from related_links import build_related_index, record_terms
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    related = build_related_index(records, 5)
+    positions = {item['slug']: position for position, item in enumerate(records)}
+    for position, item in enumerate(records):
+        neighbours = related.neighbours_of(item['slug'])
+        if item['slug'] in neighbours or not 0 < len(set(neighbours)) == len(neighbours) <= 5:
+            print(f"  [FAIL] {item['slug']}: bad neighbour list {neighbours}")
+            return False
+        if related.neighbours(position) != [positions[slug] for slug in neighbours]:
+            print(f"  [FAIL] {item['slug']}: neighbours() positions do not match its slugs")
+            return False
+
+    # Every pair scored the slow way: the candidate index must not miss a shared term
+    terms = [record_terms(item) for item in records]
+    df = {}
+    for record in terms:
+        for term in record:
+            df[term] = df.get(term, 0) + 1
+    vectors = []
+    for record in terms:
+        weights = {term: tf * (math.log((1 + len(terms)) / (1 + df[term])) + 1.0) for term, tf in record.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        vectors.append({term: weight / norm for term, weight in weights.items()})
+    for position, item in enumerate(records):
+        scored = []
+        for other, other_item in enumerate(records):
+            score = round(sum(weight * vectors[other].get(term, 0.0)
+                              for term, weight in vectors[position].items()), 9)
+            if other != position and score > 0:
+                scored.append((-score, other_item['slug']))
+        expected = tuple(slug for _, slug in sorted(scored)[:5])
+        if related.neighbours_of(item['slug']) != expected:
+            print(f"  [FAIL] {item['slug']}: {related.neighbours_of(item['slug'])}, exhaustive ranking {expected}")
+            return False
+
+    print(f"  [OK] {len(records)} neighbour lists match an exhaustive cosine ranking")
+    return True
+
+def test_build_stats():
+    """Test 11: Verify build_stats.json reports every phase and the page render histogram"""
+    print("\n[TEST 11] Build Stats Report")
+
+    stats_path = Path('output/build_stats.json')
+    if not stats_path.exists():
+        print(f"  [FAIL] build_stats.json not found (run build.py)")
+        return False
+
+    with open(stats_path, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+
+    expected = ['load', 'pages', 'brand hubs', 'sitemap', 'manifest']
+    missing = [name for name in expected if name not in stats.get('phases', {})]
+    if missing:
+        print(f"  [FAIL] Missing phases: {', '.join(missing)}")
+        return False
+
+    page_render = stats.get('page_render', {})
+    if sum(page_render.get('histogram_ms', {}).values()) != page_render.get('count'):
+        print(f"  [FAIL] Render histogram does not add up to {page_render.get('count')} pages")
+        return False
+
+    print(f"  [OK] {len(stats['phases'])} phases timed, {page_render['count']} page renders histogrammed")
+    return True
+
+def test_staged_build():
+    """Test 12: Verify staged builds flip the output symlink and hardlink unchanged outputs"""
+    print("\n[TEST 12] Staged Builds")
+
+    import build
+
+    data_file = Path('data/dataset.json').resolve()
+    routes = build.RouteTable.from_entries(build.build_mesh_index(build.iter_records(str(data_file))))
+    with tempfile.TemporaryDirectory() as workdir:
+        output = Path(workdir) / 'output'
+        if run_build(workdir, data_file, STAGED_BUILD='1', STAGED_BUILDS_KEEP='2'):
+            print("  [FAIL] First staged build failed")
+            return False
+        if not output.is_symlink():
+            print("  [FAIL] output/ is not a symlink after a staged build")
+            return False
+        first = output.resolve()
+        first_files = output_files(first)
+
+        if run_build(workdir, data_file, STAGED_BUILD='1', STAGED_BUILDS_KEEP='2'):
+            print("  [FAIL] Second staged build failed")
+            return False
+        second = output.resolve()
+        if second == first or not first.is_dir():
+            print("  [FAIL] Second build did not go to a new directory next to the previous one")
+            return False
+        if output_files(second) != first_files:
+            print("  [FAIL] Rebuilding the same dataset changed the staged output")
+            return False
+        # Page paths come from the route table, so any HASH_SHARD_DEPTH works
+        page = routes.page_paths[0]
+        if (first / page).stat().st_ino != (second / page).stat().st_ino:
+            print(f"  [FAIL] Unchanged {page} was rewritten instead of hardlinked")
+            return False
+        if len(list((Path(workdir) / '.builds').iterdir())) > 2:
+            print("  [FAIL] Builds beyond STAGED_BUILDS_KEEP were not pruned")
+            return False
+
+    print(f"  [OK] output -> {second.name}; unchanged outputs hardlinked from {first.name}")
+    return True
+
+def test_watch_steps():
+    """Test 13: Verify watch mode picks the steps and record scope each change needs"""
+    print("\n[TEST 13] Watch Step Selection")
+
+    import build
+    import generate_index
+    import watch_build
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    saved = build.DATA_FILE, build.OUTPUT_DIR
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = Path(workdir) / 'dataset.json'
+        data_file.write_text(json.dumps(records), encoding='utf-8')
+        build.DATA_FILE, build.OUTPUT_DIR = str(data_file), str(Path(workdir) / 'output')
+        try:
+            session = watch_build.WatchSession()
+
+            def template(name):
+                return os.path.join(session.template_dir, name)
+
+            steps, _ = session.steps_for({template('brand_hub.html')})
+            if steps != ['brand_hubs', 'sitemap', 'manifest']:
+                print(f"  [FAIL] brand_hub.html edit ran {steps}")
+                return False
+            steps, _ = session.steps_for({template('device_index.html')})
+            if steps != ['index']:
+                print(f"  [FAIL] device_index.html edit ran {steps}")
+                return False
+            steps, _ = session.steps_for({str(data_file)})
+            if steps:
+                print(f"  [FAIL] Unchanged dataset ran {steps}")
+                return False
+
+            records[4]['error_code'] = 'ZZ9'
+            data_file.write_text(json.dumps(records), encoding='utf-8')
+            steps, _ = session.steps_for({str(data_file)})
+            scope = session.ctx.scope
+            if steps != list(watch_build.DATA_STEPS) or scope is None:
+                print(f"  [FAIL] Record edit ran {steps} with scope {scope}")
+                return False
+            if scope.brands != {records[4]['device_brand']} or scope.devices != {records[4]['device_type']}:
+                print(f"  [FAIL] Record edit scoped brands {sorted(scope.brands)}, devices {sorted(scope.devices)}")
+                return False
+            if 4 not in scope.positions or len(scope.positions) == len(records):
+                print(f"  [FAIL] Record edit re-planned positions {sorted(scope.positions)}")
+                return False
+            session.run(steps, 'record edit')
+            page = Path(build.OUTPUT_DIR) / session.ctx.dataset.routes.page_paths[4]
+            if 'ZZ9' not in page.read_text(encoding='utf-8'):
+                print("  [FAIL] Edited record's page was not rebuilt")
+                return False
+            home = (Path(build.OUTPUT_DIR) / 'index.html').read_text(encoding='utf-8')
+            missing = [device for device in session.ctx.dataset.by_device
+                       if generate_index.device_page_url(build.RouteTable.device_route(device)[1], 1) not in home]
+            if missing:
+                print(f"  [FAIL] Scoped rebuild dropped device listings {missing} from the home page")
+                return False
+
+            records.append(dict(records[0], slug='watch-test-insert'))
+            data_file.write_text(json.dumps(records), encoding='utf-8')
+            steps, _ = session.steps_for({str(data_file)})
+            inserted = session.ctx.scope
+            if inserted is None or len(records) - 1 not in inserted.positions:
+                print("  [FAIL] Inserted record was not re-planned within a record scope")
+                return False
+            records.reverse()
+            data_file.write_text(json.dumps(records), encoding='utf-8')
+            steps, _ = session.steps_for({str(data_file)})
+            if session.ctx.scope is not None:
+                print("  [FAIL] Reordered records kept a record-level scope")
+                return False
+            records[4]['error_code'] = 'ZZ8'
+            data_file.write_text(json.dumps(records), encoding='utf-8')
+            steps, _ = session.steps_for({str(data_file), template('brand_hub.html')})
+            if session.ctx.scope is not None:
+                print("  [FAIL] Template change kept a record-level scope")
+                return False
+        finally:
+            build.DATA_FILE, build.OUTPUT_DIR = saved
+
+    print(f"  [OK] Template edits rerun their steps only; a record edit re-planned "
+          f"{len(scope.positions)} pages, {len(scope.brands)} brand hub(s) and {len(scope.devices)} device listing(s)")
+    return True
+
+def test_preview_routing():
+    """Test 14: Verify the preview server maps every output path back to what it renders"""
+    print("\n[TEST 14] Preview Routing")
+
+    import build
+    import preview_server
+
+    dataset = build.Dataset.load('data/dataset.json')
+    env = build.setup_environment()
+    site = preview_server.PreviewSite(dataset)
+    routes = dataset.routes
+    if any(routes.badge_digests):
+        print("  [FAIL] Loading the dataset rendered hero badges up front")
+        return False
+    item = dataset.records[0]
+    brand_slug = routes.brand_slugs[0]
+    device_slug, device_dir = build.RouteTable.device_route(item.get('device_type'))
+
+    expected = {
+        'index.html': preview_server.HTML,
+        env.globals['stylesheet'].path: preview_server.CSS,
+        routes.page_paths[0]: preview_server.HTML,
+        f"{build.IMAGES_HASH_ROOT}/{routes.badge_path(0)}": preview_server.SVG,
+        f"{build.BRANDS_HASH_ROOT}/brands/{brand_slug}/index.html": preview_server.HTML,
+        f"{build.BRANDS_HASH_ROOT}/brands/{brand_slug}/{device_slug}/index.html": preview_server.HTML,
+        f"{device_dir}/page-1.html": preview_server.HTML,
+        f"{routes.buckets[0]}/index.html": preview_server.HTML,
+    }
+    for path, content_type in expected.items():
+        response = site.render(path, env)
+        if response is None or response[0] != content_type:
+            print(f"  [FAIL] {path} rendered {response and response[0]}, expected {content_type}")
+            return False
+    if item.get('error_code') not in site.render(routes.page_paths[0], env)[1]:
+        print("  [FAIL] Guide page does not show its record")
+        return False
+
+    missing = [
+        'nope/missing.html',
+        f"{build.IMAGES_HASH_ROOT}/00/unknown.0123456789ab.svg",
+        f"{build.IMAGES_HASH_ROOT}/{routes.badge_path(0).rsplit('.', 2)[0]}.0123456789ab.svg",
+        f"{build.BRANDS_HASH_ROOT}/brands/{brand_slug}/index-99.html",
+        f"{device_dir}/page-0.html",
+        f"{routes.buckets[0]}/index-99.html",
+    ]
+    for path in missing:
+        if site.render(path, env) is not None:
+            print(f"  [FAIL] {path} should be a 404")
+            return False
+
+    print(f"  [OK] {len(expected)} output kinds routed and rendered, {len(missing)} unknown paths return 404")
+    return True
+
+def test_precompressed_output():
+    """Test 15: Verify pages are minified and ship a matching gzip sidecar"""
+    print("\n[TEST 15] Minified HTML + .gz Sidecars")
+
+    output_dir = Path('output')
+    html_files = [f for f in output_dir.rglob('*.html') if f.name != 'index.html']
+    if not html_files:
+        print(f"  [FAIL] No HTML files found")
+        return False
+
+    import build
+
+    test_file = html_files[0]
+    content = test_file.read_bytes()
+    if b'\n    ' in content or b'<!-- ' in content:
+        print(f"  [FAIL] {test_file.name} is not minified")
+        return False
+
+    if not build.PRECOMPRESS_OUTPUT:
+        # Sitemap shards are gzip files themselves, not sidecars
+        sidecars = [f for f in output_dir.rglob('*.gz') if not f.name.startswith('sitemap-')]
+        if sidecars:
+            print(f"  [FAIL] PRECOMPRESS_OUTPUT=0 but {len(sidecars)} .gz sidecars were written (e.g. {sidecars[0]})")
+            return False
+        print(f"  [OK] {len(html_files)} pages minified; sidecars disabled by PRECOMPRESS_OUTPUT=0")
+        return True
+
+    missing = [f for f in html_files if not Path(f"{f}.gz").exists()]
+    if missing:
+        print(f"  [FAIL] {len(missing)} pages without a .gz sidecar (e.g. {missing[0]})")
+        return False
+    if gzip.decompress(Path(f"{test_file}.gz").read_bytes()) != content:
+        print(f"  [FAIL] {test_file.name}.gz does not match the page")
+        return False
+
+    print(f"  [OK] {len(html_files)} pages minified with matching .gz sidecars")
+    return True
+
+def test_stylesheet():
+    """Test 16: Verify pages use the build-time stylesheet instead of the Tailwind CDN"""
+    print("\n[TEST 16] Build-time Stylesheet")
+
+    output_dir = Path('output')
+    stylesheets = list(output_dir.glob('*/site.*.css'))
+    if len(stylesheets) != 1:
+        print(f"  [FAIL] Expected one fingerprinted stylesheet, found {len(stylesheets)}")
+        return False
+
+    stylesheet = stylesheets[0]
+    css = stylesheet.read_text(encoding='utf-8')
+    if hashlib.sha256(css.encode('utf-8')).hexdigest()[:12] != stylesheet.name.split('.')[1]:
+        print(f"  [FAIL] {stylesheet.name} does not match its content hash")
+        return False
+
+    content = (output_dir / 'index.html').read_text(encoding='utf-8')
+    if 'cdn.tailwindcss.com' in content or f"/{stylesheet.parent.name}/{stylesheet.name}" not in content:
+        print(f"  [FAIL] index.html does not link {stylesheet.name}")
+        return False
+
+    print(f"  [OK] {stylesheet.name} ({len(css)} bytes) linked, no Tailwind CDN")
+    return True
+
+def test_cache_headers():
+    """Test 17: Verify hero badges are fingerprinted and _headers covers assets and pages"""
+    print("\n[TEST 17] Asset Fingerprinting & Cache Headers")
+
+    output_dir = Path('output')
+    html_files = [f for f in output_dir.rglob('*.html') if f.name != 'index.html']
+    content = html_files[0].read_text(encoding='utf-8')
+    match = re.search(r'<img src="[^"]*?/((?:[0-9a-f]+/)+[^"/]+\.svg)"', content)
+    if not match:
+        print(f"  [FAIL] No hero badge in {html_files[0].name}")
+        return False
+
+    badge = output_dir.joinpath(*match.group(1).split('/'))
+    if not badge.exists():
+        print(f"  [FAIL] {match.group(1)} referenced but not written")
+        return False
+    if hashlib.sha256(badge.read_bytes()).hexdigest()[:12] != badge.name.split('.')[-2]:
+        print(f"  [FAIL] {badge.name} does not match its content hash")
+        return False
+
+    headers = (output_dir / '_headers').read_text(encoding='utf-8')
+    rules = dict(re.findall(r'^(/\S*)\n  Cache-Control: ([^\n]+)$', headers, re.M))
+    if len(rules) > 20 or 'ETag' in headers:
+        print(f"  [FAIL] _headers should be a few wildcard rules, got {len(rules)}")
+        return False
+
+    def cache_control(url):
+        # Splats match across '/', as on Netlify and Cloudflare Pages
+        matches = [value for pattern, value in rules.items() if fnmatch.fnmatchcase(url, pattern)]
+        return matches[0] if len(matches) == 1 else None
+
+    if 'immutable' not in (cache_control(f"/{match.group(1)}") or ''):
+        print(f"  [FAIL] /{match.group(1)} is not marked immutable by exactly one rule")
+        return False
+    page_url = '/' + html_files[0].relative_to(output_dir).as_posix()
+    for url in ('/', page_url, '/sitemap_index.xml'):
+        if 'must-revalidate' not in (cache_control(url) or ''):
+            print(f"  [FAIL] {url} is not revalidated by exactly one rule")
+            return False
+
+    print(f"  [OK] {badge.name} fingerprinted; _headers marks assets immutable and pages revalidate")
+    return True
+
+def test_related_insertion():
+    """Test 18: Verify inserting one record only changes the pages that link to it"""
+    print("\n[TEST 18] Related Links Insertion Locality")
+
+    import build
+    import related_links
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    inserted = {**records[3], 'slug': 'error-zz9-inserted-guide', 'error_code': 'ZZ9'}
+    # IDF weights come from the fixed vocabulary, so the insertion does not reweight other records
+    vocabulary = related_links.load_vocabulary(build.RELATED_VOCABULARY_FILE)
+
+    def planned_pages(items):
+        dataset = build.Dataset(items)
+        related = build.build_related_index(dataset.records, build.RANDOM_LINKS_PER_PAGE, vocabulary)
+        pages = {}
+        for position, item in enumerate(dataset.records):
+            job = build.plan_page(position, item, dataset.routes, dataset.mesh_index, related)
+            pages[job['slug']] = (job['custom_title'], job['custom_description'],
+                                  [link['url'] for link in job['related_pages']])
+        return pages, dataset.routes.page_urls
+
+    before, _ = planned_pages(records)
+    after, page_urls = planned_pages(records[:3] + [inserted] + records[3:])
+    inserted_url = page_urls[3]
+    changed = [slug for slug in before if before[slug] != after[slug]]
+    unexpected = [slug for slug in changed if inserted_url not in after[slug][2]]
+    if unexpected:
+        print(f"  [FAIL] {len(unexpected)} pages changed without linking to the new record (e.g. {unexpected[0]})")
+        return False
+    if not changed:
+        print("  [FAIL] No page links to the inserted record")
+        return False
+
+    print(f"  [OK] Inserting one record changed {len(changed)}/{len(before)} pages, all of them its neighbours")
+    return True
+
+def test_publish():
+    """Test 19: Verify publish.py copies only changed files and deletes only removed ones"""
+    print("\n[TEST 19] Incremental Publish")
+
+    import publish
+
+    with tempfile.TemporaryDirectory() as target:
+        keep = Path(target) / 'DEPLOY_STATUS.md'
+        keep.write_text('not a build output', encoding='utf-8')
+        (Path(target) / 'legacy-sitemap.xml').write_text('hand-copied output', encoding='utf-8')
+        copied, removed, _ = publish.publish('output', target)
+        if not copied or not (Path(target) / 'index.html').exists():
+            print("  [FAIL] First publish did not copy the site")
+            return False
+        if removed != ['legacy-sitemap.xml']:
+            print(f"  [FAIL] First publish removed {removed} instead of the stale legacy file")
+            return False
+        host_files = [path.name for path in Path(target).rglob('*')
+                      if path.name == '_headers' or path.name.endswith('.html.gz')]
+        if host_files:
+            print(f"  [FAIL] Published host-only files such as {host_files[0]}")
+            return False
+
+        (Path(target) / '.publish_manifest.json').write_text(json.dumps(
+            {'version': publish.PUBLISH_MANIFEST_VERSION,
+             'files': {**publish.source_digests('output'), 'old/gone.html': '0'}}), encoding='utf-8')
+        (Path(target) / 'old').mkdir()
+        (Path(target) / 'old' / 'gone.html').write_text('removed page', encoding='utf-8')
+        copied, removed, unchanged = publish.publish('output', target)
+        if copied or removed != ['old/gone.html'] or (Path(target) / 'old').exists():
+            print(f"  [FAIL] Second publish copied {len(copied)} and removed {removed}")
+            return False
+        if not keep.exists():
+            print("  [FAIL] A file publish.py never wrote was deleted")
+            return False
+
+    print(f"  [OK] Re-publish left {unchanged} files untouched and removed only the dropped page")
+    return True
+
+def test_removed_record():
+    """Test 20: Verify a record dropped from the dataset disappears from output/ and docs/"""
+    print("\n[TEST 20] Removed Record Pruning")
+
+    import publish
+
+    with open('data/dataset.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    removed = records[3]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        work = Path(workdir)
+        data_file = work / 'dataset.json'
+        data_file.write_text(json.dumps(records), encoding='utf-8')
+        if run_build(work, data_file):
+            print("  [FAIL] Full build failed")
+            return False
+        publish.publish(str(work / 'output'), str(work / 'docs'))
+        before = {path.relative_to(work / 'docs').as_posix() for path in (work / 'docs').rglob('*')
+                  if removed['slug'] in path.name}
+        if not any(key.endswith('.html') for key in before) or not any(key.endswith('.svg') for key in before):
+            print(f"  [FAIL] {removed['slug']} page or badge was not published")
+            return False
+
+        data_file.write_text(json.dumps(records[:3] + records[4:]), encoding='utf-8')
+        if run_build(work, data_file):
+            print("  [FAIL] Rebuild without the record failed")
+            return False
+        leftovers = [path for path in (work / 'output').rglob('*') if removed['slug'] in path.name]
+        if leftovers:
+            print(f"  [FAIL] {leftovers[0].name} left in output/")
+            return False
+        manifest = json.loads((work / 'output' / '.build_manifest.json').read_text(encoding='utf-8'))
+        if any(removed['slug'] in key for key in manifest['outputs']):
+            print("  [FAIL] Removed record still in the build manifest")
+            return False
+
+        _, unpublished, _ = publish.publish(str(work / 'output'), str(work / 'docs'))
+        if not before <= set(unpublished) or any(removed['slug'] in path.name for path in (work / 'docs').rglob('*')):
+            print(f"  [FAIL] Publish removed {unpublished}, expected {sorted(before)}")
+            return False
+
+    print(f"  [OK] {removed['slug']}: page and badge pruned from output/ and unpublished from docs/")
+    return True
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -187,7 +786,21 @@ def main():
         test_content_salting,
         test_sitemap,
         test_index_page,
-        test_schema_org
+        test_schema_org,
+        test_build_manifest,
+        test_parallel_build,
+        test_streaming_parse,
+        test_related_index,
+        test_build_stats,
+        test_staged_build,
+        test_watch_steps,
+        test_preview_routing,
+        test_precompressed_output,
+        test_stylesheet,
+        test_cache_headers,
+        test_related_insertion,
+        test_publish,
+        test_removed_record
     ]
     
     results = []
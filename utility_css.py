@@ -0,0 +1,319 @@
+"""
+Build-time utility CSS (replaces the in-browser Tailwind Play CDN).
+
+Scans content (template sources, Python modules that emit class strings) for class-like
+tokens, like Tailwind's `content` scan, and generates rules only for the tokens this
+module knows: a compact Tailwind v3-compatible utility table (spacing, colours, type,
+flex/grid, borders, shadows, transforms) with hover/focus/group-hover and sm/md/lg/xl
+variants. Unknown tokens are ignored, so prose words cost nothing.
+"""
+import re
+
+# Tailwind v3 palette for the colour families the site uses, plus the theme colours
+PALETTE = {
+    'slate': {'50': '#f8fafc', '100': '#f1f5f9', '200': '#e2e8f0', '300': '#cbd5e1', '400': '#94a3b8',
+              '500': '#64748b', '600': '#475569', '700': '#334155', '800': '#1e293b', '900': '#0f172a'},
+    'red': {'50': '#fef2f2', '100': '#fee2e2', '200': '#fecaca', '300': '#fca5a5', '400': '#f87171',
+            '500': '#ef4444', '600': '#dc2626', '700': '#b91c1c', '800': '#991b1b', '900': '#7f1d1d'},
+    'orange': {'50': '#fff7ed', '100': '#ffedd5', '200': '#fed7aa', '300': '#fdba74', '400': '#fb923c',
+               '500': '#f97316', '600': '#ea580c', '700': '#c2410c', '800': '#9a3412', '900': '#7c2d12'},
+    'amber': {'50': '#fffbeb', '100': '#fef3c7', '200': '#fde68a', '300': '#fcd34d', '400': '#fbbf24',
+              '500': '#f59e0b', '600': '#d97706', '700': '#b45309', '800': '#92400e', '900': '#78350f'},
+    'yellow': {'50': '#fefce8', '100': '#fef9c3', '200': '#fef08a', '300': '#fde047', '400': '#facc15',
+               '500': '#eab308', '600': '#ca8a04', '700': '#a16207', '800': '#854d0e', '900': '#713f12'},
+    'green': {'50': '#f0fdf4', '100': '#dcfce7', '200': '#bbf7d0', '300': '#86efac', '400': '#4ade80',
+              '500': '#22c55e', '600': '#16a34a', '700': '#15803d', '800': '#166534', '900': '#14532d'},
+    'emerald': {'50': '#ecfdf5', '100': '#d1fae5', '200': '#a7f3d0', '300': '#6ee7b7', '400': '#34d399',
+                '500': '#10b981', '600': '#059669', '700': '#047857', '800': '#065f46', '900': '#064e3b'},
+    'sky': {'50': '#f0f9ff', '100': '#e0f2fe', '200': '#bae6fd', '300': '#7dd3fc', '400': '#38bdf8',
+            '500': '#0ea5e9', '600': '#0284c7', '700': '#0369a1', '800': '#075985', '900': '#0c4a6e'},
+}
+THEME_COLORS = {'white': '#ffffff', 'black': '#000000', 'primary': '#0f172a', 'accent': '#38bdf8'}
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'), '6xl': ('3.75rem', '1'),
+}
+FONT_WEIGHTS = {'normal': '400', 'medium': '500', 'semibold': '600', 'bold': '700', 'extrabold': '800'}
+LEADING = {'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2'}
+TRACKING = {'tighter': '-0.05em', 'tight': '-0.025em', 'normal': '0em', 'wide': '0.025em',
+            'wider': '0.05em', 'widest': '0.1em'}
+RADII = {'': '0.25rem', 'none': '0px', 'sm': '0.125rem', 'md': '0.375rem', 'lg': '0.5rem', 'xl': '0.75rem',
+         '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px'}
+MAX_WIDTHS = {'none': 'none', 'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem',
+              '2xl': '42rem', '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem',
+              'full': '100%', 'prose': '65ch'}
+SIZES = {'auto': 'auto', 'full': '100%', 'screen': '100vh', 'px': '1px'}
+BREAKPOINTS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px'}
+STATE_VARIANTS = {'hover': ':hover', 'focus': ':focus'}
+
+TRANSFORM = 'translate(var(--tw-translate-x),var(--tw-translate-y)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))'
+TRANSITION = 'transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms'
+
+# Fixed-name utilities, in Tailwind's layer order
+STATIC_UTILITIES = {
+    'container': 'width:100%',
+    'fixed': 'position:fixed', 'absolute': 'position:absolute', 'relative': 'position:relative',
+    'sticky': 'position:sticky',
+    'block': 'display:block', 'inline-block': 'display:inline-block', 'inline': 'display:inline',
+    'flex': 'display:flex', 'inline-flex': 'display:inline-flex', 'grid': 'display:grid', 'hidden': 'display:none',
+    'min-h-screen': 'min-height:100vh',
+    'flex-shrink-0': 'flex-shrink:0', 'flex-grow': 'flex-grow:1', 'flex-1': 'flex:1 1 0%',
+    'transform': f'transform:{TRANSFORM}',
+    'cursor-pointer': 'cursor:pointer',
+    'list-inside': 'list-style-position:inside', 'list-disc': 'list-style-type:disc',
+    'list-decimal': 'list-style-type:decimal',
+    'flex-row': 'flex-direction:row', 'flex-col': 'flex-direction:column', 'flex-wrap': 'flex-wrap:wrap',
+    'items-start': 'align-items:flex-start', 'items-center': 'align-items:center', 'items-end': 'align-items:flex-end',
+    'justify-start': 'justify-content:flex-start', 'justify-center': 'justify-content:center',
+    'justify-between': 'justify-content:space-between', 'justify-end': 'justify-content:flex-end',
+    'overflow-hidden': 'overflow:hidden',
+    'truncate': 'overflow:hidden;text-overflow:ellipsis;white-space:nowrap',
+    'border': 'border-width:1px', 'border-0': 'border-width:0px', 'border-2': 'border-width:2px',
+    'border-t': 'border-top-width:1px', 'border-b': 'border-bottom-width:1px',
+    'border-l': 'border-left-width:1px', 'border-r': 'border-right-width:1px',
+    'border-solid': 'border-style:solid', 'border-dashed': 'border-style:dashed',
+    'bg-gradient-to-r': 'background-image:linear-gradient(to right,var(--tw-gradient-stops))',
+    'bg-gradient-to-br': 'background-image:linear-gradient(to bottom right,var(--tw-gradient-stops))',
+    'bg-gradient-to-b': 'background-image:linear-gradient(to bottom,var(--tw-gradient-stops))',
+    'text-left': 'text-align:left', 'text-center': 'text-align:center', 'text-right': 'text-align:right',
+    'uppercase': 'text-transform:uppercase', 'italic': 'font-style:italic', 'underline': 'text-decoration-line:underline',
+    'shadow-sm': '--tw-shadow:0 1px 2px 0 rgb(0 0 0 / 0.05);--tw-shadow-colored:0 1px 2px 0 var(--tw-shadow-color);'
+                 'box-shadow:var(--tw-shadow)',
+    'shadow': '--tw-shadow:0 1px 3px 0 rgb(0 0 0 / 0.1),0 1px 2px -1px rgb(0 0 0 / 0.1);'
+              '--tw-shadow-colored:0 1px 3px 0 var(--tw-shadow-color),0 1px 2px -1px var(--tw-shadow-color);'
+              'box-shadow:var(--tw-shadow)',
+    'shadow-md': '--tw-shadow:0 4px 6px -1px rgb(0 0 0 / 0.1),0 2px 4px -2px rgb(0 0 0 / 0.1);'
+                 '--tw-shadow-colored:0 4px 6px -1px var(--tw-shadow-color),0 2px 4px -2px var(--tw-shadow-color);'
+                 'box-shadow:var(--tw-shadow)',
+    'shadow-lg': '--tw-shadow:0 10px 15px -3px rgb(0 0 0 / 0.1),0 4px 6px -4px rgb(0 0 0 / 0.1);'
+                 '--tw-shadow-colored:0 10px 15px -3px var(--tw-shadow-color),0 4px 6px -4px var(--tw-shadow-color);'
+                 'box-shadow:var(--tw-shadow)',
+    'shadow-xl': '--tw-shadow:0 20px 25px -5px rgb(0 0 0 / 0.1),0 8px 10px -6px rgb(0 0 0 / 0.1);'
+                 '--tw-shadow-colored:0 20px 25px -5px var(--tw-shadow-color),0 8px 10px -6px var(--tw-shadow-color);'
+                 'box-shadow:var(--tw-shadow)',
+    'backdrop-blur': '-webkit-backdrop-filter:blur(8px);backdrop-filter:blur(8px)',
+    'backdrop-blur-md': '-webkit-backdrop-filter:blur(12px);backdrop-filter:blur(12px)',
+    'transition': 'transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,'
+                  f'opacity,box-shadow,transform,filter,backdrop-filter;{TRANSITION}',
+    'transition-all': f'transition-property:all;{TRANSITION}',
+    'transition-colors': 'transition-property:color,background-color,border-color,text-decoration-color,fill,stroke;'
+                         f'{TRANSITION}',
+}
+
+# Base styles (a trimmed Tailwind preflight) plus the custom-property defaults utilities rely on
+PREFLIGHT = (
+    "*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb;"
+    "--tw-translate-x:0;--tw-translate-y:0;--tw-scale-x:1;--tw-scale-y:1;--tw-shadow:0 0 #0000}"
+    "html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,"
+    "-apple-system,'Segoe UI',Roboto,'Helvetica Neue',Arial,sans-serif}"
+    "body{margin:0;line-height:inherit}"
+    "hr{height:0;color:inherit;border-top-width:1px}"
+    "h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}"
+    "a{color:inherit;text-decoration:inherit}"
+    "b,strong{font-weight:bolder}"
+    "code,kbd,samp,pre{font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,monospace;font-size:1em}"
+    "small{font-size:80%}"
+    "table{text-indent:0;border-color:inherit;border-collapse:collapse}"
+    "button,input,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;"
+    "color:inherit;margin:0;padding:0}"
+    "button{text-transform:none;background-color:transparent;background-image:none;cursor:pointer}"
+    "summary{display:list-item}"
+    "blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}"
+    "ol,ul,menu{list-style:none;margin:0;padding:0}"
+    "img,svg,video,canvas,iframe{display:block;vertical-align:middle}"
+    "img,video{max-width:100%;height:auto}"
+    "[hidden]{display:none}"
+)
+
+CLASS_TOKEN = re.compile(r'[-\w:/.]+')
+SPACE_BETWEEN = ' > :not([hidden]) ~ :not([hidden])'
+
+
+def color_value(name):
+    """CSS colour for 'slate-200', 'white' or 'accent/10' (an opacity modifier), else None."""
+    name, _, alpha = name.partition('/')
+    family, _, shade = name.rpartition('-')
+    value = PALETTE.get(family, {}).get(shade) if family else THEME_COLORS.get(name)
+    if value is None or (alpha and not alpha.isdigit()):
+        return None
+    if not alpha:
+        return value
+    red, green, blue = (int(value[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgb({red} {green} {blue} / {int(alpha) / 100:g})"
+
+
+def spacing(value, negative=False):
+    """Spacing scale: '4' -> 1rem, '1.5' -> 0.375rem, 'px' -> 1px."""
+    if value == 'px':
+        size = '1px'
+    else:
+        try:
+            size = float(value) * 0.25
+        except ValueError:
+            return None
+        if size < 0 or (size * 4) % 0.5:
+            return None
+        size = f"{size:g}rem" if size else '0px'
+    return f"-{size}" if negative and size != '0px' else size
+
+
+SPACING_PROPERTIES = {
+    'p': ('padding',), 'px': ('padding-left', 'padding-right'), 'py': ('padding-top', 'padding-bottom'),
+    'pt': ('padding-top',), 'pr': ('padding-right',), 'pb': ('padding-bottom',), 'pl': ('padding-left',),
+    'm': ('margin',), 'mx': ('margin-left', 'margin-right'), 'my': ('margin-top', 'margin-bottom'),
+    'mt': ('margin-top',), 'mr': ('margin-right',), 'mb': ('margin-bottom',), 'ml': ('margin-left',),
+    'gap': ('gap',), 'gap-x': ('column-gap',), 'gap-y': ('row-gap',),
+    'top': ('top',), 'right': ('right',), 'bottom': ('bottom',), 'left': ('left',), 'inset': ('inset',),
+}
+COLOR_PROPERTIES = {'text': 'color', 'bg': 'background-color', 'border': 'border-color'}
+
+# Rule order mirrors Tailwind's: layout, box model, flex/grid, borders, backgrounds, spacing, type, effects
+RANKS = ('static-layout', 'z', 'position', 'margin', 'static-display', 'size', 'max-w', 'static-flex',
+         'translate', 'scale', 'static-misc', 'grid', 'gap', 'space', 'rounded', 'static-border', 'border-color',
+         'bg', 'static-bg', 'gradient', 'padding', 'static-text', 'font-size', 'font-weight', 'leading',
+         'tracking', 'text-color', 'static-effect', 'shadow-color', 'static-transition')
+STATIC_RANKS = {
+    'static-layout': ('container',), 'position': ('fixed', 'absolute', 'relative', 'sticky'),
+    'static-display': ('block', 'inline-block', 'inline', 'flex', 'inline-flex', 'grid', 'hidden', 'min-h-screen'),
+    'static-flex': ('flex-shrink-0', 'flex-grow', 'flex-1', 'transform'),
+    'static-misc': ('cursor-pointer', 'list-inside', 'list-disc', 'list-decimal', 'flex-row', 'flex-col',
+                    'flex-wrap', 'items-start', 'items-center', 'items-end', 'justify-start', 'justify-center',
+                    'justify-between', 'justify-end', 'overflow-hidden', 'truncate'),
+    'static-border': ('border', 'border-0', 'border-2', 'border-t', 'border-b', 'border-l', 'border-r',
+                      'border-solid', 'border-dashed'),
+    'static-bg': ('bg-gradient-to-r', 'bg-gradient-to-br', 'bg-gradient-to-b'),
+    'static-text': ('text-left', 'text-center', 'text-right', 'uppercase', 'italic', 'underline'),
+    'static-effect': ('shadow-sm', 'shadow', 'shadow-md', 'shadow-lg', 'shadow-xl', 'backdrop-blur',
+                      'backdrop-blur-md'),
+    'static-transition': ('transition', 'transition-all', 'transition-colors'),
+}
+STATIC_RANK_OF = {name: rank for rank, names in STATIC_RANKS.items() for name in names}
+
+
+def utility(name):
+    """(rank, declarations, selector suffix) for a bare utility name, or None when unknown."""
+    if name in STATIC_UTILITIES:
+        return STATIC_RANK_OF[name], STATIC_UTILITIES[name], ''
+    negative = name.startswith('-')
+    prefix, _, value = name.lstrip('-').rpartition('-')
+    if prefix in SPACING_PROPERTIES:
+        size = spacing(value, negative) if value != 'auto' or negative else 'auto'
+        if size is None or (size == 'auto' and prefix[0] != 'm'):
+            return None
+        rank = 'padding' if prefix[0] == 'p' else 'margin' if prefix[0] == 'm' else \
+            'gap' if prefix.startswith('gap') else 'position'
+        return rank, ';'.join(f"{prop}:{size}" for prop in SPACING_PROPERTIES[prefix]), ''
+    if prefix in ('space-y', 'space-x'):
+        size = spacing(value, negative)
+        side = 'margin-top' if prefix == 'space-y' else 'margin-left'
+        return (('space', f"{side}:{size}", SPACE_BETWEEN)) if size else None
+    if prefix in ('w', 'h') and not negative:
+        size = SIZES.get(value) or spacing(value)
+        if value == 'screen' and prefix == 'w':
+            size = '100vw'
+        return ('size', f"{'width' if prefix == 'w' else 'height'}:{size}", '') if size else None
+    if prefix in ('translate-y', 'translate-x'):
+        size = spacing(value, negative)
+        axis = prefix[-1]
+        return ('translate', f"--tw-translate-{axis}:{size};transform:{TRANSFORM}", '') if size else None
+    if prefix == 'scale' and value.isdigit() and not negative:
+        factor = f"{int(value) / 100:g}"
+        return 'scale', f"--tw-scale-x:{factor};--tw-scale-y:{factor};transform:{TRANSFORM}", ''
+    if negative:
+        return None
+    if prefix == 'z' and value.isdigit():
+        return 'z', f"z-index:{value}", ''
+    if prefix == 'max-w' and value in MAX_WIDTHS:
+        return 'max-w', f"max-width:{MAX_WIDTHS[value]}", ''
+    if prefix == 'grid-cols' and value.isdigit():
+        return 'grid', f"grid-template-columns:repeat({value},minmax(0,1fr))", ''
+    if prefix == 'col-span' and value.isdigit():
+        return 'static-misc', f"grid-column:span {value} / span {value}", ''
+    if name == 'rounded' or prefix == 'rounded':
+        radius = RADII.get('' if name == 'rounded' else value)
+        return ('rounded', f"border-radius:{radius}", '') if radius else None
+    if prefix == 'font' and value in FONT_WEIGHTS:
+        return 'font-weight', f"font-weight:{FONT_WEIGHTS[value]}", ''
+    if prefix == 'leading' and value in LEADING:
+        return 'leading', f"line-height:{LEADING[value]}", ''
+    if prefix == 'tracking' and value in TRACKING:
+        return 'tracking', f"letter-spacing:{TRACKING[value]}", ''
+    if prefix == 'opacity' and value.isdigit():
+        return 'static-effect', f"opacity:{int(value) / 100:g}", ''
+    if prefix == 'text' and value in FONT_SIZES:
+        size, line_height = FONT_SIZES[value]
+        return 'font-size', f"font-size:{size};line-height:{line_height}", ''
+    kind, _, color_name = name.partition('-')
+    color = color_value(color_name) if color_name else None
+    if color is None:
+        return None
+    if kind in COLOR_PROPERTIES:
+        rank = 'text-color' if kind == 'text' else 'border-color' if kind == 'border' else 'bg'
+        return rank, f"{COLOR_PROPERTIES[kind]}:{color}", ''
+    if kind == 'from':
+        transparent = color_value(f"{color_name.partition('/')[0]}/0")
+        return ('gradient', f"--tw-gradient-from:{color};--tw-gradient-to:{transparent};"
+                "--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)", '')
+    if kind == 'to':
+        return 'gradient', f"--tw-gradient-to:{color}", ''
+    if kind == 'shadow':
+        return 'shadow-color', f"--tw-shadow-color:{color};--tw-shadow:var(--tw-shadow-colored)", ''
+    return None
+
+
+def escape_class(name):
+    return re.sub(r'([^\w-])', r'\\\1', name)
+
+
+def resolve(token):
+    """
+    Rule for a class token with optional variants ('md:grid-cols-2', 'group-hover:bg-accent'):
+    (sort key, media query or None, CSS rule), or None when it is not a known utility.
+    """
+    *variants, name = token.split(':')
+    rule = utility(name)
+    if rule is None:
+        return None
+    rank, declarations, suffix = rule
+    media, state, selector = None, 0, f".{escape_class(token)}"
+    for variant in variants:
+        if variant in BREAKPOINTS and media is None:
+            media = variant
+        elif variant in STATE_VARIANTS:
+            selector += STATE_VARIANTS[variant]
+            state = 1
+        elif variant == 'group-hover':
+            selector = f".group:hover {selector}"
+            state = 2
+        else:
+            return None
+    breakpoint = list(BREAKPOINTS).index(media) + 1 if media else 0
+    return (breakpoint, state, RANKS.index(rank), token), media, f"{selector}{suffix}{{{declarations}}}"
+
+
+def scan_classes(texts):
+    """Every token in `texts` that resolves to a utility (Tailwind-style content scan)."""
+    tokens = set()
+    for text in texts:
+        tokens.update(token.rstrip('.:') for token in CLASS_TOKEN.findall(text))
+    return {token for token in tokens if resolve(token)}
+
+
+def generate_css(classes, preflight=True):
+    """Stylesheet for `classes`: preflight, then utilities in Tailwind order, then media queries."""
+    rules = sorted(resolve(token) for token in classes)
+    parts = [PREFLIGHT] if preflight else []
+    media = None
+    for _, rule_media, rule in rules:
+        if rule_media != media:
+            if media:
+                parts.append('}')
+            if rule_media:
+                parts.append(f"@media (min-width:{BREAKPOINTS[rule_media]}){{")
+            media = rule_media
+        parts.append(rule)
+    if media:
+        parts.append('}')
+    return '\n'.join(parts) + '\n'
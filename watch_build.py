@@ -1,32 +1,250 @@
-"""Lightweight watcher to rebuild on dataset/template edits (staticjinja-inspired)."""
-import subprocess
-from pathlib import Path
+"""
+Long-lived watcher that rebuilds in-process on dataset/template edits (staticjinja-inspired).
+
+The parsed dataset, compiled templates, related-links index and build manifest stay in memory
+between rebuilds. Event bursts (an editor writing a temp file, renaming it, touching it again)
+are debounced into a single rebuild, and a dependency graph picks the pipeline steps to rerun:
+a template change only reruns the steps whose templates extend/include it, and within a step the
+manifest digests limit rendering to the pages, hubs, bucket indexes and sitemap shards that changed.
+
+A dataset edit is diffed against the previous records by slug and rebuilt within a
+build.BuildScope: the edited records' pages, brand hubs, device listings, bucket indexes and
+sitemap shards, plus the pages whose links can change (those linking to an edited record,
+those whose related list moved, and those whose exploration picks a new record can take).
+"""
+import bisect
+import os
+import threading
+import time
+import traceback
+from collections import defaultdict
+
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
-WATCH_PATHS = [Path('data'), Path('templates')]
+import build
+from build_profiler import BuildProfiler
+from related_links import slug_hash
+
+# Quiet period that closes a burst of file events before rebuilding
+WATCH_DEBOUNCE_SECONDS = float(os.getenv('WATCH_DEBOUNCE_SECONDS', '0.3'))
+WATCH_SUFFIXES = ('.json', '.jsonl', '.ndjson', '.html')
+WATCH_EVENTS = ('created', 'modified', 'moved', 'deleted')
+
+# Root templates rendered by each pipeline step
+STEP_TEMPLATES = {
+    'pages': build.PAGE_TEMPLATE_VARIANTS,
+    'brand_hubs': build.HUB_TEMPLATES,
+    'index': ['home.html', 'device_index.html'],
+}
+# Steps that depend on the records themselves (robots.txt does not); the related-links index
+# is synced in place when the dataset is reloaded.
+DATA_STEPS = ('pages', 'brand_hubs', 'index', 'sitemap', 'outreach', 'manifest')
+
 
+class ChangeCollector(FileSystemEventHandler):
+    """Collects changed paths from watchdog's thread until a burst has gone quiet."""
 
-class RebuildHandler(FileSystemEventHandler):
-    def on_modified(self, event):
-        if event.is_directory:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = set()
+        self.last_event = 0.0
+        self.pending = threading.Event()
+
+    def on_any_event(self, event):
+        # Opened/closed events fire whenever a build reads a template; only content changes count.
+        if event.is_directory or event.event_type not in WATCH_EVENTS:
             return
-        if event.src_path.endswith(('.json', '.html')):
-            print(f"[watch] Detected change in {event.src_path}. Rebuilding...")
-            subprocess.run(['python', 'build.py'], check=False)
-            subprocess.run(['python', 'generate_index.py'], check=False)
+        for path in (event.src_path, getattr(event, 'dest_path', None)):
+            if path and path.endswith(WATCH_SUFFIXES):
+                with self.lock:
+                    self.paths.add(os.path.abspath(path))
+                    self.last_event = time.monotonic()
+                self.pending.set()
+
+    def wait_for_burst(self, debounce=WATCH_DEBOUNCE_SECONDS):
+        """Block until events arrived and none followed for `debounce` seconds; return their paths."""
+        while not self.pending.wait(1):
+            pass
+        while True:
+            with self.lock:
+                quiet = time.monotonic() - self.last_event
+                if quiet >= debounce:
+                    paths, self.paths = self.paths, set()
+                    self.pending.clear()
+                    return paths
+            time.sleep(debounce - quiet)
+
+
+class WatchSession:
+    """One in-memory build kept up to date by partial rebuilds."""
+
+    def __init__(self):
+        self.data_file = os.path.abspath(build.DATA_FILE)
+        self.template_dir = os.path.abspath(build.TEMPLATE_DIR)
+        build.ensure_output_dir()
+        env = build.setup_environment(auto_reload=True)
+        dataset = build.Dataset.load()
+        self.ctx = build.BuildContext(
+            dataset, env, build.BuildManifest.load(), BuildProfiler(enabled=False), build.OUTPUT_DIR,
+        )
+        self.ctx.page_links = {}
+        self.record_digests = self.digest_records(dataset)
+        self.scope = None
+        self.graph = self.template_graph()
+        self.run(build.BUILD_STEPS, f"initial build of {len(dataset)} records")
+
+    @staticmethod
+    def digest_records(dataset):
+        return {record.get('slug'): build.hash_inputs(record) for record in dataset}
+
+    def template_graph(self):
+        """Map every template name to the pipeline steps whose root templates pull it in."""
+        graph = defaultdict(set)
+        for step, roots in STEP_TEMPLATES.items():
+            for root in roots:
+                for name, _ in build.iter_template_chain(self.ctx.env, root):
+                    graph[name].add(step)
+        return graph
+
+    def reload_dataset(self):
+        """
+        Re-parse the dataset, sync the related-links index and set self.scope (None when the
+        edit needs a full data rebuild). Returns a summary of what changed, or None when nothing did.
+        """
+        previous, previous_digests = self.ctx.dataset, self.record_digests
+        dataset = build.Dataset.load()
+        digests = self.digest_records(dataset)
+        edited = {slug for slug, digest in digests.items()
+                  if slug in previous_digests and previous_digests[slug] != digest}
+        added = [slug for slug in digests if slug not in previous_digests]
+        removed = [slug for slug in previous_digests if slug not in digests]
+        # Positions drive routes and bucket listings, so a reorder counts as a change.
+        reordered = [slug for slug in digests if slug in previous_digests] != \
+            [slug for slug in previous_digests if slug in digests]
+        changed = len(edited) + len(added) + len(removed)
+        if not changed and not reordered:
+            return None
+        self.ctx.dataset = dataset
+        self.record_digests = digests
+        related_changed = set()
+        if self.ctx.related is not None:
+            related_changed = self.ctx.related.sync(dataset.records)
+        self.scope = None
+        if not reordered:
+            self.scope = self.record_scope(previous, dataset, edited, added, removed, related_changed)
+        for slug in removed:
+            self.ctx.page_links.pop(slug, None)
+        return f"{changed} records changed" if changed else "records reordered"
+
+    def record_scope(self, previous, dataset, edited, added, removed, related_changed):
+        """BuildScope of an in-place edit (records changed, added or removed), or None to rebuild everything."""
+        if not build.USE_SPIDER_MESH or len(self.record_digests) != len(dataset) \
+                or min(len(previous), len(dataset)) <= build.RANDOM_LINKS_PER_PAGE + 1:
+            # Sequential links, duplicate slugs or a catalogue smaller than a page's link count
+            return None
+        old_routes, routes = previous.routes, dataset.routes
+        old_positions = [old_routes.position(slug) for slug in (*edited, *removed)]
+        new_positions = [routes.position(slug) for slug in (*edited, *added)]
+
+        # Pages linking to an edited or removed record show its old fields or URL
+        targets = {old_routes.hash_path(position) for position in old_positions}
+        # Exploration picks walk the slug-hash ring clockwise past at most RANDOM_LINKS_PER_PAGE
+        # linked records, so a new record can only take a pick from the next few records' linkers.
+        points, ring = routes.hash_ring()
+        added_set = set(added)
+        for slug in added:
+            slot = bisect.bisect_left(points, slug_hash(slug))
+            passed = 0
+            while passed <= build.RANDOM_LINKS_PER_PAGE and len(added_set) + passed < len(ring):
+                slot = (slot + 1) % len(ring)
+                if routes.slugs[ring[slot]] not in added_set:
+                    targets.add(routes.hash_path(ring[slot]))
+                    passed += 1
+        replan = edited | added_set | related_changed
+        replan.update(slug for slug, links in self.ctx.page_links.items() if not links.isdisjoint(targets))
+        replan.difference_update(removed)
+
+        records = previous.records
+        brands = {records[position].get('device_brand', 'Other') for position in old_positions}
+        devices = {records[position].get('device_type', 'Other') for position in old_positions}
+        buckets = {old_routes.buckets[position] for position in old_positions}
+        for position in new_positions:
+            brands.add(dataset.records[position].get('device_brand', 'Other'))
+            devices.add(dataset.records[position].get('device_type', 'Other'))
+            buckets.add(routes.buckets[position])
+        keys = {build.BuildManifest.key_for(path) for position in old_positions
+                for path in (old_routes.output_path(position), old_routes.badge_output_path(position))}
+        return build.BuildScope(
+            {routes.position(slug) for slug in replan}, brands, devices, buckets, keys,
+        )
+
+    def steps_for(self, paths):
+        """Pipeline steps affected by the changed paths, in BUILD_STEPS order, plus a summary."""
+        steps = set()
+        notes = []
+        templates = [
+            os.path.relpath(path, self.template_dir).replace(os.sep, '/')
+            for path in paths if path.startswith(self.template_dir + os.sep)
+        ]
+        if self.data_file in paths:
+            change = self.reload_dataset()
+            if change:
+                steps.update(DATA_STEPS)
+                notes.append(change)
+        if templates:
+            self.graph = self.template_graph()
+            for name in templates:
+                steps.update(self.graph.get(name, ()))
+            notes.append(f"templates {', '.join(sorted(templates))}")
+            stylesheet = self.ctx.env.globals['stylesheet']
+            if build.attach_stylesheet(self.ctx.env) != stylesheet:
+                # Every layout links the stylesheet by fingerprint and inlines its critical rules.
+                steps.update(('styles', *STEP_TEMPLATES))
+                notes.append("stylesheet")
+        if steps & set(build.MANIFEST_STEPS):
+            # New digests change <lastmod> dates and must be persisted.
+            steps.update(('sitemap', 'manifest'))
+        # A record-level edit alone is rebuilt within its scope; template changes re-plan everything.
+        # The headers step is never rerun: its wildcard rules do not depend on the outputs.
+        self.ctx.scope = None if templates else self.scope
+        self.scope = None
+        return [name for name in build.BUILD_STEPS if name in steps], '; '.join(notes)
+
+    def run(self, steps, reason):
+        started = time.perf_counter()
+        self.ctx.pages_rendered = 0
+        build.run_steps(self.ctx, steps)
+        self.ctx.manifest.advance()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[watch] {reason}: ran {', '.join(steps)}; {self.ctx.pages_rendered} pages re-rendered "
+              f"in {elapsed_ms:.0f} ms")
+
+    def rebuild(self, paths):
+        try:
+            steps, reason = self.steps_for(paths)
+            if not steps:
+                print(f"[watch] No outputs depend on {', '.join(sorted(paths))}; nothing to rebuild")
+                return
+            self.run(steps, reason)
+        except Exception:
+            # Keep watching: the next save usually fixes a template or JSON syntax error.
+            traceback.print_exc()
+            print("[watch] Rebuild failed; waiting for the next change")
 
 
 def main():
+    session = WatchSession()
+    collector = ChangeCollector()
     observer = Observer()
-    handler = RebuildHandler()
-    for path in WATCH_PATHS:
-        observer.schedule(handler, str(path), recursive=True)
+    watched = {os.path.dirname(session.data_file), session.template_dir}
+    for path in watched:
+        observer.schedule(collector, path, recursive=True)
     observer.start()
-    print("[watch] Watching data/ and templates/ for changes. Press Ctrl+C to stop.")
+    print(f"[watch] Watching {', '.join(sorted(watched))} for changes. Press Ctrl+C to stop.")
     try:
         while True:
-            observer.join(1)
+            session.rebuild(collector.wait_for_burst())
     except KeyboardInterrupt:
         observer.stop()
     observer.join()